@@ -0,0 +1,116 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+class Saturated(Exception):
+    """Raised when a prover slot cannot be granted"""
+
+    def __init__(self, message, status_code, retry_after, queue_depth):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+
+class DeadlineExceeded(Exception):
+    """Raised when a caller's deadline passes while it waits for a prover slot"""
+
+class Governor:
+    """
+    Caps the number of concurrent prover processes per mode.
+
+    Callers that cannot get a slot wait in a bounded queue. When the queue is
+    full they are rejected at once with a 429, and when they wait longer than
+    wait_timeout they are rejected with a 503, so surplus requests fail fast
+    instead of dragging every other request into swap.
+    """
+
+    def __init__(self, limits, max_waiting=32, wait_timeout=30):
+        self.limits = dict(limits)
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.running = {mode: 0 for mode in self.limits}
+        self.waiting = {mode: 0 for mode in self.limits}
+        self.avg_duration = {mode: 5.0 for mode in self.limits}
+        self.cond = threading.Condition()
+
+    def queue_depth(self):
+        with self.cond:
+            return sum(self.waiting.values())
+
+    def snapshot(self):
+        with self.cond:
+            return {
+                mode: {
+                    'running': self.running[mode],
+                    'waiting': self.waiting[mode],
+                    'limit': self.limits[mode]
+                }
+                for mode in self.limits
+            }
+
+    def _retry_after(self, mode):
+        """Estimate seconds until a slot frees up for a new caller"""
+        backlog = self.waiting[mode] + 1
+        return max(1, math.ceil(self.avg_duration[mode] * backlog / self.limits[mode]))
+
+    def admit(self, mode):
+        """Reject at once if the wait queue is already full"""
+        with self.cond:
+            depth = sum(self.waiting.values())
+            if depth >= self.max_waiting:
+                raise Saturated(f'{depth} requests already waiting for a prover',
+                                429, self._retry_after(mode), depth)
+
+    def acquire(self, mode, bounded=True, deadline=None):
+        """
+        Take a slot for mode, waiting if all are busy.
+
+        Unbounded callers (the job workers, which already sit behind their
+        own queue) are never rejected. A deadline, as a time.monotonic()
+        value, caps the wait of bounded and unbounded callers alike and
+        raises DeadlineExceeded when it passes first.
+        """
+        with self.cond:
+            if self.running[mode] < self.limits[mode]:
+                self.running[mode] += 1
+                return
+
+            depth = sum(self.waiting.values())
+            if bounded and depth >= self.max_waiting:
+                raise Saturated(f'{depth} requests already waiting for a prover',
+                                429, self._retry_after(mode), depth)
+
+            self.waiting[mode] += 1
+            try:
+                give_up = time.monotonic() + self.wait_timeout if bounded else None
+                if deadline is not None and (give_up is None or deadline < give_up):
+                    give_up = deadline
+                while self.running[mode] >= self.limits[mode]:
+                    remaining = None if give_up is None else give_up - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        if give_up == deadline:
+                            raise DeadlineExceeded(f'Deadline passed while waiting for a {mode} slot')
+                        depth = sum(self.waiting.values())
+                        raise Saturated(f'No prover slot became free within {self.wait_timeout} seconds',
+                                        503, self._retry_after(mode), depth)
+                    self.cond.wait(remaining)
+                self.running[mode] += 1
+            finally:
+                self.waiting[mode] -= 1
+
+    def release(self, mode, duration=None):
+        with self.cond:
+            self.running[mode] -= 1
+            if duration is not None:
+                self.avg_duration[mode] = 0.8 * self.avg_duration[mode] + 0.2 * duration
+            self.cond.notify_all()
+
+    @contextmanager
+    def slot(self, mode, bounded=True, deadline=None):
+        self.acquire(mode, bounded=bounded, deadline=deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(mode, time.monotonic() - started)
@@ -1,591 +1,514 @@
-from flask import Flask, request, render_template_string, jsonify
+from flask import Flask, Response, request, jsonify, g
 import subprocess
-import tempfile
 import os
+import atexit
 import json
+import queue
+import signal
+import socket
+import sys
+import tempfile
 import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+
+from prover import TAMARIN_BIN
+from jobs import JobQueue, QueueFull
+from admission import DeadlineExceeded, Governor, Saturated
+from cache import ResultCache, cache_key
+from parallel import prove_parallel
+from output_parser import parse_output
+from capture import OUTPUT_INLINE_CHARS, clip_output, close_captures, output_size
+from batch import parse_items, run_batch
+from workspace import QuotaExceeded
+from assets import build_assets, serve_asset, gzip_response
+from probe import ProverProbe
+from provision import provisioner_from_env
+from events import EventBus
+from backends import backend_from_env
+from normalize import normalize
+from cancel import Cancelled, CancelToken, SessionRegistry
+from metrics import Registry, RSS_BUCKETS
+from history import STREAMS, RunHistory, theory_hash
+from deadline import InvalidDeadline, parse_deadline
+from lint import format_diagnostics, lint
 
 app = Flask(__name__)
 
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 100))
+JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 600))
+JOB_RETRY_AFTER = 30
+EVENT_POLL_MAX = 55
+EVENT_KEEPALIVE = 15
+LIVE_TIMEOUT = int(os.environ.get('LIVE_TIMEOUT', 30))
+ANALYSIS_TIMEOUT = 120
+COMPILE_TIMEOUT = 60
+# Clients may ask for a deadline of their own, up to this many seconds
+REQUEST_DEADLINE_MAX = int(os.environ.get('REQUEST_DEADLINE_MAX', 300))
+# Reject obviously broken theories without starting the prover
+PREFLIGHT_LINT = os.environ.get('PREFLIGHT_LINT', '1') not in ('0', 'false', 'no')
+DISCONNECT_POLL = 0.5
+RUNS_PAGE_MAX = 500
+OUTPUT_PAGE_MAX = 1024 * 1024
+GZIP_MIN_BYTES = 1024
+# Status nginx uses for requests the client abandoned
+CLIENT_CLOSED = 499
+PARALLEL_WORKERS = int(os.environ.get('PARALLEL_WORKERS', os.cpu_count() or 1))
+
+CPU_COUNT = os.cpu_count() or 1
+governor = Governor(
+    {
+        'check': int(os.environ.get('MAX_CHECK_PROCS', CPU_COUNT)),
+        'prove': int(os.environ.get('MAX_PROVE_PROCS', max(1, CPU_COUNT // 2)))
+    },
+    max_waiting=int(os.environ.get('ADMISSION_QUEUE_SIZE', 32)),
+    wait_timeout=int(os.environ.get('ADMISSION_WAIT', 30))
+)
+
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 500))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', governor.limits['check']))
+
+result_cache = ResultCache(
+    os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'tamarin-ide-cache')),
+    max_memory_entries=int(os.environ.get('CACHE_MEMORY_ENTRIES', 256)),
+    max_disk_bytes=int(os.environ.get('CACHE_DISK_MB', 256)) * 1024 * 1024,
+    max_age=int(os.environ.get('CACHE_MAX_AGE', 7 * 24 * 3600))
+)
+# Results holding more output text than this, e.g. whole daemon pages, are served from the run history instead
+CACHE_MAX_OUTPUT_CHARS = int(os.environ.get('CACHE_MAX_OUTPUT_KB', 1024)) * 1024
+
+backend = backend_from_env()
+
+run_history = RunHistory(
+    os.environ.get('HISTORY_DB', os.path.join(tempfile.gettempdir(), 'tamarin-ide-history.sqlite3')),
+    max_age=int(os.environ.get('HISTORY_MAX_AGE_DAYS', 90)) * 24 * 3600,
+    max_runs=int(os.environ.get('HISTORY_MAX_RUNS', 100000)),
+    max_bytes=int(os.environ.get('HISTORY_MAX_MB', 1024)) * 1024 * 1024
+)
+live_sessions = SessionRegistry()
+
+event_bus = EventBus(capacity=int(os.environ.get('EVENT_BUFFER_SIZE', 1000)))
+
+metrics = Registry()
+request_latency = metrics.histogram('tamarin_http_request_duration_seconds',
+                                    'HTTP request latency by endpoint and analysis mode',
+                                    ('endpoint', 'mode', 'code'))
+prover_duration = metrics.histogram('tamarin_prover_duration_seconds',
+                                    'Wall time of prover runs by mode', ('mode',))
+prover_runs = metrics.counter('tamarin_prover_runs_total', 'Prover runs by execution backend', ('backend',))
+prover_exits = metrics.counter('tamarin_prover_exit_total', 'Prover runs by mode and exit code', ('mode', 'code'))
+prover_timeouts = metrics.counter('tamarin_prover_timeouts_total', 'Prover runs killed on timeout', ('mode',))
+lint_rejections = metrics.counter('tamarin_lint_rejections_total', 'Theories rejected by the pre-flight linter',
+                                  ('mode',))
+prover_cancelled = metrics.counter('tamarin_prover_cancelled_total', 'Prover runs cancelled before finishing', ('mode',))
+prover_cpu = metrics.counter('tamarin_prover_cpu_seconds_total', 'CPU seconds used by prover runs', ('mode',))
+prover_rss = metrics.histogram('tamarin_prover_peak_rss_bytes', 'Peak resident set size of prover runs',
+                               ('mode',), buckets=RSS_BUCKETS)
+analysis_status = metrics.counter('tamarin_analysis_status_total',
+                                  'Analysis verdicts by the endpoint that requested them', ('source', 'status'))
+prover_in_flight = metrics.gauge('tamarin_prover_in_flight', 'Prover processes running by mode', ('mode',))
+prover_waiting = metrics.gauge('tamarin_prover_waiting', 'Requests waiting for a prover slot by mode', ('mode',))
+jobs_queued = metrics.gauge('tamarin_jobs_queued', 'Jobs waiting for a worker')
+jobs_running = metrics.gauge('tamarin_jobs_running', 'Jobs being run by a worker')
+cache_lookups = metrics.counter('tamarin_cache_lookups_total', 'Result cache lookups by outcome', ('result',))
+cache_hit_ratio = metrics.gauge('tamarin_cache_hit_ratio', 'Share of result cache lookups that were hits')
+install_duration = metrics.gauge('tamarin_install_duration_seconds', 'Time taken to provision the prover', ('source',))
+
+prover_probe = ProverProbe(TAMARIN_BIN, interval=int(os.environ.get('PROBE_INTERVAL', 30)))
+prover_probe.start()
+
 # Global flag to track Tamarin installation
 tamarin_installing = False
 tamarin_installed = False
-installation_log = []
+installation_log = deque(maxlen=100)
+install_report = None
+
+def log_install(message):
+    """Record an installation step and publish it to event subscribers"""
+    installation_log.append(message)
+    event_bus.publish('install', message=message, installed=tamarin_installed,
+                      installing=tamarin_installing)
 
 def install_tamarin():
-    """Install Tamarin Prover at runtime"""
-    global tamarin_installing, tamarin_installed, installation_log
+    """Install Tamarin Prover at runtime from the local artifact cache"""
+    global tamarin_installing, tamarin_installed, install_report
     
     if tamarin_installed or tamarin_installing:
         return
     
     tamarin_installing = True
-    installation_log.append("Starting Tamarin installation...")
+    log_install("Starting Tamarin installation...")
     
     try:
-        # Check if curl is available, install if not
-        subprocess.run(['apt-get', 'update'], check=False)
-        subprocess.run(['apt-get', 'install', '-y', 'curl'], check=False)
-        
-        # Try to download and install Tamarin
-        installation_log.append("Downloading Tamarin...")
-        result = subprocess.run([
-            'curl', '-L', 
-            'https://github.com/tamarin-prover/tamarin-prover/releases/download/1.8.0/tamarin-prover-1.8.0-linux64-ubuntu.tar.gz',
-            '-o', '/tmp/tamarin.tar.gz'
-        ], capture_output=True, text=True, timeout=300)
-        
-        if result.returncode == 0:
-            installation_log.append("Download successful, extracting...")
-            subprocess.run(['tar', '-xzf', '/tmp/tamarin.tar.gz', '-C', '/tmp'], check=True)
-            
-            # Find the tamarin-prover binary
-            find_result = subprocess.run(['find', '/tmp', '-name', 'tamarin-prover', '-type', 'f'], 
-                                       capture_output=True, text=True)
-            
-            if find_result.stdout.strip():
-                binary_path = find_result.stdout.strip().split('\n')[0]
-                subprocess.run(['cp', binary_path, '/usr/local/bin/'], check=True)
-                subprocess.run(['chmod', '+x', '/usr/local/bin/tamarin-prover'], check=True)
-                
-                # Test installation
-                test_result = subprocess.run(['/usr/local/bin/tamarin-prover', '--version'], 
-                                           capture_output=True, text=True)
-                if test_result.returncode == 0:
-                    installation_log.append(f"Tamarin installed successfully: {test_result.stdout.strip()}")
-                    tamarin_installed = True
-                else:
-                    installation_log.append("Tamarin installation failed - binary test failed")
-            else:
-                installation_log.append("Could not find tamarin-prover binary in downloaded archive")
+        if backend.needs_prover:
+            install_report = provisioner_from_env(log=log_install).provision()
         else:
-            installation_log.append(f"Download failed: {result.stderr}")
-            
+            # Replayed runs never start the prover, so there is nothing to install
+            install_report = {'source': backend.name, 'version': 'replay', 'binary': None,
+                              'timings': {'total': 0.0}}
+        tamarin_installed = True
+        prover_probe.trigger()
+        backend.start()
+        message = (f"Tamarin ready ({install_report['source']}) in {install_report['timings']['total']:.2f}s: "
+                   f"{install_report['version']}")
     except Exception as e:
-        installation_log.append(f"Installation error: {str(e)}")
+        message = f"Installation error: {str(e)}"
     finally:
         tamarin_installing = False
-        # Clean up
-        subprocess.run(['rm', '-rf', '/tmp/tamarin*'], check=False)
+    log_install(message)
 
 # Start Tamarin installation in background thread
 installation_thread = threading.Thread(target=install_tamarin, daemon=True)
 installation_thread.start()
 
-HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>🔒 Tamarin Prover Web Interface</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <style>
-        * { box-sizing: border-box; margin: 0; padding: 0; }
-        
-        body { 
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; 
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-        
-        .container { 
-            max-width: 1000px;
-            margin: 0 auto;
-            background: white; 
-            border-radius: 20px; 
-            box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }
-        
-        .header {
-            background: linear-gradient(135deg, #2c3e50, #34495e);
-            color: white;
-            padding: 40px;
-            text-align: center;
-        }
-        
-        .header h1 { 
-            font-size: 2.5rem; 
-            margin-bottom: 10px;
-            text-shadow: 0 2px 4px rgba(0,0,0,0.3);
-        }
-        
-        .header p { 
-            opacity: 0.9; 
-            font-size: 1.1rem;
-        }
-        
-        .content { padding: 40px; }
-        
-        .status-banner {
-            background: #fff3cd;
-            border: 1px solid #ffeaa7;
-            padding: 15px;
-            margin-bottom: 20px;
-            border-radius: 10px;
-            text-align: center;
-        }
-        
-        .status-banner.installing {
-            background: #d1ecf1;
-            border-color: #bee5eb;
-        }
-        
-        .status-banner.ready {
-            background: #d4edda;
-            border-color: #c3e6cb;
-        }
-        
-        .upload-area { 
-            border: 3px dashed #3498db; 
-            padding: 50px; 
-            text-align: center; 
-            margin: 30px 0; 
-            border-radius: 15px;
-            transition: all 0.3s ease;
-            cursor: pointer;
-            background: #f8f9fa;
-        }
-        
-        .upload-area:hover { 
-            border-color: #2980b9; 
-            background: #e3f2fd;
-            transform: translateY(-2px);
-        }
-        
-        .upload-area.dragover { 
-            border-color: #27ae60; 
-            background: #e8f5e8;
-            transform: scale(1.02);
-        }
-        
-        .upload-icon {
-            font-size: 3rem;
-            margin-bottom: 15px;
-            color: #3498db;
-        }
-        
-        textarea { 
-            width: 100%; 
-            height: 300px; 
-            margin: 20px 0; 
-            padding: 20px;
-            border: 2px solid #e0e0e0;
-            border-radius: 12px;
-            font-family: 'Monaco', 'Menlo', 'Courier New', monospace;
-            font-size: 14px;
-            resize: vertical;
-            transition: border-color 0.3s ease;
-            background: #fafafa;
-        }
-        
-        textarea:focus { 
-            border-color: #3498db; 
-            outline: none;
-            background: white;
-            box-shadow: 0 0 0 3px rgba(52,152,219,0.1);
-        }
-        
-        .btn { 
-            background: linear-gradient(135deg, #3498db, #2980b9); 
-            color: white; 
-            padding: 16px 40px; 
-            border: none; 
-            border-radius: 50px;
-            cursor: pointer; 
-            font-size: 18px;
-            font-weight: 600;
-            transition: all 0.3s ease;
-            display: block;
-            margin: 30px auto;
-            box-shadow: 0 4px 15px rgba(52,152,219,0.3);
-        }
-        
-        .btn:hover { 
-            transform: translateY(-3px); 
-            box-shadow: 0 8px 25px rgba(52,152,219,0.4);
-        }
-        
-        .btn:disabled { 
-            background: #bdc3c7; 
-            cursor: not-allowed; 
-            transform: none;
-            box-shadow: none;
-        }
-        
-        .result { 
-            background: #f8f9fa; 
-            padding: 25px; 
-            margin: 25px 0; 
-            border-left: 5px solid #3498db; 
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-        }
-        
-        .error { 
-            border-left-color: #e74c3c; 
-            background: #fce4ec;
-        }
-        
-        .success { 
-            border-left-color: #27ae60; 
-            background: #e8f5e8;
-        }
-        
-        .warning { 
-            border-left-color: #f39c12; 
-            background: #fff3e0;
-        }
-        
-        pre { 
-            background: #2c3e50; 
-            color: #ecf0f1; 
-            padding: 20px; 
-            border-radius: 10px; 
-            overflow-x: auto;
-            font-size: 14px;
-            line-height: 1.5;
-            margin: 15px 0;
-            white-space: pre-wrap;
-        }
-        
-        .loading { 
-            text-align: center; 
-            color: #3498db;
-            animation: pulse 2s infinite;
-        }
-        
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.6; }
-        }
-        
-        .file-info { 
-            background: linear-gradient(135deg, #e3f2fd, #bbdefb); 
-            padding: 15px; 
-            border-radius: 10px; 
-            margin: 15px 0;
-            font-size: 14px;
-            border-left: 4px solid #2196f3;
-        }
-        
-        .footer {
-            background: #f8f9fa;
-            padding: 20px;
-            text-align: center;
-            color: #7f8c8d;
-            border-top: 1px solid #e0e0e0;
-        }
-        
-        .mode-selector {
-            display: flex;
-            gap: 10px;
-            margin: 20px 0;
-            justify-content: center;
-        }
-        
-        .mode-btn {
-            padding: 10px 20px;
-            border: 2px solid #3498db;
-            background: white;
-            color: #3498db;
-            border-radius: 25px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        
-        .mode-btn.active {
-            background: #3498db;
-            color: white;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🔒 Tamarin Prover Web Interface</h1>
-            <p>Security protocol verification using Tamarin Prover</p>
-        </div>
-        
-        <div class="content">
-            <div id="statusBanner" class="status-banner installing">
-                <strong>🔄 Installing Tamarin Prover...</strong>
-                <p>Please wait while we set up the verification engine in the background.</p>
-            </div>
-            
-            <form id="uploadForm">
-                <div class="mode-selector">
-                    <button type="button" class="mode-btn active" id="checkMode">✓ Check Theory</button>
-                    <button type="button" class="mode-btn" id="proveMode">🔍 Prove Lemmas</button>
-                </div>
-                
-                <div class="upload-area" id="uploadArea">
-                    <input type="file" id="fileInput" accept=".spthy" style="display: none;">
-                    <div class="upload-icon">📁</div>
-                    <div>
-                        <strong>Click to upload .spthy file</strong><br>
-                        <small style="color: #7f8c8d;">or drag & drop here</small>
-                    </div>
-                </div>
-                
-                <div id="fileInfo" class="file-info" style="display: none;"></div>
-                
-                <textarea 
-                    id="codeArea" 
-                    placeholder="Or paste your Tamarin theory code here..."
-                ></textarea>
-                
-                <button type="submit" class="btn" id="processBtn" disabled>
-                    🔒 Run Tamarin Analysis
-                </button>
-            </form>
-            
-            <div id="results"></div>
-        </div>
-        
-        <div class="footer">
-            <p>Powered by <a href="https://tamarin-prover.github.io/" target="_blank">Tamarin Prover</a></p>
-        </div>
-    </div>
-
-    <script>
-        const fileInput = document.getElementById('fileInput');
-        const codeArea = document.getElementById('codeArea');
-        const uploadForm = document.getElementById('uploadForm');
-        const uploadArea = document.getElementById('uploadArea');
-        const results = document.getElementById('results');
-        const processBtn = document.getElementById('processBtn');
-        const fileInfo = document.getElementById('fileInfo');
-        const checkMode = document.getElementById('checkMode');
-        const proveMode = document.getElementById('proveMode');
-        const statusBanner = document.getElementById('statusBanner');
-        
-        let currentMode = 'check';
-
-        // Check Tamarin status periodically
-        function checkTamarinStatus() {
-            fetch('/tamarin-status')
-                .then(response => response.json())
-                .then(data => {
-                    if (data.installed) {
-                        statusBanner.className = 'status-banner ready';
-                        statusBanner.innerHTML = '<strong>✅ Tamarin Prover Ready!</strong><p>You can now analyze your security protocols.</p>';
-                        processBtn.disabled = false;
-                    } else if (data.installing) {
-                        statusBanner.className = 'status-banner installing';
-                        statusBanner.innerHTML = '<strong>🔄 Installing Tamarin Prover...</strong><p>Please wait while we set up the verification engine.</p>';
-                        processBtn.disabled = true;
-                    } else {
-                        statusBanner.className = 'status-banner';
-                        statusBanner.innerHTML = '<strong>⚠️ Tamarin Installation Failed</strong><p>Please refresh the page to retry installation.</p>';
-                        processBtn.disabled = true;
-                    }
-                })
-                .catch(() => {
-                    // Keep checking
-                });
-        }
+# Prover daemons run in their own sessions and would otherwise outlive the app
+atexit.register(backend.stop)
 
-        // Check status every 5 seconds
-        setInterval(checkTamarinStatus, 5000);
-        checkTamarinStatus(); // Initial check
+def exit_on_sigterm(signum, frame):
+    """Turn SIGTERM into a normal exit so atexit handlers run"""
+    sys.exit(0)
 
-        // Mode selection
-        checkMode.addEventListener('click', () => {
-            currentMode = 'check';
-            checkMode.classList.add('active');
-            proveMode.classList.remove('active');
-        });
-        
-        proveMode.addEventListener('click', () => {
-            currentMode = 'prove';
-            proveMode.classList.add('active');
-            checkMode.classList.remove('active');
-        });
-
-        // File upload handling
-        uploadArea.addEventListener('click', () => fileInput.click());
-        
-        uploadArea.addEventListener('dragover', (e) => {
-            e.preventDefault();
-            uploadArea.classList.add('dragover');
-        });
-        
-        uploadArea.addEventListener('dragleave', () => {
-            uploadArea.classList.remove('dragover');
-        });
-        
-        uploadArea.addEventListener('drop', (e) => {
-            e.preventDefault();
-            uploadArea.classList.remove('dragover');
-            const files = e.dataTransfer.files;
-            if (files.length > 0) {
-                handleFile(files[0]);
-            }
-        });
-
-        fileInput.addEventListener('change', (e) => {
-            if (e.target.files.length > 0) {
-                handleFile(e.target.files[0]);
-            }
-        });
-
-        function handleFile(file) {
-            if (!file.name.endsWith('.spthy')) {
-                alert('Please upload a .spthy file');
-                return;
-            }
-            
-            fileInfo.style.display = 'block';
-            fileInfo.innerHTML = `
-                <strong>📄 ${file.name}</strong> 
-                <span style="color: #666; margin-left: 10px;">${(file.size/1024).toFixed(1)} KB</span>
-            `;
-            
-            const reader = new FileReader();
-            reader.onload = (e) => {
-                codeArea.value = e.target.result;
-            };
-            reader.readAsText(file);
-        }
+def run_status(parsed, returncode):
+    """Classify a run as success, parse_error, wellformedness_error, unknown or error"""
+    if returncode == 0 and not parsed['has_parse_error'] and not parsed['has_wellformedness_error']:
+        return "success"
+    elif parsed['has_parse_error']:
+        return "parse_error"
+    elif parsed['has_wellformedness_error']:
+        return "wellformedness_error"
+    else:
+        return "unknown" if returncode == 0 else "error"
 
-        // Form submission
-        uploadForm.addEventListener('submit', async (e) => {
-            e.preventDefault();
-            const code = codeArea.value.trim();
-            
-            if (!code) {
-                alert('Please provide Tamarin theory code to analyze');
-                return;
-            }
-
-            processBtn.disabled = true;
-            processBtn.innerHTML = '⏳ Processing...';
-            
-            results.innerHTML = `
-                <div class="result loading">
-                    <h3>🔄 Running Tamarin Analysis...</h3>
-                    <p>Please wait while we ${currentMode === 'check' ? 'check your theory' : 'prove the lemmas'}</p>
-                </div>
-            `;
-
-            try {
-                const response = await fetch('/tamarin', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({code: code, mode: currentMode})
-                });
-                
-                const result = await response.json();
-                displayResults(result);
-                
-            } catch (error) {
-                results.innerHTML = `
-                    <div class="result error">
-                        <h3>❌ Network Error</h3>
-                        <p>${error.message}</p>
-                    </div>
-                `;
-            } finally {
-                processBtn.disabled = false;
-                processBtn.innerHTML = '🔒 Run Tamarin Analysis';
-            }
-        });
-        
-        function displayResults(result) {
-            if (!result.success) {
-                results.innerHTML = `
-                    <div class="result error">
-                        <h3>❌ Tamarin Error</h3>
-                        <pre>${result.error}</pre>
-                    </div>
-                `;
-                return;
-            }
-            
-            if (result.output) {
-                const hasErrors = result.output.toLowerCase().includes('error') || 
-                                 result.output.toLowerCase().includes('failed') ||
-                                 result.returncode !== 0;
-                
-                const hasWarnings = result.output.toLowerCase().includes('warning');
-                
-                let resultClass = 'success';
-                let resultIcon = '✅';
-                let resultTitle = 'Analysis Complete';
-                
-                if (hasErrors) {
-                    resultClass = 'error';
-                    resultIcon = '❌';
-                    resultTitle = 'Analysis Failed';
-                } else if (hasWarnings) {
-                    resultClass = 'warning';
-                    resultIcon = '⚠️';
-                    resultTitle = 'Analysis Complete with Warnings';
-                }
-                
-                results.innerHTML = `
-                    <div class="result ${resultClass}">
-                        <h3>${resultIcon} ${resultTitle}</h3>
-                        <pre>${result.output}</pre>
-                    </div>
-                `;
-            } else {
-                results.innerHTML = `
-                    <div class="result success">
-                        <h3>✅ Analysis Complete</h3>
-                        <p>Tamarin analysis completed successfully.</p>
-                    </div>
-                `;
-            }
-        }
-    </script>
-</body>
-</html>
-'''
-
-def analyze_tamarin_output(stdout, stderr, returncode):
-    """Analyze Tamarin output to determine success/failure"""
-    full_output = stdout + stderr
+def result_parsed(result):
+    """The parsed output of a result: parsed while the prover ran, or parsed now for results that were not"""
+    if 'parsed' in result:
+        return result['parsed']
+    return parse_output(result['stdout'], result['stderr'])
+
+def analyze_tamarin_output(result, source='tamarin'):
+    """
+    Analyze Tamarin output to determine success/failure and extract meaningful information.
+    
+    Tamarin output patterns:
+    - Success: "summary of summaries: X (Y proved, Z disproved, W contradictory)"
+    - Parse errors: "Parse error" or syntax errors
+    - Well-formedness errors: "restriction", "typing", etc.
+    """
+    parsed = dict(result_parsed(result))
+    returncode = result['returncode']
+    status = run_status(parsed, returncode)
     
-    parse_error_indicators = [
-        'parse error', 'syntax error', 'lexical error',
-        'unexpected token', 'parsing failed'
-    ]
+    analysis_status.inc(source=source, status=status)
+    return {
+        'success': status in ("success", "unknown"),
+        'status': status,
+        'has_parse_error': parsed['has_parse_error'],
+        'has_wellformedness_error': parsed['has_wellformedness_error'],
+        'returncode': returncode,
+        'parsed': parsed
+    }
+
+def record_prover_run(mode, result):
+    """Record duration, exit code and resource usage of a finished prover run"""
+    prover_runs.inc(backend=result['backend'])
+    prover_duration.observe(result['duration'], mode=mode)
+    prover_exits.inc(mode=mode, code=result['returncode'])
+    if result['cpu_seconds'] is not None:
+        prover_cpu.inc(result['cpu_seconds'], mode=mode)
+        prover_rss.observe(result['max_rss_bytes'], mode=mode)
+
+def lint_result(diagnostics, duration):
+    """A prover-style result reporting the linter's diagnostics as parse errors"""
+    return {
+        'stdout': '', 'stderr': format_diagnostics(diagnostics), 'returncode': 1, 'duration': duration,
+        'limit': None, 'cpu_seconds': None, 'max_rss_bytes': None, 'backend': 'lint'
+    }
+
+def restore_parsed(parsed, source_map):
+    """Map the error locations of parsed output back to the submitted source"""
+    errors = []
+    for error in parsed['errors']:
+        if error['line'] is not None:
+            line, column = source_map.position(error['line'], error['column'])
+            error = dict(error, line=line, column=column)
+        errors.append(error)
+    return dict(parsed, errors=errors)
+
+def restore_positions(result, source_map, cached):
+    """Map error locations in a result on the normalized theory back to the submitted source"""
+    restored = dict(result, stdout=source_map.restore(result['stdout']), stderr=source_map.restore(result['stderr']),
+                    cached=cached, source_map=source_map.to_dict())
+    if 'parsed' in result:
+        restored['parsed'] = restore_parsed(result['parsed'], source_map)
+    return restored
+
+def record_history(key, normalized, mode, flags, version, result, status=None, keep=True):
+    """
+    Persist a prover run and tag the result with its run id and theory hash; keep=False only tags the hash.
+
+    The full output is recorded from the result's captures, which are
+    closed and dropped from the returned result.
+    """
+    if not keep:
+        return dict(release_captures(result), run_id=None, theory_hash=theory_hash(normalized))
+    parsed = result_parsed(result)
+    status = status or run_status(parsed, result['returncode'])
+    try:
+        run_id = run_history.record(key, normalized, mode, flags, version, status, result, parsed['lemmas'])
+    finally:
+        result = release_captures(result)
+    return dict(result, run_id=run_id, theory_hash=theory_hash(normalized))
+
+def release_captures(result):
+    """Close the spooled output of a prover run, returning the result without it"""
+    result = dict(result)
+    close_captures(result.pop('captures', None))
+    return result
+
+def cacheable(result):
+    """
+    Small enough for the result cache, going by the output text the result holds.
+    
+    Prover runs only hold the head and tail of their output, so long runs
+    are cached clipped like any other; the full text stays in the run history.
+    """
+    return len(result['stdout']) + len(result['stderr']) <= CACHE_MAX_OUTPUT_CHARS
+
+def run_prover_cached(spthy_code, mode, timeout, on_output=None, bounded=True, lemma=None, cancel=None,
+                      record=True):
+    """
+    Run the prover behind the result cache and the admission governor.
     
-    wellformedness_errors = [
-        'undeclared function', 'undeclared sort', 'type error',
-        'restriction not satisfied', 'unbound variable'
-    ]
+    The prover sees the theory with comments and redundant whitespace
+    removed, so cosmetic edits hit the cache; error locations in the
+    result are mapped back to the submitted source. Cancelling the cancel
+    token kills the prover and raises Cancelled.
     
-    has_parse_error = any(indicator in full_output.lower() for indicator in parse_error_indicators)
-    has_wellformedness_error = any(indicator in full_output.lower() for indicator in wellformedness_errors)
+    Runs are recorded in the run history, which also answers repeat
+    requests whose result has left the cache or was too large to cache;
+    record=False skips that for throwaway runs such as live checks.
     
-    if returncode == 0 and not has_parse_error and not has_wellformedness_error:
-        success = True
-        status = "success"
-    elif has_parse_error:
-        success = False
-        status = "parse_error"
-    elif has_wellformedness_error:
-        success = False
-        status = "wellformedness_error"
-    else:
-        success = returncode == 0
-        status = "unknown" if success else "error"
+    timeout counts from the call: waiting for a slot ends when it runs out,
+    and the prover gets whatever is left. A TimeoutExpired carries the output captured
+    before the deadline, mapped back to the submitted source, and the id of
+    the run history row holding it.
+    
+    With PREFLIGHT_LINT on, theories the linter finds broken are answered
+    with its diagnostics, reported like prover parse errors, and never
+    reach the prover.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    mode = 'check' if mode == 'check' else 'prove'
+    normalized, source_map = normalize(spthy_code)
+    if PREFLIGHT_LINT:
+        diagnostics = lint(normalized)
+        if diagnostics:
+            lint_rejections.inc(mode=mode)
+            result = restore_positions(lint_result(diagnostics, time.monotonic() - started), source_map, cached=False)
+            if on_output is not None:
+                on_output('stderr', result['stderr'])
+            return result
+    flags = backend.flags(mode, lemma)
+    version = backend.version(normalized, mode, lemma)
+    key = cache_key(normalized, mode, flags, version)
+    
+    forward = None
+    if on_output is not None:
+        forward = lambda stream, line: on_output(stream, source_map.restore(line))
+    
+    result = result_cache.get(key)
+    if result is None:
+        result = run_history.find(key)
+        if result is not None and cacheable(result):
+            result_cache.put(key, result)
+    if result is not None:
+        if forward is not None:
+            forward('stdout', result['stdout'])
+            forward('stderr', result['stderr'])
+        return restore_positions(result, source_map, cached=True)
+    
+    if cancel is not None:
+        cancel.check()
+    try:
+        with governor.slot(mode, bounded=bounded, deadline=deadline):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(TAMARIN_BIN, timeout)
+            try:
+                if cancel is not None:
+                    cancel.check()
+                result = backend.run(normalized, mode, remaining, on_output=forward, lemma=lemma, cancel=cancel)
+            except subprocess.TimeoutExpired as e:
+                prover_timeouts.inc(mode=mode)
+                recorded = record_history(key, normalized, mode, flags, version, {
+                    **partial_result(e), 'returncode': None,
+                    'duration': remaining, 'limit': 'wall_time', 'backend': backend.name
+                }, status='timeout', keep=record)
+                e.captures = None  # closed by record_history
+                e.output = source_map.restore(e.output or '')
+                e.stderr = source_map.restore(e.stderr or '')
+                if hasattr(e, 'parsed'):
+                    e.parsed = restore_parsed(e.parsed, source_map)
+                e.run_id = recorded['run_id']
+                raise
+            except Cancelled:
+                prover_cancelled.inc(mode=mode)
+                raise
+    except DeadlineExceeded:
+        raise subprocess.TimeoutExpired(TAMARIN_BIN, timeout)
+    record_prover_run(mode, result)
+    result = record_history(key, normalized, mode, flags, version, result, keep=record)
+    # Runs stopped by a resource cap depend on the configured caps, not just the theory
+    if result['limit'] is None and cacheable(result):
+        result_cache.put(key, result)
+    return restore_positions(result, source_map, cached=False)
+
+def run_prove(spthy_code, timeout, parallel=False, on_output=None, bounded=True, cancel=None, per_lemma=False):
+    """
+    Prove all lemmas, one prover process per lemma when parallel or per_lemma is set.
+    
+    Per-lemma runs are all bounded by timeout and report the lemmas
+    finished when it runs out; parallel also runs them concurrently, on no
+    more workers than there are prove slots so lemmas do not queue behind
+    their own siblings. Like a single run, they wait for bounded prover
+    slots unless bounded is unset, which only the job workers do; a lemma
+    that gets no slot is reported skipped.
+    """
+    if parallel or per_lemma:
+        if bounded:
+            governor.admit('prove')
+        result = prove_parallel(
+            spthy_code,
+            lambda code, lemma, lemma_timeout, forward: run_prover_cached(
+                code, 'prove', lemma_timeout, on_output=forward, bounded=bounded, lemma=lemma, cancel=cancel),
+            workers=min(PARALLEL_WORKERS, governor.limits['prove']) if parallel else 1,
+            timeout=timeout,
+            on_output=on_output
+        )
+        if result is not None:
+            return dict(record_merged(spthy_code, result), cached=all(lemma['cached'] for lemma in result['lemmas']),
+                        source_map=normalize(spthy_code)[1].to_dict())
+    return run_prover_cached(spthy_code, 'prove', timeout, on_output=on_output, bounded=bounded, cancel=cancel)
+
+def merged_output(parts, summary, stream):
+    """Yield the full output of a per-lemma run from each lemma's recorded output, or its clipped text if unrecorded"""
+    for part in parts:
+        if stream == 'stdout':
+            yield f'--- {part["name"]} ---\n'
+        stored = run_history.output(part['run_id'], stream) if part['run_id'] else None
+        if stored is None:
+            yield part[stream]
+        else:
+            yield from stored.text_chunks()
+    if stream == 'stdout':
+        yield summary
+
+def record_merged(spthy_code, result):
+    """
+    Record a per-lemma prove as one run, so its merged output gets a run id and can be paged.
+
+    It is keyed on the per-lemma flags, so it never answers a single
+    --prove run from the history; runs cut short by the deadline are
+    recorded as timeouts. When every lemma came from the cache the merged
+    run recorded for them before is reused instead of storing another copy.
+    """
+    result = dict(result)
+    parts = result.pop('parts')
+    normalized = normalize(spthy_code)[0]
+    flags = [flag for lemma in result['lemmas'] for flag in backend.flags('prove', lemma['name'])]
+    version = ', '.join(sorted({backend.version(normalized, 'prove', lemma['name']) for lemma in result['lemmas']}))
+    key = cache_key(normalized, 'prove', flags, version)
+    if all(lemma['cached'] for lemma in result['lemmas']):
+        recorded = run_history.find(key)
+        if recorded is not None:
+            return dict(result, run_id=recorded['run_id'], theory_hash=recorded['theory_hash'],
+                        output_size=recorded['output_size'])
+    status = run_status(parse_output(result['stdout'], result['stderr']), result['returncode']) \
+        if result['complete'] else 'timeout'
+    run_id = run_history.record(
+        key, normalized, 'prove', flags, version, status, dict(result, backend=backend.name),
+        result['lemmas'], output={stream: merged_output(parts, result['summary'], stream) for stream in STREAMS}
+    )
+    sizes = {}
+    for stream in STREAMS:
+        stored = run_history.output(run_id, stream)
+        sizes[stream] = stored.size if stored is not None else len(result[stream])
+    return dict(result, run_id=run_id, theory_hash=theory_hash(normalized), output_size=sizes)
+
+def _watch_disconnect(sock, token, done):
+    while not done.wait(DISCONNECT_POLL):
+        try:
+            if sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b'':
+                token.cancel()
+                return
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            continue
+        except ValueError:
+            # TLS sockets cannot be peeked at
+            return
+        except OSError:
+            token.cancel()
+            return
+
+@contextmanager
+def cancel_on_disconnect(token=None):
+    """
+    Yield a CancelToken that is cancelled if the client hangs up mid-request.
     
+    The connection is peeked at from a watcher thread while the request is
+    being handled; servers that do not expose werkzeug.socket are not watched.
+    """
+    token = token or CancelToken()
+    sock = request.environ.get('werkzeug.socket')
+    done = threading.Event()
+    if sock is not None:
+        threading.Thread(target=_watch_disconnect, args=(sock, token, done), daemon=True).start()
+    try:
+        yield token
+    finally:
+        done.set()
+
+def output_handle(result, streams=STREAMS):
+    """Describe the full output behind a clipped response and where to page it from"""
+    run_id = result.get('run_id')
     return {
-        'success': success,
-        'status': status,
-        'has_parse_error': has_parse_error,
-        'has_wellformedness_error': has_wellformedness_error,
-        'returncode': returncode
+        'size': {stream: output_size(result, stream) for stream in streams},
+        'truncated': [stream for stream in streams if output_size(result, stream) > OUTPUT_INLINE_CHARS],
+        'url': f'/runs/{run_id}/output' if run_id else None
     }
 
-def get_user_friendly_message(analysis):
+def partial_result(error):
+    """The output a run captured before its deadline, shaped for clip_output and output_handle"""
+    partial = {'stdout': error.output or '', 'stderr': error.stderr or '', 'run_id': getattr(error, 'run_id', None)}
+    for key in ('output_size', 'parsed', 'captures'):
+        if getattr(error, key, None) is not None:
+            partial[key] = getattr(error, key)
+    return partial
+
+def request_budget(data, default):
+    """Seconds this request may take: the client's deadline, capped at REQUEST_DEADLINE_MAX, or default"""
+    body_value = data.get('deadline') if isinstance(data, dict) else None
+    return parse_deadline(body_value, request.headers.get('X-Request-Deadline'), default, REQUEST_DEADLINE_MAX)
+
+def saturated_response(error, body):
+    """Build a 429/503 response telling the client when to retry"""
+    body['retry_after'] = error.retry_after
+    body['queue_depth'] = error.queue_depth
+    response = jsonify(body)
+    response.headers['Retry-After'] = str(error.retry_after)
+    response.headers['X-Queue-Depth'] = str(error.queue_depth)
+    return response, error.status_code
+
+def get_user_friendly_message(analysis, limit=None):
     """Generate user-friendly message based on analysis results."""
-    if analysis['success']:
+    if limit == 'cpu':
+        return "❌ The prover exceeded its CPU time limit and was stopped."
+    elif limit == 'memory':
+        return "❌ The prover exceeded its memory limit and was stopped."
+    elif analysis['success']:
         return "✅ Theory compiled successfully! No syntax or well-formedness errors found."
     elif analysis['has_parse_error']:
         return "❌ Parse error detected. Please check your syntax."
@@ -594,9 +517,39 @@ def get_user_friendly_message(analysis):
     else:
         return "❌ Compilation failed. Please check the output for details."
 
+@app.before_request
+def start_timer():
+    g.started = time.monotonic()
+
+@app.after_request
+def compress_json(response):
+    """Gzip JSON bodies for clients that accept it; prover output compresses very well"""
+    if response.mimetype == 'application/json':
+        gzip_response(response, request.headers.get('Accept-Encoding', ''), min_bytes=GZIP_MIN_BYTES)
+    return response
+
+@app.after_request
+def record_latency(response):
+    """Observe request latency labelled by endpoint and the requested analysis mode"""
+    if 'started' in g:
+        data = request.get_json(silent=True) if request.is_json else None
+        mode = data.get('mode', '') if isinstance(data, dict) else ''
+        request_latency.observe(time.monotonic() - g.started, endpoint=request.endpoint or 'unknown',
+                                mode=mode if mode in ('check', 'prove') else '', code=response.status_code)
+    return response
+
+frontend_assets = build_assets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend'))
+
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    return serve_asset(frontend_assets['index.html'], request)
+
+@app.route('/assets/<name>')
+def asset(name):
+    """Serve fingerprinted frontend files with long-lived caching"""
+    if name not in frontend_assets or name == 'index.html':
+        return jsonify({'success': False, 'error': 'Unknown asset'}), 404
+    return serve_asset(frontend_assets[name], request)
 
 @app.route('/tamarin-status')
 def tamarin_status():
@@ -604,7 +557,9 @@ def tamarin_status():
     return jsonify({
         'installed': tamarin_installed,
         'installing': tamarin_installing,
-        'log': installation_log[-5:]
+        'log': list(installation_log)[-5:],
+        'install': install_report,
+        'seq': event_bus.last_seq()
     })
 
 @app.route('/tamarin', methods=['POST'])
@@ -615,41 +570,189 @@ def tamarin_analysis():
             'error': 'Tamarin Prover is not yet installed. Please wait for installation to complete.'
         }), 503
     
+    budget = ANALYSIS_TIMEOUT
     try:
         data = request.get_json()
         spthy_code = data['code']
         mode = data.get('mode', 'check')
+        budget, explicit = request_budget(data, ANALYSIS_TIMEOUT)
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.spthy', delete=False) as f:
-            f.write(spthy_code)
-            temp_file = f.name
-        
-        try:
+        with cancel_on_disconnect() as token:
             if mode == 'check':
-                cmd = ['tamarin-prover', '--check-only', temp_file]
+                result = run_prover_cached(spthy_code, mode, timeout=budget, cancel=token)
             else:
-                cmd = ['tamarin-prover', '--prove', temp_file]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            
-            return jsonify({
-                'success': True,
-                'output': result.stdout if result.stdout else result.stderr,
-                'returncode': result.returncode,
-                'mode': mode
-            })
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-        
-    except subprocess.TimeoutExpired:
-        return jsonify({'success': False, 'error': 'Analysis timed out after 2 minutes'})
+                # A client deadline is split between the lemmas so the ones that finish are reported
+                result = run_prove(spthy_code, timeout=budget, parallel=data.get('parallel', False), cancel=token,
+                                   per_lemma=explicit)
+        
+        analysis = analyze_tamarin_output(result)
+        stream = 'stdout' if result['stdout'] else 'stderr'
+        
+        response_data = {
+            'success': True,
+            'output': clip_output(result[stream]),
+            'output_handle': output_handle(result, (stream,)),
+            'returncode': result['returncode'],
+            'mode': mode,
+            'cached': result['cached'],
+            'status': analysis['status'],
+            'limit': result.get('limit'),
+            'source_map': result['source_map'],
+            'run_id': result.get('run_id'),
+            'theory_hash': result.get('theory_hash'),
+            'partial': not result.get('complete', True),
+            'deadline': budget,
+            'parsed': analysis['parsed']
+        }
+        if 'lemmas' in result:
+            analysis['parsed']['lemmas'] = result['lemmas']
+            response_data['lemmas'] = result['lemmas']
+            response_data['assumptions_hold'] = result['assumptions_hold']
+        return jsonify(response_data)
+        
+    except subprocess.TimeoutExpired as e:
+        partial = partial_result(e)
+        stream = 'stdout' if partial['stdout'] else 'stderr'
+        return jsonify({
+            'success': False,
+            'error': f'Analysis timed out after {budget:g} seconds',
+            'limit': 'wall_time',
+            'partial': True,
+            'deadline': budget,
+            'output': clip_output(partial[stream]),
+            'output_handle': output_handle(partial, (stream,)),
+            'run_id': partial['run_id'],
+            'lemmas': result_parsed(partial)['lemmas']
+        })
+    except InvalidDeadline as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
+    except Cancelled:
+        return jsonify({'success': False, 'error': 'Client disconnected'}), CLIENT_CLOSED
     except FileNotFoundError:
         return jsonify({'success': False, 'error': 'tamarin-prover not found. Installation may have failed.'})
+    except Saturated as e:
+        return saturated_response(e, {'success': False, 'error': str(e)})
+    except QuotaExceeded as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+def sse_event(event, data, event_id=None):
+    """Format a Server-Sent Event carrying a JSON payload"""
+    prefix = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{prefix}event: {event}\ndata: {json.dumps(data)}\n\n'
+
+@app.route('/tamarin/stream', methods=['POST'])
+def tamarin_stream():
+    """Run an analysis and forward prover output line by line as Server-Sent Events"""
+    if not tamarin_installed:
+        return jsonify({
+            'success': False,
+            'error': 'Tamarin Prover is not yet installed. Please wait for installation to complete.'
+        }), 503
+    
+    data = request.get_json(silent=True) or {}
+    spthy_code = data.get('code', '')
+    mode = data.get('mode', 'check')
+    if not spthy_code:
+        return jsonify({'success': False, 'error': 'No code provided'}), 400
+    try:
+        budget = request_budget(data, ANALYSIS_TIMEOUT)[0]
+    except InvalidDeadline as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
+    
+    events = queue.Queue()
+    token = CancelToken()
+    
+    def run():
+        try:
+            result = run_prover_cached(
+                spthy_code, mode, timeout=budget,
+                on_output=lambda stream, line: events.put(('output', {'stream': stream, 'text': line})),
+                cancel=token
+            )
+            analysis = analyze_tamarin_output(result, source='stream')
+            events.put(('result', {
+                'success': analysis['success'],
+                'status': analysis['status'],
+                'returncode': result['returncode'],
+                'mode': mode,
+                'cached': result['cached'],
+                'limit': result.get('limit'),
+                'message': get_user_friendly_message(analysis, result.get('limit')),
+                'run_id': result.get('run_id'),
+                'output_handle': output_handle(result),
+                'parsed': analysis['parsed']
+            }))
+        except subprocess.TimeoutExpired as e:
+            # The output itself has already been streamed
+            partial = partial_result(e)
+            events.put(('error', {
+                'error': f'Analysis timed out after {budget:g} seconds',
+                'limit': 'wall_time',
+                'partial': True,
+                'run_id': partial['run_id'],
+                'output_handle': output_handle(partial),
+                'lemmas': result_parsed(partial)['lemmas']
+            }))
+        except Cancelled:
+            pass
+        except FileNotFoundError:
+            events.put(('error', {'error': 'tamarin-prover not found. Installation may have failed.'}))
+        except Saturated as e:
+            events.put(('error', {'error': str(e), 'retry_after': e.retry_after, 'queue_depth': e.queue_depth}))
+        except Exception as e:
+            events.put(('error', {'error': str(e)}))
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=run, daemon=True).start()
+    
+    def generate():
+        # Werkzeug closes the generator when a write to a departed client
+        # fails; keepalives make sure that happens even while the prover is quiet
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=EVENT_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if item is None:
+                    return
+                yield sse_event(*item)
+        finally:
+            token.cancel()
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def n8n_result(result, source='n8n'):
+    """Build the /n8n/compile response body for a finished prover run"""
+    analysis = analyze_tamarin_output(result, source=source)
+    
+    return {
+        'success': analysis['success'],
+        'status': analysis['status'],
+        'returncode': result['returncode'],
+        'stdout': clip_output(result['stdout']),
+        'stderr': clip_output(result['stderr']),
+        'output_handle': output_handle(result),
+        'analysis': {
+            'has_parse_error': analysis['has_parse_error'],
+            'has_wellformedness_error': analysis['has_wellformedness_error'],
+        },
+        'message': get_user_friendly_message(analysis, result.get('limit')),
+        'cached': result['cached'],
+        'limit': result.get('limit'),
+        'source_map': result['source_map'],
+        'run_id': result.get('run_id'),
+        'theory_hash': result.get('theory_hash'),
+        'parsed': analysis['parsed']
+    }
+
 @app.route('/n8n/compile', methods=['POST'])
 def n8n_compile():
     """N8N-compatible endpoint for compiling Tamarin theories."""
@@ -661,12 +764,15 @@ def n8n_compile():
             'status': 'not_ready'
         }), 503
     
+    budget = COMPILE_TIMEOUT
     try:
         if request.is_json:
             data = request.get_json()
             spthy_code = data.get('code', '')
         else:
+            data = request.form
             spthy_code = request.form.get('code', '')
+        budget = request_budget(data, COMPILE_TIMEOUT)[0]
         
         if not spthy_code:
             return jsonify({
@@ -676,45 +782,63 @@ def n8n_compile():
                 'status': 'invalid_input'
             }), 400
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.spthy', delete=False) as f:
-            f.write(spthy_code)
-            temp_file = f.name
+        with cancel_on_disconnect() as token:
+            result = run_prover_cached(spthy_code, 'check', timeout=budget, cancel=token)
         
-        try:
-            result = subprocess.run(
-                ['tamarin-prover', '--check-only', temp_file],
-                capture_output=True, text=True, timeout=60
-            )
-            
-            analysis = analyze_tamarin_output(result.stdout, result.stderr, result.returncode)
-            
-            response_data = {
-                'success': analysis['success'],
-                'status': analysis['status'],
-                'returncode': result.returncode,
-                'stdout': result.stdout,
-                'stderr': result.stderr,
-                'analysis': {
-                    'has_parse_error': analysis['has_parse_error'],
-                    'has_wellformedness_error': analysis['has_wellformedness_error'],
-                },
-                'message': get_user_friendly_message(analysis)
-            }
-            
-            status_code = 200 if analysis['success'] else 400
-            return jsonify(response_data), status_code
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        response_data = n8n_result(result)
+        status_code = 200 if response_data['success'] else 400
+        return jsonify(response_data), status_code
         
-    except subprocess.TimeoutExpired:
+    except subprocess.TimeoutExpired as e:
+        partial = partial_result(e)
         return jsonify({
             'success': False,
             'error': 'Compilation timed out',
-            'message': 'Tamarin compilation timed out after 60 seconds',
-            'status': 'timeout'
+            'message': f'Tamarin compilation timed out after {budget:g} seconds',
+            'status': 'timeout',
+            'limit': 'wall_time',
+            'partial': True,
+            'deadline': budget,
+            'stdout': clip_output(partial['stdout']),
+            'stderr': clip_output(partial['stderr']),
+            'output_handle': output_handle(partial),
+            'run_id': partial['run_id']
         }), 408
+    except InvalidDeadline as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Set "deadline" or X-Request-Deadline to a positive number of seconds',
+            'status': 'invalid_input'
+        }), e.status_code
+    except Cancelled:
+        return jsonify({
+            'success': False,
+            'error': 'Client disconnected',
+            'message': 'The request was abandoned before compilation finished',
+            'status': 'cancelled'
+        }), CLIENT_CLOSED
+    except FileNotFoundError:
+        return jsonify({
+            'success': False,
+            'error': 'tamarin-prover not found',
+            'message': 'Tamarin Prover is not installed or not in PATH',
+            'status': 'missing_binary'
+        }), 500
+    except Saturated as e:
+        return saturated_response(e, {
+            'success': False,
+            'error': str(e),
+            'message': 'Tamarin Prover is busy. Please retry after the indicated delay.',
+            'status': 'busy'
+        })
+    except QuotaExceeded as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'The theory does not fit in the server workspace',
+            'status': 'quota_exceeded'
+        }), e.status_code
     except Exception as e:
         return jsonify({
             'success': False,
@@ -723,1205 +847,431 @@ def n8n_compile():
             'status': 'internal_error'
         }), 500
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'tamarin_available': tamarin_installed,
-        'tamarin_installing': tamarin_installing
-    })
+@app.route('/tamarin/live', methods=['POST'])
+def tamarin_live():
+    """
+    Check-as-you-type endpoint for the editor.
+    
+    Each request carries a client session id. A new request for a session
+    kills the prover still checking that session's previous text, which then
+    answers 409, so live checking costs at most one prover per editor.
+    """
+    if not tamarin_installed:
+        return jsonify({
+            'success': False,
+            'error': 'Tamarin Prover is not yet installed. Please wait for installation to complete.'
+        }), 503
+    
+    data = request.get_json(silent=True) or {}
+    spthy_code = data.get('code', '')
+    session = data.get('session')
+    if not session:
+        return jsonify({'success': False, 'error': 'No session provided'}), 400
+    if not spthy_code:
+        return jsonify({'success': False, 'error': 'No code provided'}), 400
+    
+    token = live_sessions.supersede(str(session))
+    try:
+        with cancel_on_disconnect(token):
+            # Live checks are superseded within seconds, so they are not kept in the run history
+            result = run_prover_cached(spthy_code, 'check', timeout=LIVE_TIMEOUT, cancel=token, record=False)
+    except Cancelled:
+        return jsonify({'success': False, 'status': 'cancelled', 'error': 'Superseded by a newer check'}), 409
+    except subprocess.TimeoutExpired:
+        return jsonify({'success': False, 'status': 'timeout', 'limit': 'wall_time',
+                        'error': f'Check timed out after {LIVE_TIMEOUT} seconds'}), 408
+    except FileNotFoundError:
+        return jsonify({'success': False, 'status': 'missing_binary',
+                        'error': 'tamarin-prover not found. Installation may have failed.'}), 500
+    except Saturated as e:
+        return saturated_response(e, {'success': False, 'status': 'busy', 'error': str(e)})
+    except QuotaExceeded as e:
+        return jsonify({'success': False, 'status': 'quota_exceeded', 'error': str(e)}), e.status_code
+    finally:
+        live_sessions.finish(str(session), token)
+    
+    return jsonify(n8n_result(result, source='live'))
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))banner.ready {
-            background: #d4edda;
-            border-color: #c3e6cb;
-        }
-        
-        .upload-area { 
-            border: 3px dashed #3498db; 
-            padding: 50px; 
-            text-align: center; 
-            margin: 30px 0; 
-            border-radius: 15px;
-            transition: all 0.3s ease;
-            cursor: pointer;
-            background: #f8f9fa;
-        }
-        
-        .upload-area:hover { 
-            border-color: #2980b9; 
-            background: #e3f2fd;
-            transform: translateY(-2px);
-        }
-        
-        .upload-area.dragover { 
-            border-color: #27ae60; 
-            background: #e8f5e8;
-            transform: scale(1.02);
-        }
-        
-        .upload-icon {
-            font-size: 3rem;
-            margin-bottom: 15px;
-            color: #3498db;
+def compile_batch_item(spthy_code):
+    """Compile one batch theory, reporting failures in the item instead of raising"""
+    try:
+        result = run_prover_cached(spthy_code, 'check', timeout=COMPILE_TIMEOUT, bounded=False)
+    except subprocess.TimeoutExpired:
+        return {
+            'success': False,
+            'error': 'Compilation timed out',
+            'message': f'Tamarin compilation timed out after {COMPILE_TIMEOUT} seconds',
+            'status': 'timeout',
+            'limit': 'wall_time'
         }
-        
-        textarea { 
-            width: 100%; 
-            height: 300px; 
-            margin: 20px 0; 
-            padding: 20px;
-            border: 2px solid #e0e0e0;
-            border-radius: 12px;
-            font-family: 'Monaco', 'Menlo', 'Courier New', monospace;
-            font-size: 14px;
-            resize: vertical;
-            transition: border-color 0.3s ease;
-            background: #fafafa;
+    except FileNotFoundError:
+        return {
+            'success': False,
+            'error': 'tamarin-prover not found',
+            'message': 'Tamarin Prover is not installed or not in PATH',
+            'status': 'missing_binary'
         }
-        
-        textarea:focus { 
-            border-color: #3498db; 
-            outline: none;
-            background: white;
-            box-shadow: 0 0 0 3px rgba(52,152,219,0.1);
-        }
-        
-        .btn { 
-            background: linear-gradient(135deg, #3498db, #2980b9); 
-            color: white; 
-            padding: 16px 40px; 
-            border: none; 
-            border-radius: 50px;
-            cursor: pointer; 
-            font-size: 18px;
-            font-weight: 600;
-            transition: all 0.3s ease;
-            display: block;
-            margin: 30px auto;
-            box-shadow: 0 4px 15px rgba(52,152,219,0.3);
-        }
-        
-        .btn:hover { 
-            transform: translateY(-3px); 
-            box-shadow: 0 8px 25px rgba(52,152,219,0.4);
-        }
-        
-        .btn:disabled { 
-            background: #bdc3c7; 
-            cursor: not-allowed; 
-            transform: none;
-            box-shadow: none;
-        }
-        
-        .result { 
-            background: #f8f9fa; 
-            padding: 25px; 
-            margin: 25px 0; 
-            border-left: 5px solid #3498db; 
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-        }
-        
-        .error { 
-            border-left-color: #e74c3c; 
-            background: #fce4ec;
-        }
-        
-        .success { 
-            border-left-color: #27ae60; 
-            background: #e8f5e8;
-        }
-        
-        .warning { 
-            border-left-color: #f39c12; 
-            background: #fff3e0;
-        }
-        
-        pre { 
-            background: #2c3e50; 
-            color: #ecf0f1; 
-            padding: 20px; 
-            border-radius: 10px; 
-            overflow-x: auto;
-            font-size: 14px;
-            line-height: 1.5;
-            margin: 15px 0;
-            white-space: pre-wrap;
-        }
-        
-        .loading { 
-            text-align: center; 
-            color: #3498db;
-            animation: pulse 2s infinite;
-        }
-        
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.6; }
-        }
-        
-        .file-info { 
-            background: linear-gradient(135deg, #e3f2fd, #bbdefb); 
-            padding: 15px; 
-            border-radius: 10px; 
-            margin: 15px 0;
-            font-size: 14px;
-            border-left: 4px solid #2196f3;
-        }
-        
-        .footer {
-            background: #f8f9fa;
-            padding: 20px;
-            text-align: center;
-            color: #7f8c8d;
-            border-top: 1px solid #e0e0e0;
-        }
-        
-        .mode-selector {
-            display: flex;
-            gap: 10px;
-            margin: 20px 0;
-            justify-content: center;
-        }
-        
-        .mode-btn {
-            padding: 10px 20px;
-            border: 2px solid #3498db;
-            background: white;
-            color: #3498db;
-            border-radius: 25px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        
-        .mode-btn.active {
-            background: #3498db;
-            color: white;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🔒 Tamarin Prover Web Interface</h1>
-            <p>Security protocol verification using Tamarin Prover</p>
-        </div>
-        
-        <div class="content">
-            <div id="statusBanner" class="status-banner installing">
-                <strong>🔄 Installing Tamarin Prover...</strong>
-                <p>Please wait while we set up the verification engine in the background.</p>
-            </div>
-            
-            <form id="uploadForm">
-                <div class="mode-selector">
-                    <button type="button" class="mode-btn active" id="checkMode">✓ Check Theory</button>
-                    <button type="button" class="mode-btn" id="proveMode">🔍 Prove Lemmas</button>
-                </div>
-                
-                <div class="upload-area" id="uploadArea">
-                    <input type="file" id="fileInput" accept=".spthy" style="display: none;">
-                    <div class="upload-icon">📁</div>
-                    <div>
-                        <strong>Click to upload .spthy file</strong><br>
-                        <small style="color: #7f8c8d;">or drag & drop here</small>
-                    </div>
-                </div>
-                
-                <div id="fileInfo" class="file-info" style="display: none;"></div>
-                
-                <textarea 
-                    id="codeArea" 
-                    placeholder="Or paste your Tamarin theory code here..."
-                ></textarea>
-                
-                <button type="submit" class="btn" id="processBtn">
-                    🔒 Run Tamarin Analysis
-                </button>
-            </form>
-            
-            <div id="results"></div>
-        </div>
-        
-        <div class="footer">
-            <p>Powered by <a href="https://tamarin-prover.github.io/" target="_blank">Tamarin Prover</a></p>
-        </div>
-    </div>
-
-    <script>
-        const fileInput = document.getElementById('fileInput');
-        const codeArea = document.getElementById('codeArea');
-        const uploadForm = document.getElementById('uploadForm');
-        const uploadArea = document.getElementById('uploadArea');
-        const results = document.getElementById('results');
-        const processBtn = document.getElementById('processBtn');
-        const fileInfo = document.getElementById('fileInfo');
-        const checkMode = document.getElementById('checkMode');
-        const proveMode = document.getElementById('proveMode');
-        const statusBanner = document.getElementById('statusBanner');
-        
-        let currentMode = 'check';
-
-        // Check Tamarin status periodically
-        function checkTamarinStatus() {
-            fetch('/tamarin-status')
-                .then(response => response.json())
-                .then(data => {
-                    if (data.installed) {
-                        statusBanner.className = 'status-banner ready';
-                        statusBanner.innerHTML = '<strong>✅ Tamarin Prover Ready!</strong><p>You can now analyze your security protocols.</p>';
-                        processBtn.disabled = false;
-                    } else if (data.installing) {
-                        statusBanner.className = 'status-banner installing';
-                        statusBanner.innerHTML = '<strong>🔄 Installing Tamarin Prover...</strong><p>Please wait while we set up the verification engine.</p>';
-                        processBtn.disabled = true;
-                    } else {
-                        statusBanner.className = 'status-banner';
-                        statusBanner.innerHTML = '<strong>⚠️ Tamarin Installation Failed</strong><p>Please refresh the page to retry installation.</p>';
-                        processBtn.disabled = true;
-                    }
-                })
-                .catch(() => {
-                    // Keep checking
-                });
-        }
-
-        // Check status every 5 seconds
-        setInterval(checkTamarinStatus, 5000);
-        checkTamarinStatus(); // Initial check
-
-        // Mode selection
-        checkMode.addEventListener('click', () => {
-            currentMode = 'check';
-            checkMode.classList.add('active');
-            proveMode.classList.remove('active');
-            processBtn.innerHTML = '✓ Check Theory';
-        });
-        
-        proveMode.addEventListener('click', () => {
-            currentMode = 'prove';
-            proveMode.classList.add('active');
-            checkMode.classList.remove('active');
-            processBtn.innerHTML = '🔍 Prove Lemmas';
-        });
-
-        // File upload handling
-        uploadArea.addEventListener('click', () => fileInput.click());
-        
-        uploadArea.addEventListener('dragover', (e) => {
-            e.preventDefault();
-            uploadArea.classList.add('dragover');
-        });
-        
-        uploadArea.addEventListener('dragleave', () => {
-            uploadArea.classList.remove('dragover');
-        });
-        
-        uploadArea.addEventListener('drop', (e) => {
-            e.preventDefault();
-            uploadArea.classList.remove('dragover');
-            const files = e.dataTransfer.files;
-            if (files.length > 0) {
-                handleFile(files[0]);
-            }
-        });
-
-        fileInput.addEventListener('change', (e) => {
-            if (e.target.files.length > 0) {
-                handleFile(e.target.files[0]);
-            }
-        });
-
-        function handleFile(file) {
-            if (!file.name.endsWith('.spthy')) {
-                alert('Please upload a .spthy file');
-                return;
-            }
-            
-            fileInfo.style.display = 'block';
-            fileInfo.innerHTML = `
-                <strong>📄 ${file.name}</strong> 
-                <span style="color: #666; margin-left: 10px;">${(file.size/1024).toFixed(1)} KB</span>
-            `;
-            
-            const reader = new FileReader();
-            reader.onload = (e) => {
-                codeArea.value = e.target.result;
-            };
-            reader.readAsText(file);
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'message': 'Internal server error during compilation',
+            'status': 'internal_error'
         }
+    return n8n_result(result, source='n8n_batch')
 
-        // Form submission
-        uploadForm.addEventListener('submit', async (e) => {
-            e.preventDefault();
-            const code = codeArea.value.trim();
-            
-            if (!code) {
-                alert('Please provide Tamarin theory code to analyze');
-                return;
-            }
-
-            processBtn.disabled = true;
-            const originalText = processBtn.innerHTML;
-            processBtn.innerHTML = '⏳ Processing...';
-            
-            results.innerHTML = `
-                <div class="result loading">
-                    <h3>🔄 Running Tamarin Analysis...</h3>
-                    <p>Please wait while we ${currentMode === 'check' ? 'check your theory' : 'prove the lemmas'}</p>
-                </div>
-            `;
-
-            try {
-                const response = await fetch('/tamarin', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({code: code, mode: currentMode})
-                });
-                
-                const result = await response.json();
-                displayResults(result);
-                
-            } catch (error) {
-                results.innerHTML = `
-                    <div class="result error">
-                        <h3>❌ Network Error</h3>
-                        <p>${error.message}</p>
-                    </div>
-                `;
-            } finally {
-                processBtn.disabled = false;
-                processBtn.innerHTML = originalText;
-            }
-        });
-        
-        function displayResults(result) {
-            if (!result.success) {
-                results.innerHTML = `
-                    <div class="result error">
-                        <h3>❌ Tamarin Error</h3>
-                        <pre>${result.error}</pre>
-                    </div>
-                `;
-                return;
-            }
-            
-            // Display the raw tamarin output
-            if (result.output) {
-                const hasErrors = result.output.toLowerCase().includes('error') || 
-                                 result.output.toLowerCase().includes('failed') ||
-                                 result.returncode !== 0;
-                
-                const hasWarnings = result.output.toLowerCase().includes('warning');
-                
-                let resultClass = 'success';
-                let resultIcon = '✅';
-                let resultTitle = 'Analysis Complete';
-                
-                if (hasErrors) {
-                    resultClass = 'error';
-                    resultIcon = '❌';
-                    resultTitle = 'Analysis Failed';
-                } else if (hasWarnings) {
-                    resultClass = 'warning';
-                    resultIcon = '⚠️';
-                    resultTitle = 'Analysis Complete with Warnings';
-                }
-                
-                results.innerHTML = `
-                    <div class="result ${resultClass}">
-                        <h3>${resultIcon} ${resultTitle}</h3>
-                        <pre>${result.output}</pre>
-                    </div>
-                `;
-            } else {
-                results.innerHTML = `
-                    <div class="result success">
-                        <h3>✅ Analysis Complete</h3>
-                        <p>Tamarin analysis completed successfully.</p>
-                    </div>
-                `;
-            }
-        }
-    </script>
-</body>
-</html>
-'''
-
-def analyze_tamarin_output(stdout, stderr, returncode):
-    """
-    Analyze Tamarin output to determine success/failure and extract meaningful information.
+@app.route('/n8n/compile-batch', methods=['POST'])
+def n8n_compile_batch():
     """
-    full_output = stdout + stderr
-    
-    # Check for parse errors (most critical)
-    parse_error_indicators = [
-        'parse error', 'syntax error', 'lexical error',
-        'unexpected token', 'parsing failed'
-    ]
-    
-    # Check for well-formedness errors
-    wellformedness_errors = [
-        'undeclared function', 'undeclared sort', 'type error',
-        'restriction not satisfied', 'unbound variable'
-    ]
-    
-    # Analyze the output
-    has_parse_error = any(indicator in full_output.lower() for indicator in parse_error_indicators)
-    has_wellformedness_error = any(indicator in full_output.lower() for indicator in wellformedness_errors)
+    Compile an array of theories in one request.
     
-    # Determine overall success
-    if returncode == 0 and not has_parse_error and not has_wellformedness_error:
-        success = True
-        status = "success"
-    elif has_parse_error:
-        success = False
-        status = "parse_error"
-    elif has_wellformedness_error:
-        success = False
-        status = "wellformedness_error"
-    else:
-        success = returncode == 0
-        status = "unknown" if success else "error"
-    
-    return {
-        'success': success,
-        'status': status,
-        'has_parse_error': has_parse_error,
-        'has_wellformedness_error': has_wellformedness_error,
-        'returncode': returncode
-    }
-
-def get_user_friendly_message(analysis):
-    """Generate user-friendly message based on analysis results."""
-    if analysis['success']:
-        return "✅ Theory compiled successfully! No syntax or well-formedness errors found."
-    elif analysis['has_parse_error']:
-        return "❌ Parse error detected. Please check your syntax."
-    elif analysis['has_wellformedness_error']:
-        return "❌ Well-formedness error detected. Please check your theory structure."
-    else:
-        return "❌ Compilation failed. Please check the output for details."
-
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE)
-
-@app.route('/tamarin-status')
-def tamarin_status():
-    """Check if Tamarin is installed and ready"""
-    return jsonify({
-        'installed': tamarin_installed,
-        'installing': tamarin_installing,
-        'log': installation_log[-5:]  # Last 5 log entries
-    })
-
-@app.route('/tamarin', methods=['POST'])
-def tamarin_analysis():
+    Identical theories are compiled once. Results come back as one JSON
+    document in input order, or with ?stream=1 as NDJSON lines in completion
+    order.
+    """
     if not tamarin_installed:
         return jsonify({
             'success': False,
-            'error': 'Tamarin Prover is not yet installed. Please wait for installation to complete.'
+            'error': 'Tamarin Prover not available',
+            'message': 'Tamarin Prover is still installing. Please try again in a few minutes.',
+            'status': 'not_ready'
         }), 503
     
     try:
-        data = request.get_json()
-        spthy_code = data['code']
-        mode = data.get('mode', 'check')  # 'check' or 'prove'
-        
-        # Create a temporary file for the spthy code
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.spthy', delete=False) as f:
-            f.write(spthy_code)
-            temp_file = f.name
-        
-        try:
-            # Prepare tamarin command based on mode
-            if mode == 'check':
-                cmd = ['tamarin-prover', '--check-only', temp_file]
-            else:
-                cmd = ['tamarin-prover', '--prove', temp_file]
-            
-            # Run tamarin-prover
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            
-            return jsonify({
-                'success': True,
-                'output': result.stdout if result.stdout else result.stderr,
-                'returncode': result.returncode,
-                'mode': mode
-            })
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-        
-    except subprocess.TimeoutExpired:
+        items = parse_items(request.get_json(silent=True) or {})
+    except ValueError as e:
         return jsonify({
             'success': False,
-            'error': 'Analysis timed out after 2 minutes'
-        })
-    except FileNotFoundError:
+            'error': 'Invalid batch',
+            'message': str(e),
+            'status': 'invalid_input'
+        }), 400
+    
+    if len(items) > BATCH_MAX_ITEMS:
         return jsonify({
             'success': False,
-            'error': 'tamarin-prover not found. Installation may have failed.'
-        })
-    except Exception as e:
-        return jsonify({
+            'error': 'Batch too large',
+            'message': f'A batch may contain at most {BATCH_MAX_ITEMS} items',
+            'status': 'invalid_input'
+        }), 413
+    
+    try:
+        governor.admit('check')
+    except Saturated as e:
+        return saturated_response(e, {
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'message': 'Tamarin Prover is busy. Please retry after the indicated delay.',
+            'status': 'busy'
         })
-
-@app.route('/n8n/compile', methods=['POST'])
-def n8n_compile():
-    """N8N-compatible endpoint for compiling Tamarin theories."""
-    if not tamarin_installed:
-        return jsonify({
-            'success': False,
-            'error': 'Tamarin Prover not available',
-            'message': 'Tamarin Prover is still installing. Please try again in a few minutes.',
-            'status': 'not_ready'
-        }), 503
     
+    def item_key(code):
+        normalized = normalize(code)[0]
+        return cache_key(normalized, 'check', backend.flags('check'), backend.version(normalized, 'check'))
+    
+    batch = run_batch(
+        items,
+        item_key,
+        compile_batch_item,
+        BATCH_WORKERS
+    )
+    
+    def item_body(item, result, duplicate):
+        return {'id': item['id'], 'index': item['index'], 'deduplicated': duplicate, **result}
+    
+    if request.args.get('stream') in ('1', 'true'):
+        def generate():
+            for entry in batch:
+                yield json.dumps(item_body(*entry)) + '\n'
+        return Response(generate(), mimetype='application/x-ndjson')
+    
+    results = sorted((item_body(*entry) for entry in batch), key=lambda r: r['index'])
+    return jsonify({
+        'success': all(r['success'] for r in results),
+        'count': len(results),
+        'unique': sum(not r['deduplicated'] for r in results),
+        'results': results
+    })
+
+def run_job(job):
+    """Run a queued job and return its final status, result and error"""
     try:
-        if request.is_json:
-            data = request.get_json()
-            spthy_code = data.get('code', '')
+        if job.mode == 'check':
+            result = run_prover_cached(job.code, 'check', JOB_TIMEOUT, on_output=job.append_output, bounded=False,
+                                       cancel=job.cancel)
         else:
-            spthy_code = request.form.get('code', '')
-        
-        if not spthy_code:
-            return jsonify({
-                'success': False,
-                'error': 'No code provided',
-                'message': 'Please provide Tamarin theory code in the "code" field',
-                'status': 'invalid_input'
-            }), 400
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.spthy', delete=False) as f:
-            f.write(spthy_code)
-            temp_file = f.name
-        
-        try:
-            result = subprocess.run(
-                ['tamarin-prover', '--check-only', temp_file],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            
-            analysis = analyze_tamarin_output(result.stdout, result.stderr, result.returncode)
-            
-            response_data = {
-                'success': analysis['success'],
-                'status': analysis['status'],
-                'returncode': result.returncode,
-                'stdout': result.stdout,
-                'stderr': result.stderr,
-                'analysis': {
-                    'has_parse_error': analysis['has_parse_error'],
-                    'has_wellformedness_error': analysis['has_wellformedness_error'],
-                },
-                'message': get_user_friendly_message(analysis)
-            }
-            
-            status_code = 200 if analysis['success'] else 400
-            return jsonify(response_data), status_code
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-        
+            result = run_prove(job.code, JOB_TIMEOUT, parallel=job.parallel, on_output=job.append_output,
+                               bounded=False, cancel=job.cancel)
     except subprocess.TimeoutExpired:
+        return 'timeout', None, f'Analysis timed out after {JOB_TIMEOUT} seconds'
+    except Cancelled:
+        return 'cancelled', None, 'Cancelled by client'
+    except FileNotFoundError:
+        return 'failed', None, 'tamarin-prover not found. Installation may have failed.'
+
+    analysis = analyze_tamarin_output(result, source='job')
+    job_result = {
+        'success': analysis['success'],
+        'verdict': analysis['status'],
+        'returncode': result['returncode'],
+        'duration': result['duration'],
+        'cached': result['cached'],
+        'limit': result.get('limit'),
+        'message': get_user_friendly_message(analysis, result.get('limit')),
+        'run_id': result.get('run_id'),
+        'output_handle': output_handle(result),
+        'parsed': analysis['parsed']
+    }
+    if 'lemmas' in result:
+        analysis['parsed']['lemmas'] = result['lemmas']
+        job_result['lemmas'] = result['lemmas']
+        job_result['assumptions_hold'] = result['assumptions_hold']
+    return 'completed', job_result, None
+
+def publish_job_event(job):
+    """Tell event subscribers that a job changed state or produced output"""
+    event_bus.publish('job', job_id=job.id, status=job.status, output_lines=job.output_lines())
+
+job_queue = JobQueue(run_job, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, on_change=publish_job_event)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a theory for asynchronous analysis and return its job id"""
+    if not tamarin_installed:
         return jsonify({
             'success': False,
-            'error': 'Compilation timed out',
-            'message': 'Tamarin compilation timed out after 60 seconds',
-            'status': 'timeout'
-        }), 408
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e),
-            'message': 'Internal server error during compilation',
-            'status': 'internal_error'
-        }), 500
+            'error': 'Tamarin Prover is not yet installed. Please wait for installation to complete.'
+        }), 503
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'tamarin_available': tamarin_installed,
-        'tamarin_installing': tamarin_installing
+    data = request.get_json(silent=True) or {}
+    spthy_code = data.get('code', '')
+    mode = data.get('mode', 'prove')
+
+    if not spthy_code:
+        return jsonify({'success': False, 'error': 'No code provided'}), 400
+    if mode not in ('check', 'prove'):
+        return jsonify({'success': False, 'error': f'Unknown mode: {mode}'}), 400
+
+    try:
+        job = job_queue.submit(spthy_code, mode, parallel=bool(data.get('parallel', False)))
+    except QueueFull as e:
+        return saturated_response(
+            Saturated(f'Job queue is full ({e})', 429, JOB_RETRY_AFTER, job_queue.depth()),
+            {'success': False, 'error': f'Job queue is full ({e})'}
+        )
+
+    response = jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'queue_depth': job_queue.depth()
     })
+    response.headers['Location'] = f'/jobs/{job.id}'
+    return response, 202
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))px auto;
-            box-shadow: 0 4px 15px rgba(52,152,219,0.3);
-        }
-        
-        .btn:hover { 
-            transform: translateY(-3px); 
-            box-shadow: 0 8px 25px rgba(52,152,219,0.4);
-        }
-        
-        .btn:disabled { 
-            background: #bdc3c7; 
-            cursor: not-allowed; 
-            transform: none;
-            box-shadow: none;
-        }
-        
-        .result { 
-            background: #f8f9fa; 
-            padding: 25px; 
-            margin: 25px 0; 
-            border-left: 5px solid #3498db; 
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-        }
-        
-        .error { 
-            border-left-color: #e74c3c; 
-            background: #fce4ec;
-        }
-        
-        .success { 
-            border-left-color: #27ae60; 
-            background: #e8f5e8;
-        }
-        
-        .warning { 
-            border-left-color: #f39c12; 
-            background: #fff3e0;
-        }
-        
-        pre { 
-            background: #2c3e50; 
-            color: #ecf0f1; 
-            padding: 20px; 
-            border-radius: 10px; 
-            overflow-x: auto;
-            font-size: 14px;
-            line-height: 1.5;
-            margin: 15px 0;
-            white-space: pre-wrap;
-        }
-        
-        .loading { 
-            text-align: center; 
-            color: #3498db;
-            animation: pulse 2s infinite;
-        }
-        
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.6; }
-        }
-        
-        .file-info { 
-            background: linear-gradient(135deg, #e3f2fd, #bbdefb); 
-            padding: 15px; 
-            border-radius: 10px; 
-            margin: 15px 0;
-            font-size: 14px;
-            border-left: 4px solid #2196f3;
-        }
-        
-        .footer {
-            background: #f8f9fa;
-            padding: 20px;
-            text-align: center;
-            color: #7f8c8d;
-            border-top: 1px solid #e0e0e0;
-        }
-        
-        .mode-selector {
-            display: flex;
-            gap: 10px;
-            margin: 20px 0;
-            justify-content: center;
-        }
-        
-        .mode-btn {
-            padding: 10px 20px;
-            border: 2px solid #3498db;
-            background: white;
-            color: #3498db;
-            border-radius: 25px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        
-        .mode-btn.active {
-            background: #3498db;
-            color: white;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🔒 Tamarin Prover Web Interface</h1>
-            <p>Security protocol verification using Tamarin Prover</p>
-        </div>
-        
-        <div class="content">
-            <form id="uploadForm">
-                <div class="mode-selector">
-                    <button type="button" class="mode-btn active" id="checkMode">✓ Check Theory</button>
-                    <button type="button" class="mode-btn" id="proveMode">🔍 Prove Lemmas</button>
-                </div>
-                
-                <div class="upload-area" id="uploadArea">
-                    <input type="file" id="fileInput" accept=".spthy" style="display: none;">
-                    <div class="upload-icon">📁</div>
-                    <div>
-                        <strong>Click to upload .spthy file</strong><br>
-                        <small style="color: #7f8c8d;">or drag & drop here</small>
-                    </div>
-                </div>
-                
-                <div id="fileInfo" class="file-info" style="display: none;"></div>
-                
-                <textarea 
-                    id="codeArea" 
-                    placeholder="Or paste your Tamarin theory code here..."
-                ></textarea>
-                
-                <button type="submit" class="btn" id="processBtn">
-                    🔒 Run Tamarin Analysis
-                </button>
-            </form>
-            
-            <div id="results"></div>
-        </div>
-        
-        <div class="footer">
-            <p>Powered by <a href="https://tamarin-prover.github.io/" target="_blank">Tamarin Prover</a></p>
-        </div>
-    </div>
-
-    <script>
-        const fileInput = document.getElementById('fileInput');
-        const codeArea = document.getElementById('codeArea');
-        const uploadForm = document.getElementById('uploadForm');
-        const uploadArea = document.getElementById('uploadArea');
-        const results = document.getElementById('results');
-        const processBtn = document.getElementById('processBtn');
-        const fileInfo = document.getElementById('fileInfo');
-        const checkMode = document.getElementById('checkMode');
-        const proveMode = document.getElementById('proveMode');
-        
-        let currentMode = 'check';
-
-        // Mode selection
-        checkMode.addEventListener('click', () => {
-            currentMode = 'check';
-            checkMode.classList.add('active');
-            proveMode.classList.remove('active');
-            processBtn.innerHTML = '✓ Check Theory';
-        });
-        
-        proveMode.addEventListener('click', () => {
-            currentMode = 'prove';
-            proveMode.classList.add('active');
-            checkMode.classList.remove('active');
-            processBtn.innerHTML = '🔍 Prove Lemmas';
-        });
-
-        // File upload handling
-        uploadArea.addEventListener('click', () => fileInput.click());
-        
-        uploadArea.addEventListener('dragover', (e) => {
-            e.preventDefault();
-            uploadArea.classList.add('dragover');
-        });
-        
-        uploadArea.addEventListener('dragleave', () => {
-            uploadArea.classList.remove('dragover');
-        });
-        
-        uploadArea.addEventListener('drop', (e) => {
-            e.preventDefault();
-            uploadArea.classList.remove('dragover');
-            const files = e.dataTransfer.files;
-            if (files.length > 0) {
-                handleFile(files[0]);
-            }
-        });
-
-        fileInput.addEventListener('change', (e) => {
-            if (e.target.files.length > 0) {
-                handleFile(e.target.files[0]);
-            }
-        });
-
-        function handleFile(file) {
-            if (!file.name.endsWith('.spthy')) {
-                alert('Please upload a .spthy file');
-                return;
-            }
-            
-            fileInfo.style.display = 'block';
-            fileInfo.innerHTML = `
-                <strong>📄 ${file.name}</strong> 
-                <span style="color: #666; margin-left: 10px;">${(file.size/1024).toFixed(1)} KB</span>
-            `;
-            
-            const reader = new FileReader();
-            reader.onload = (e) => {
-                codeArea.value = e.target.result;
-            };
-            reader.readAsText(file);
-        }
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return job status, output from the given line offset and the verdict"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
 
-        // Form submission
-        uploadForm.addEventListener('submit', async (e) => {
-            e.preventDefault();
-            const code = codeArea.value.trim();
-            
-            if (!code) {
-                alert('Please provide Tamarin theory code to analyze');
-                return;
-            }
-
-            processBtn.disabled = true;
-            const originalText = processBtn.innerHTML;
-            processBtn.innerHTML = '⏳ Processing...';
-            
-            results.innerHTML = `
-                <div class="result loading">
-                    <h3>🔄 Running Tamarin Analysis...</h3>
-                    <p>Please wait while we ${currentMode === 'check' ? 'check your theory' : 'prove the lemmas'}</p>
-                </div>
-            `;
-
-            try {
-                const response = await fetch('/tamarin', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({code: code, mode: currentMode})
-                });
-                
-                const result = await response.json();
-                displayResults(result);
-                
-            } catch (error) {
-                results.innerHTML = `
-                    <div class="result error">
-                        <h3>❌ Network Error</h3>
-                        <p>${error.message}</p>
-                    </div>
-                `;
-            } finally {
-                processBtn.disabled = false;
-                processBtn.innerHTML = originalText;
-            }
-        });
-        
-        function displayResults(result) {
-            if (!result.success) {
-                results.innerHTML = `
-                    <div class="result error">
-                        <h3>❌ Tamarin Error</h3>
-                        <pre>${result.error}</pre>
-                    </div>
-                `;
-                return;
-            }
-            
-            // Display the raw tamarin output
-            if (result.output) {
-                const hasErrors = result.output.toLowerCase().includes('error') || 
-                                 result.output.toLowerCase().includes('failed') ||
-                                 result.returncode !== 0;
-                
-                const hasWarnings = result.output.toLowerCase().includes('warning');
-                
-                let resultClass = 'success';
-                let resultIcon = '✅';
-                let resultTitle = 'Analysis Complete';
-                
-                if (hasErrors) {
-                    resultClass = 'error';
-                    resultIcon = '❌';
-                    resultTitle = 'Analysis Failed';
-                } else if (hasWarnings) {
-                    resultClass = 'warning';
-                    resultIcon = '⚠️';
-                    resultTitle = 'Analysis Complete with Warnings';
-                }
-                
-                results.innerHTML = `
-                    <div class="result ${resultClass}">
-                        <h3>${resultIcon} ${resultTitle}</h3>
-                        <pre>${result.output}</pre>
-                    </div>
-                `;
-            } else {
-                results.innerHTML = `
-                    <div class="result success">
-                        <h3>✅ Analysis Complete</h3>
-                        <p>Tamarin analysis completed successfully.</p>
-                    </div>
-                `;
-            }
-        }
-    </script>
-</body>
-</html>
-'''
+    offset = request.args.get('offset', 0, type=int)
+    return jsonify({'success': True, **job.to_dict(offset=offset)})
 
-def analyze_tamarin_output(stdout, stderr, returncode):
-    """
-    Analyze Tamarin output to determine success/failure and extract meaningful information.
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job, killing its prover"""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
     
-    Tamarin output patterns:
-    - Success: "summary of summaries: X (Y proved, Z disproved, W contradictory)"
-    - Parse errors: "Parse error" or syntax errors
-    - Well-formedness errors: "restriction", "typing", etc.
-    """
-    full_output = stdout + stderr
+    state = job.to_dict(offset=job.output_lines())
+    if state['status'] not in ('queued', 'running', 'cancelled'):
+        return jsonify({'success': False, 'error': f'Job already {state["status"]}', **state}), 409
+    # A running job reports cancelled once its prover has been killed
+    return jsonify({'success': True, **state}), 200 if state['status'] == 'cancelled' else 202
+
+@app.route('/events', methods=['GET'])
+def events_long_poll():
+    """Long-poll for install and job events newer than ?since=<seq>"""
+    since = request.args.get('since', 0, type=int)
+    timeout = min(request.args.get('timeout', 25, type=float), EVENT_POLL_MAX)
+    events, missed = event_bus.wait(since, timeout)
+    return jsonify({
+        'events': events,
+        'last_seq': events[-1]['seq'] if events else since,
+        'missed': missed
+    })
+
+@app.route('/events/stream', methods=['GET'])
+def events_stream():
+    """Stream install and job events as Server-Sent Events, resuming after Last-Event-ID"""
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', event_bus.last_seq(), type=int)
     
-    # Check for parse errors (most critical)
-    parse_error_indicators = [
-        'parse error', 'syntax error', 'lexical error',
-        'unexpected token', 'parsing failed'
-    ]
+    def generate():
+        seq = since
+        while True:
+            events, missed = event_bus.wait(seq, EVENT_KEEPALIVE)
+            if missed:
+                yield sse_event('resync', {'since': seq})
+            if not events:
+                yield ': keepalive\n\n'
+            for event in events:
+                seq = event['seq']
+                yield sse_event(event['type'], event, event_id=seq)
     
-    # Check for well-formedness errors
-    wellformedness_errors = [
-        'undeclared function', 'undeclared sort', 'type error',
-        'restriction not satisfied', 'unbound variable'
-    ]
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/runs', methods=['GET'])
+def list_runs():
+    """
+    List past prover runs, newest first.
     
-    # Check for proof results (when proving lemmas)
-    proof_indicators = [
-        'verified', 'falsified', 'analysis complete',
-        'summary of summaries'
-    ]
+    Filters: theory_hash, mode, status, lemma, verdict. Page backwards with
+    ?before=<created_at of the last run seen>.
+    """
+    runs = run_history.list(
+        theory_hash=request.args.get('theory_hash'),
+        mode=request.args.get('mode'),
+        status=request.args.get('status'),
+        lemma=request.args.get('lemma'),
+        verdict=request.args.get('verdict'),
+        before=request.args.get('before', type=float),
+        limit=max(1, min(request.args.get('limit', 50, type=int), RUNS_PAGE_MAX))
+    )
+    return jsonify({'success': True, 'count': len(runs), 'runs': runs})
+
+@app.route('/runs/<run_id>', methods=['GET'])
+def get_run(run_id):
+    """Return one past run with its lemma verdicts and output, clipped like analysis responses"""
+    run = run_history.get(run_id)
+    if run is None:
+        return jsonify({'success': False, 'error': 'Unknown run'}), 404
+    return jsonify({
+        'success': True,
+        **run,
+        'stdout': clip_output(run['stdout']),
+        'stderr': clip_output(run['stderr']),
+        'output_handle': output_handle(dict(run, run_id=run_id))
+    })
+
+@app.route('/runs/<run_id>/output', methods=['GET'])
+def get_run_output(run_id):
+    """
+    Page through the full output of a past run.
     
-    # Success indicators
-    success_indicators = [
-        'wellformedness check succeeded',
-        'all lemmas proved',
-        'theory loaded successfully'
-    ]
+    ?stream=stdout|stderr picks the stream and ?offset=&limit= a character
+    range of it. With ?format=text the whole stream is returned as plain
+    text, honouring HTTP Range requests. Output is as the prover wrote it,
+    so error locations refer to the normalized theory.
     
-    # Analyze the output
-    has_parse_error = any(indicator in full_output.lower() for indicator in parse_error_indicators)
-    has_wellformedness_error = any(indicator in full_output.lower() for indicator in wellformedness_errors)
-    has_success_indicator = any(indicator in full_output.lower() for indicator in success_indicators)
+    The stored output is inflated as it is sent, or only up to the end of
+    the requested page, and never held in memory whole.
+    """
+    stream = request.args.get('stream', 'stdout')
+    if stream not in STREAMS:
+        return jsonify({'success': False, 'error': f'Unknown stream: {stream}'}), 400
+    stored = run_history.output(run_id, stream)
+    if stored is None:
+        return jsonify({'success': False, 'error': 'Unknown run'}), 404
     
-    # Determine overall success
-    if returncode == 0 and not has_parse_error and not has_wellformedness_error:
-        success = True
-        status = "success"
-    elif has_parse_error:
-        success = False
-        status = "parse_error"
-    elif has_wellformedness_error:
-        success = False
-        status = "wellformedness_error"
-    else:
-        success = returncode == 0
-        status = "unknown" if success else "error"
+    if request.args.get('format') == 'text':
+        response = Response(stored.byte_chunks(), mimetype='text/plain')
+        return response.make_conditional(request, accept_ranges=True, complete_length=stored.length)
     
-    return {
-        'success': success,
-        'status': status,
-        'has_parse_error': has_parse_error,
-        'has_wellformedness_error': has_wellformedness_error,
-        'returncode': returncode
-    }
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = max(1, min(request.args.get('limit', OUTPUT_INLINE_CHARS, type=int), OUTPUT_PAGE_MAX))
+    page = []
+    position = 0
+    for chunk in stored.text_chunks():
+        if position + len(chunk) > offset:
+            page.append(chunk[max(0, offset - position):offset + limit - position])
+        position += len(chunk)
+        if position >= offset + limit:
+            break
+    page = ''.join(page)
+    end = offset + len(page)
+    return jsonify({
+        'success': True,
+        'run_id': run_id,
+        'stream': stream,
+        'offset': offset,
+        'size': stored.size,
+        'next_offset': end if end < stored.size else None,
+        'text': page
+    })
 
-def get_user_friendly_message(analysis):
-    """Generate user-friendly message based on analysis results."""
-    if analysis['success']:
-        return "✅ Theory compiled successfully! No syntax or well-formedness errors found."
-    elif analysis['has_parse_error']:
-        return "❌ Parse error detected. Please check your syntax."
-    elif analysis['has_wellformedness_error']:
-        return "❌ Well-formedness error detected. Please check your theory structure."
-    else:
-        return "❌ Compilation failed. Please check the output for details."
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Report result cache hit/miss counters"""
+    return jsonify(result_cache.snapshot())
 
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE)
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint, answered from the background prober's last result"""
+    prover = prover_probe.snapshot()
+    return jsonify({
+        'status': 'healthy',
+        'tamarin_available': prover['available'],
+        'tamarin_version': prover['version']
+    })
 
-@app.route('/tamarin', methods=['POST'])
-def tamarin_analysis():
-    try:
-        data = request.get_json()
-        spthy_code = data['code']
-        mode = data.get('mode', 'check')  # 'check' or 'prove'
-        
-        # Create a temporary file for the spthy code
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.spthy', delete=False) as f:
-            f.write(spthy_code)
-            temp_file = f.name
-        
-        try:
-            # Prepare tamarin command based on mode
-            if mode == 'check':
-                # Just check the theory syntax and wellformedness
-                cmd = ['tamarin-prover', '--check-only', temp_file]
-            else:  # prove mode
-                # Attempt to prove all lemmas
-                cmd = ['tamarin-prover', '--prove', temp_file]
-            
-            # Run tamarin-prover
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=120  # Increased timeout for proof attempts
-            )
-            
-            # Return the output
-            return jsonify({
-                'success': True,
-                'output': result.stdout if result.stdout else result.stderr,
-                'returncode': result.returncode,
-                'mode': mode
-            })
-            
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-        
-    except subprocess.TimeoutExpired:
-        return jsonify({
-            'success': False,
-            'error': 'Analysis timed out after 2 minutes'
-        })
-    except FileNotFoundError:
-        return jsonify({
-            'success': False,
-            'error': 'tamarin-prover not found. Please ensure Tamarin Prover is installed and in PATH.'
-        })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        })
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'alive'})
 
-@app.route('/n8n/compile', methods=['POST'])
-def n8n_compile():
+@app.route('/readyz', methods=['GET'])
+def readyz():
     """
-    N8N-compatible endpoint for compiling Tamarin theories.
-    Expects JSON with 'code' field containing the .spthy code.
-    Returns detailed success/failure response with analysis.
+    Readiness probe reporting the cached prover status and current load.
+    
+    Answers 503 while the prover is unavailable or the admission and job
+    queues are full, so orchestrators route new work to other replicas
+    instead of restarting one that is merely busy.
     """
-    try:
-        # Handle both JSON and form data
-        if request.is_json:
-            data = request.get_json()
-            spthy_code = data.get('code', '')
-        else:
-            spthy_code = request.form.get('code', '')
-        
-        if not spthy_code:
-            return jsonify({
-                'success': False,
-                'error': 'No code provided',
-                'message': 'Please provide Tamarin theory code in the "code" field',
-                'status': 'invalid_input'
-            }), 400
-        
-        # Create a temporary file for the spthy code
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.spthy', delete=False) as f:
-            f.write(spthy_code)
-            temp_file = f.name
-        
-        try:
-            # Run tamarin-prover with check-only flag
-            result = subprocess.run(
-                ['tamarin-prover', '--check-only', temp_file],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            
-            # Analyze the output
-            analysis = analyze_tamarin_output(result.stdout, result.stderr, result.returncode)
-            
-            # Create detailed response
-            response_data = {
-                'success': analysis['success'],
-                'status': analysis['status'],
-                'returncode': result.returncode,
-                'stdout': result.stdout,
-                'stderr': result.stderr,
-                'analysis': {
-                    'has_parse_error': analysis['has_parse_error'],
-                    'has_wellformedness_error': analysis['has_wellformedness_error'],
-                },
-                'message': get_user_friendly_message(analysis)
-            }
-            
-            # Return appropriate HTTP status
-            status_code = 200 if analysis['success'] else 400
-            
-            return jsonify(response_data), status_code
-            
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-        
-    except subprocess.TimeoutExpired:
-        return jsonify({
-            'success': False,
-            'error': 'Compilation timed out',
-            'message': 'Tamarin compilation timed out after 60 seconds',
-            'status': 'timeout'
-        }), 408
-    except FileNotFoundError:
-        return jsonify({
-            'success': False,
-            'error': 'tamarin-prover not found',
-            'message': 'Tamarin Prover is not installed or not in PATH',
-            'status': 'missing_binary'
-        }), 500
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e),
-            'message': 'Internal server error during compilation',
-            'status': 'internal_error'
-        }), 500
+    prover = prover_probe.snapshot()
+    admission_depth = governor.queue_depth()
+    job_depth = job_queue.depth()
+    saturated = admission_depth >= governor.max_waiting or job_depth >= JOB_QUEUE_SIZE
+    ready = (prover['available'] or not backend.needs_prover) and not saturated
+    
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'prover': prover,
+        'tamarin_installing': tamarin_installing,
+        'saturated': saturated,
+        'slots': governor.snapshot(),
+        'admission_queue_depth': admission_depth,
+        'job_queue_depth': job_depth,
+        'job_workers': JOB_WORKERS,
+        'backend': backend.snapshot()
+    }), 200 if ready else 503
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    try:
-        # Quick check if tamarin-prover is available
-        result = subprocess.run(['tamarin-prover', '--version'], 
-                              capture_output=True, text=True, timeout=5)
-        tamarin_available = result.returncode == 0
-        
-        return jsonify({
-            'status': 'healthy',
-            'tamarin_available': tamarin_available,
-            'tamarin_version': result.stdout.strip() if tamarin_available else None
-        })
-    except:
-        return jsonify({
-            'status': 'healthy',
-            'tamarin_available': False,
-            'tamarin_version': None
-        })
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expose service metrics in the Prometheus text format"""
+    for mode, slot in governor.snapshot().items():
+        prover_in_flight.set(slot['running'], mode=mode)
+        prover_waiting.set(slot['waiting'], mode=mode)
+    jobs_queued.set(job_queue.depth())
+    jobs_running.set(job_queue.running())
+    
+    stats = result_cache.snapshot()
+    for outcome in ('memory_hits', 'disk_hits', 'misses'):
+        cache_lookups.set(stats[outcome], result=outcome)
+    cache_hit_ratio.set(stats['hit_ratio'])
+    if install_report is not None:
+        install_duration.set(install_report['timings']['total'], source=install_report['source'])
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, exit_on_sigterm)
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
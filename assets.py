@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import os
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8'
+}
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+class Asset:
+    """A frontend file held in memory with its precompressed variants"""
+
+    def __init__(self, name, body, immutable):
+        self.name = name
+        self.content_type = CONTENT_TYPES[os.path.splitext(name)[1]]
+        self.immutable = immutable
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=11)
+
+    def etag(self, encoding):
+        return f'"{self.digest}"' if encoding == 'identity' else f'"{self.digest}-{encoding}"'
+
+def build_assets(source_dir):
+    """
+    Build the UI once: fingerprint the stylesheet and script, point the page
+    shell at the fingerprinted names and precompress everything.
+
+    Returns a dict of assets by URL name; the shell is stored as index.html.
+    """
+    def read(name):
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            return f.read()
+
+    assets = {}
+    for source in ('style.css', 'app.js'):
+        body = read(source)
+        stem, ext = os.path.splitext(source)
+        name = f'{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}'
+        assets[name] = Asset(name, body, immutable=True)
+
+    urls = {asset.content_type: f'/assets/{name}' for name, asset in assets.items()}
+    shell = read('index.html').decode('utf-8')
+    shell = shell.replace('{{STYLE_URL}}', urls[CONTENT_TYPES['.css']])
+    shell = shell.replace('{{SCRIPT_URL}}', urls[CONTENT_TYPES['.js']])
+    assets['index.html'] = Asset('index.html', shell.encode('utf-8'), immutable=False)
+    return assets
+
+def _accepted(accept_encoding):
+    return {part.split(';')[0].strip() for part in accept_encoding.split(',')}
+
+def _pick_encoding(asset, accept_encoding):
+    accepted = _accepted(accept_encoding)
+    for encoding in ('br', 'gzip'):
+        if encoding in accepted and encoding in asset.variants:
+            return encoding
+    return 'identity'
+
+def serve_asset(asset, request):
+    """Serve an asset in the best encoding the client accepts, honouring If-None-Match"""
+    encoding = _pick_encoding(asset, request.headers.get('Accept-Encoding', ''))
+    etag = asset.etag(encoding)
+    headers = {
+        'ETag': etag,
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': IMMUTABLE if asset.immutable else 'no-cache'
+    }
+
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=304, headers=headers)
+
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(asset.variants[encoding], content_type=asset.content_type, headers=headers)
+
+def gzip_response(response, accept_encoding, min_bytes=1024, level=6):
+    """Gzip a buffered response in place when the client accepts it and it is worth compressing"""
+    if (response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or 'gzip' not in _accepted(accept_encoding)):
+        return response
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=level))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,596 @@
+import hashlib
+import html
+import json
+import os
+import queue
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from cancel import Cancelled
+from capture import output_chunks
+from prover import TAMARIN_BIN, run_tamarin, kill_tree, prover_flags, prover_version
+
+TAG_RE = re.compile(r'<[^>]+>')
+LOADED_MARKER = 'Loaded new theory'
+FAILED_MARKER = 'Theory loading failed'
+# Links from the server's theory list to each loaded theory's overview, which carries its wellformedness report
+OVERVIEW_RE = re.compile(r'href="(/thy/trace/(\d+)/overview/[^"]*)"')
+WELLFORMEDNESS_FAILED_RE = re.compile(r'wellformedness check failed', re.IGNORECASE)
+
+class DaemonError(Exception):
+    """Raised when a warm prover instance cannot serve a request"""
+
+class DaemonInconclusive(Exception):
+    """Raised when a daemon loaded a theory but cannot tell whether it is wellformed"""
+
+class ReplayMissing(Exception):
+    """Raised when the replay corpus holds no recording for a run"""
+
+class SubprocessBackend:
+    """Runs a fresh tamarin-prover process for every request"""
+
+    name = 'subprocess'
+    needs_prover = True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def flags(self, mode, lemma=None):
+        """Flags identifying how a run was produced, for the result cache key"""
+        return prover_flags(mode, lemma)
+
+    def version(self, spthy_code, mode, lemma=None):
+        """Version of the prover that produces a run, for the result cache key and the run history"""
+        return prover_version()
+
+    def run(self, spthy_code, mode, timeout, on_output=None, lemma=None, cancel=None):
+        return dict(run_tamarin(spthy_code, mode, timeout=timeout, on_output=on_output, lemma=lemma,
+                                cancel=cancel),
+                    backend=self.name)
+
+    def snapshot(self):
+        return {'name': self.name}
+
+def _page_text(body):
+    """Reduce an HTML page to its visible text, one line per block"""
+    text = re.sub(r'<(br|/p|/div|/pre|/li|/h\d)[^>]*>', '\n', body, flags=re.IGNORECASE)
+    text = html.unescape(TAG_RE.sub('', text))
+    return '\n'.join(line.rstrip() for line in text.splitlines() if line.strip()) + '\n'
+
+def _multipart(field, filename, content):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode('utf-8') + content.encode('utf-8') + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, f'multipart/form-data; boundary={boundary}'
+
+def _port_free(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(('127.0.0.1', port))
+        except OSError:
+            return False
+    return True
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _tree_rss(pid):
+    """Resident memory of a process and its descendants, read from /proc"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+class DaemonWorker:
+    """
+    One `tamarin-prover interactive` server listening on a local port.
+
+    A worker whose port is taken, e.g. by a server a crashed instance left
+    behind, moves to a free port instead of failing to start forever.
+    """
+
+    def __init__(self, binary, port, startup_timeout=60):
+        self.binary = binary
+        self.port = port
+        self.startup_timeout = startup_timeout
+        self.url = f'http://127.0.0.1:{port}/'
+        self.proc = None
+        self.workdir = None
+        self.jobs = 0
+
+    def start(self):
+        if not _port_free(self.port):
+            self.port = _free_port()
+            self.url = f'http://127.0.0.1:{self.port}/'
+        self.workdir = tempfile.mkdtemp(prefix=f'tamarin-daemon-{self.port}-')
+        self.proc = subprocess.Popen(
+            [self.binary, 'interactive', f'--port={self.port}', '--interface=127.0.0.1', self.workdir],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        self.jobs = 0
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.healthy():
+                return
+            if self.proc.poll() is not None:
+                break
+            time.sleep(0.2)
+        self.stop()
+        raise DaemonError(f'Prover daemon on port {self.port} did not start')
+
+    def stop(self):
+        if self.proc is not None and self.proc.poll() is None:
+            kill_tree(self.proc)
+            self.proc.wait()
+        if self.workdir is not None:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            self.workdir = None
+
+    def healthy(self):
+        if self.proc is None or self.proc.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(self.url, timeout=2) as response:
+                return response.status == 200
+        except (OSError, urllib.error.URLError):
+            return False
+
+    def rss_bytes(self):
+        return _tree_rss(self.proc.pid) if self.proc is not None else 0
+
+    def _fetch(self, url, timeout, data=None, headers=None):
+        req = urllib.request.Request(url, data=data, headers=headers or {})
+        try:
+            with urllib.request.urlopen(req, timeout=max(timeout, 0.001)) as response:
+                return response.read().decode('utf-8', errors='replace')
+        except socket.timeout:
+            raise subprocess.TimeoutExpired([self.binary, 'interactive'], timeout)
+        except (OSError, urllib.error.URLError) as e:
+            raise DaemonError(f'Prover daemon on port {self.port} failed: {e}')
+
+    def check(self, spthy_code, timeout):
+        """
+        Upload a theory and return a result shaped like a --check-only run.
+
+        The upload reply only says whether the theory parsed, so for a
+        loaded theory the overview of the newest theory is fetched for its
+        wellformedness report. DaemonInconclusive is raised when that report
+        shows a failed check or cannot be found, as only the CLI reports
+        wellformedness errors the way the rest of the server reads them.
+        """
+        body, content_type = _multipart('uploadedTheory', 'theory.spthy', spthy_code)
+        started = time.monotonic()
+        page = self._fetch(self.url, timeout, data=body, headers={'Content-Type': content_type})
+        self.jobs += 1
+
+        if FAILED_MARKER in page:
+            returncode = 1
+        elif LOADED_MARKER in page:
+            returncode = 0
+            links = OVERVIEW_RE.findall(page)
+            if not links:
+                raise DaemonInconclusive(f'No wellformedness report from prover daemon on port {self.port}')
+            path = max(links, key=lambda link: int(link[1]))[0]
+            overview = self._fetch(urllib.parse.urljoin(self.url, path), timeout - (time.monotonic() - started))
+            if WELLFORMEDNESS_FAILED_RE.search(overview):
+                raise DaemonInconclusive(f'Theory failed a wellformedness check on port {self.port}')
+        else:
+            raise DaemonError(f'Unrecognised reply from prover daemon on port {self.port}')
+        return {
+            'stdout': _page_text(page),
+            'stderr': '',
+            'returncode': returncode,
+            'duration': time.monotonic() - started,
+            'cpu_seconds': None,
+            'max_rss_bytes': None,
+            'limit': None
+        }
+
+class DaemonPool:
+    """
+    Serves check runs from a pool of warm `tamarin-prover interactive`
+    servers, so small theories skip process and Maude startup.
+
+    Workers are health-checked in the background and replaced after
+    max_jobs theories or once their process tree exceeds max_rss_bytes.
+    Prove runs, any check that no healthy worker can take, and checks whose
+    wellformedness the daemon cannot vouch for go to the fallback backend.
+    stop() must run at shutdown: the servers run in their own sessions and
+    would otherwise outlive the app.
+    """
+
+    name = 'daemon'
+    needs_prover = True
+
+    def __init__(self, fallback, binary=TAMARIN_BIN, size=2, base_port=3101, max_jobs=50,
+                 max_rss_bytes=2048 * 1024 * 1024, health_interval=15, acquire_timeout=1):
+        self.fallback = fallback
+        self.workers = [DaemonWorker(binary, base_port + i) for i in range(size)]
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        self.health_interval = health_interval
+        self.acquire_timeout = acquire_timeout
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.down = set()
+        self.stopped = False
+        self.stats = {'daemon_runs': 0, 'fallback_runs': 0, 'inconclusive_runs': 0, 'starts': 0, 'failures': 0}
+
+    def flags(self, mode, lemma=None):
+        # Daemon check output is the interactive server's reply, not the CLI's
+        if mode == 'check':
+            return [*prover_flags(mode, lemma), 'interactive']
+        return prover_flags(mode, lemma)
+
+    def version(self, spthy_code, mode, lemma=None):
+        return prover_version()
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def start(self):
+        """Start the workers and their health checker in the background"""
+        threading.Thread(target=self._supervise, name='daemon-pool', daemon=True).start()
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+        for worker in self.workers:
+            worker.stop()
+        self.fallback.stop()
+
+    def _restart(self, worker):
+        """Replace a worker's server; a worker that fails to start is retried by the supervisor"""
+        worker.stop()
+        with self.lock:
+            if self.stopped:
+                return
+        try:
+            worker.start()
+        except (OSError, DaemonError):
+            self._count('failures')
+            with self.lock:
+                self.down.add(worker)
+            return
+        self._count('starts')
+        self.idle.put(worker)
+
+    def _recycle(self, worker):
+        """Restart a worker in the background so the current request is not held up"""
+        threading.Thread(target=self._restart, args=(worker,), daemon=True).start()
+
+    def _supervise(self):
+        with self.lock:
+            self.down.update(self.workers)
+        while not self.stopped:
+            self._check()
+            time.sleep(self.health_interval)
+
+    def _check(self):
+        """Probe the workers not serving a request and bring failed ones back up"""
+        idle = []
+        while True:
+            try:
+                idle.append(self.idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in idle:
+            if worker.healthy():
+                self.idle.put(worker)
+            else:
+                self._restart(worker)
+
+        with self.lock:
+            down, self.down = self.down, set()
+        for worker in down:
+            self._restart(worker)
+
+    def _release(self, worker):
+        """Return a worker to the pool, replacing it first if it is worn out"""
+        if (worker.jobs >= self.max_jobs or worker.rss_bytes() > self.max_rss_bytes
+                or worker.proc.poll() is not None):
+            self._recycle(worker)
+        else:
+            self.idle.put(worker)
+
+    def run(self, spthy_code, mode, timeout, on_output=None, lemma=None, cancel=None):
+        if mode != 'check':
+            return self._fall_back(spthy_code, mode, timeout, on_output, lemma, cancel)
+        try:
+            worker = self.idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            return self._fall_back(spthy_code, mode, timeout, on_output, lemma, cancel)
+
+        # A cancelled check kills the worker's server, which is then replaced
+        kill = lambda: kill_tree(worker.proc)
+        if cancel is not None:
+            cancel.attach(kill)
+        try:
+            result = worker.check(spthy_code, timeout)
+        except subprocess.TimeoutExpired:
+            self._recycle(worker)
+            raise
+        except DaemonInconclusive:
+            self._release(worker)
+            self._count('inconclusive_runs')
+            return self._fall_back(spthy_code, mode, timeout, on_output, lemma, cancel)
+        except DaemonError:
+            self._recycle(worker)
+            if cancel is not None and cancel.cancelled:
+                raise Cancelled('Prover run was cancelled')
+            self._count('failures')
+            return self._fall_back(spthy_code, mode, timeout, on_output, lemma, cancel)
+        finally:
+            if cancel is not None:
+                cancel.detach(kill)
+        if cancel is not None and cancel.cancelled:
+            self._recycle(worker)
+            raise Cancelled('Prover run was cancelled')
+        self._release(worker)
+
+        self._count('daemon_runs')
+        if on_output is not None:
+            for line in result['stdout'].splitlines(keepends=True):
+                on_output('stdout', line)
+        return dict(result, backend=self.name)
+
+    def _fall_back(self, spthy_code, mode, timeout, on_output, lemma, cancel):
+        self._count('fallback_runs')
+        return self.fallback.run(spthy_code, mode, timeout, on_output=on_output, lemma=lemma, cancel=cancel)
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        return {
+            'name': self.name,
+            'workers': len(self.workers),
+            'idle': self.idle.qsize(),
+            **stats
+        }
+
+def recording_path(corpus_dir, spthy_code, flags):
+    """Corpus file for a run, addressed by the theory and the prover flags"""
+    digest = hashlib.sha256()
+    for part in (spthy_code, ' '.join(flags)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return os.path.join(corpus_dir, f'{digest.hexdigest()}.json')
+
+class RecordingBackend:
+    """
+    Runs the prover through another backend and records every run.
+
+    Each finished or timed-out run is written to corpus_dir as JSON with
+    the theory and its hash, argv, stdout, stderr, exit code, timing and
+    resource usage, for ReplayBackend to play back. A later run of the same
+    theory and flags replaces the earlier recording.
+    """
+
+    name = 'record'
+    needs_prover = True
+
+    def __init__(self, inner, corpus_dir):
+        self.inner = inner
+        self.corpus_dir = corpus_dir
+        self.lock = threading.Lock()
+        self.recorded = 0
+        os.makedirs(corpus_dir, exist_ok=True)
+
+    def start(self):
+        self.inner.start()
+
+    def stop(self):
+        self.inner.stop()
+
+    def flags(self, mode, lemma=None):
+        return self.inner.flags(mode, lemma)
+
+    def version(self, spthy_code, mode, lemma=None):
+        return self.inner.version(spthy_code, mode, lemma)
+
+    def _record(self, spthy_code, mode, lemma, result, timed_out=False):
+        flags = prover_flags(mode, lemma)
+        record = {
+            'theory_hash': hashlib.sha256(spthy_code.encode('utf-8')).hexdigest(),
+            'theory': spthy_code,
+            'argv': [os.path.basename(TAMARIN_BIN), *flags, 'theory.spthy'],
+            'mode': mode,
+            'lemma': lemma,
+            'prover_version': prover_version(),
+            'recorded_at': time.time(),
+            'timed_out': timed_out,
+            'stdout': ''.join(output_chunks(result, 'stdout')),
+            'stderr': ''.join(output_chunks(result, 'stderr')),
+            'returncode': result.get('returncode'),
+            'duration': result['duration'],
+            'cpu_seconds': result.get('cpu_seconds'),
+            'max_rss_bytes': result.get('max_rss_bytes'),
+            'limit': result.get('limit')
+        }
+        path = recording_path(self.corpus_dir, spthy_code, flags)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(temp_path, path)
+        with self.lock:
+            self.recorded += 1
+
+    def run(self, spthy_code, mode, timeout, on_output=None, lemma=None, cancel=None):
+        try:
+            result = self.inner.run(spthy_code, mode, timeout, on_output=on_output, lemma=lemma, cancel=cancel)
+        except subprocess.TimeoutExpired as e:
+            self._record(spthy_code, mode, lemma, {'stdout': e.output or '', 'stderr': e.stderr or '',
+                                                   'captures': getattr(e, 'captures', None), 'duration': timeout},
+                         timed_out=True)
+            raise
+        self._record(spthy_code, mode, lemma, result)
+        return result
+
+    def snapshot(self):
+        with self.lock:
+            recorded = self.recorded
+        return {'name': self.name, 'corpus_dir': self.corpus_dir, 'recorded': recorded,
+                'inner': self.inner.snapshot()}
+
+class ReplayBackend:
+    """
+    Plays back runs recorded by RecordingBackend instead of running the prover.
+
+    A replayed run takes its recorded duration multiplied by time_scale,
+    with the recorded output spread evenly across it, so streaming,
+    timeouts and cancellation behave as they did for the real run. Runs
+    with no recording raise ReplayMissing, or go to the fallback backend
+    when one is given. Replayed runs are keyed and recorded under the
+    prover version of their recording.
+    """
+
+    name = 'replay'
+    needs_prover = False
+
+    def __init__(self, corpus_dir, time_scale=1.0, fallback=None):
+        self.corpus_dir = corpus_dir
+        self.time_scale = time_scale
+        self.fallback = fallback
+        self.lock = threading.Lock()
+        self.versions = {}
+        self.stats = {'replayed': 0, 'missing': 0}
+
+    def start(self):
+        if not os.path.isdir(self.corpus_dir):
+            raise ReplayMissing(f'Replay corpus {self.corpus_dir} does not exist')
+
+    def stop(self):
+        if self.fallback is not None:
+            self.fallback.stop()
+
+    def flags(self, mode, lemma=None):
+        return prover_flags(mode, lemma)
+
+    def version(self, spthy_code, mode, lemma=None):
+        """The prover version stored with the recording, or the fallback's when there is none"""
+        path = recording_path(self.corpus_dir, spthy_code, prover_flags(mode, lemma))
+        with self.lock:
+            version = self.versions.get(path)
+        if version is not None:
+            return version
+        try:
+            with open(path) as f:
+                version = json.load(f)['prover_version']
+        except FileNotFoundError:
+            return self.fallback.version(spthy_code, mode, lemma) if self.fallback is not None else 'unknown'
+        with self.lock:
+            self.versions[path] = version
+        return version
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def run(self, spthy_code, mode, timeout, on_output=None, lemma=None, cancel=None):
+        flags = prover_flags(mode, lemma)
+        try:
+            with open(recording_path(self.corpus_dir, spthy_code, flags)) as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            self._count('missing')
+            if self.fallback is not None:
+                return self.fallback.run(spthy_code, mode, timeout, on_output=on_output, lemma=lemma,
+                                         cancel=cancel)
+            raise ReplayMissing(f'No recording for this theory with {" ".join(flags)}')
+        self._count('replayed')
+
+        duration = record['duration'] * self.time_scale
+        timed_out = record['timed_out'] or duration > timeout
+        span = min(duration, timeout)
+        lines = [(stream, line) for stream in ('stdout', 'stderr')
+                 for line in record[stream].splitlines(keepends=True)]
+        if timed_out and duration > 0:
+            # Only the share of the output written before the deadline comes out
+            lines = lines[:int(len(lines) * min(1.0, span / duration))]
+
+        stopped = threading.Event()
+        if cancel is not None:
+            cancel.attach(stopped.set)
+        try:
+            started = time.monotonic()
+            for i, (stream, line) in enumerate(lines):
+                if stopped.wait(max(0.0, started + span * (i + 1) / (len(lines) + 1) - time.monotonic())):
+                    raise Cancelled('Prover run was cancelled')
+                if on_output is not None:
+                    on_output(stream, line)
+            if stopped.wait(max(0.0, started + span - time.monotonic())):
+                raise Cancelled('Prover run was cancelled')
+        finally:
+            if cancel is not None:
+                cancel.detach(stopped.set)
+
+        if timed_out:
+            raise subprocess.TimeoutExpired(record['argv'], timeout,
+                                            output=''.join(line for stream, line in lines if stream == 'stdout'),
+                                            stderr=''.join(line for stream, line in lines if stream == 'stderr'))
+        return {
+            'stdout': record['stdout'],
+            'stderr': record['stderr'],
+            'returncode': record['returncode'],
+            'duration': time.monotonic() - started,
+            'cpu_seconds': record['cpu_seconds'],
+            'max_rss_bytes': record['max_rss_bytes'],
+            'limit': record['limit'],
+            'backend': self.name
+        }
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        return {'name': self.name, 'corpus_dir': self.corpus_dir, 'time_scale': self.time_scale, **stats}
+
+def backend_from_env():
+    """Build the execution backend selected by TAMARIN_BACKEND"""
+    subprocess_backend = SubprocessBackend()
+    selected = os.environ.get('TAMARIN_BACKEND', 'subprocess')
+    corpus_dir = os.environ.get('PROVER_CORPUS_DIR', os.path.join(tempfile.gettempdir(), 'tamarin-prover-corpus'))
+    if selected == 'record':
+        return RecordingBackend(subprocess_backend, corpus_dir)
+    if selected == 'replay':
+        fallback = subprocess_backend if os.environ.get('REPLAY_FALLBACK', '0') in ('1', 'true', 'yes') else None
+        return ReplayBackend(corpus_dir, time_scale=float(os.environ.get('REPLAY_TIME_SCALE', 1.0)),
+                             fallback=fallback)
+    if selected != 'daemon':
+        return subprocess_backend
+    return DaemonPool(
+        subprocess_backend,
+        size=int(os.environ.get('DAEMON_POOL_SIZE', 2)),
+        base_port=int(os.environ.get('DAEMON_BASE_PORT', 3101)),
+        max_jobs=int(os.environ.get('DAEMON_MAX_JOBS', 50)),
+        max_rss_bytes=int(os.environ.get('DAEMON_MAX_RSS_MB', 2048)) * 1024 * 1024,
+        health_interval=int(os.environ.get('DAEMON_HEALTH_INTERVAL', 15))
+    )
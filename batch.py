@@ -0,0 +1,47 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+def parse_items(data):
+    """
+    Read batch items from a request body.
+
+    Accepts {"items": [{"id": ..., "code": ...}, ...]}; bare strings are
+    accepted as items and take their list index as id. Raises ValueError
+    describing the first malformed item.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Please provide a JSON object with an "items" array')
+    raw_items = data.get('items')
+    if not isinstance(raw_items, list) or not raw_items:
+        raise ValueError('Please provide a non-empty "items" array')
+
+    items = []
+    for index, raw in enumerate(raw_items):
+        if isinstance(raw, str):
+            raw = {'code': raw}
+        if not isinstance(raw, dict) or not isinstance(raw.get('code'), str) or not raw['code']:
+            raise ValueError(f'Item {index} has no "code" field')
+        items.append({'index': index, 'id': raw.get('id', index), 'code': raw['code']})
+    return items
+
+def run_batch(items, key_fn, compile_one, workers):
+    """
+    Compile batch items on a worker pool, yielding (item, result, duplicate)
+    as each finishes.
+
+    Items whose key_fn(code) match are compiled once; every later item with
+    the same key is yielded with duplicate set when the first one finishes.
+    """
+    groups = OrderedDict()
+    for item in items:
+        groups.setdefault(key_fn(item['code']), []).append(item)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futures = {pool.submit(compile_one, group[0]['code']): key for key, group in groups.items()}
+        for future in as_completed(futures):
+            result = future.result()
+            for position, item in enumerate(groups[futures[future]]):
+                yield item, result, position > 0
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
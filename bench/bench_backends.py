@@ -0,0 +1,119 @@
+"""
+Compare check latency of the one-shot subprocess backend and the warm daemon pool.
+
+Runs the same theory through both backends sequentially with the result
+cache out of the way and reports per-request latency. First it checks that
+both backends classify a wellformed theory and one failing a wellformedness
+check alike, and exits with an error if they do not. Needs tamarin-prover
+on PATH (or TAMARIN_BIN).
+
+    python bench/bench_backends.py --theory examples/NSPK.spthy --runs 50 --output backends.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import DaemonPool, SubprocessBackend
+from output_parser import parse_output
+
+THEORY = '''theory Bench
+begin
+
+builtins: hashing
+
+rule Send:
+  [ Fr(~x) ] --[ Sent(~x) ]-> [ Out(h(~x)) ]
+
+lemma sent_exists:
+  exists-trace "Ex x #i. Sent(x) @ i"
+
+end
+'''
+
+# The theory above with a variable in a conclusion that no premise binds
+ILL_FORMED = THEORY.replace('rule Send:', """rule Leak:
+  [ ] --[ ]-> [ Out(unbound_x) ]
+
+rule Send:""").replace('theory Bench', '// expected: unbound variable\ntheory Bench')
+
+def verdict(backend, code, timeout):
+    result = backend.run(code, 'check', timeout)
+    parsed = parse_output(result['stdout'], result['stderr'])
+    return {'returncode': result['returncode'], 'has_parse_error': parsed['has_parse_error'],
+            'has_wellformedness_error': parsed['has_wellformedness_error']}
+
+def check_consistency(subprocess_backend, pool, code, timeout):
+    """Exit unless the daemon pool reports the same verdicts as the subprocess backend"""
+    for name, theory in (('wellformed', code), ('ill-formed', ILL_FORMED)):
+        expected, actual = verdict(subprocess_backend, theory, timeout), verdict(pool, theory, timeout)
+        if expected != actual:
+            raise SystemExit(f'Backends disagree on the {name} theory: subprocess {expected}, daemon {actual}')
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(samples),
+        'mean': statistics.mean(samples),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max': ordered[-1]
+    }
+
+def measure(backend, code, runs, timeout):
+    samples = []
+    for _ in range(runs):
+        started = time.monotonic()
+        result = backend.run(code, 'check', timeout)
+        samples.append(time.monotonic() - started)
+        if result['backend'] != backend.name:
+            raise SystemExit(f'{backend.name} backend fell back to {result["backend"]}')
+    return summarize(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--theory', help='theory file to check (a small built-in theory by default)')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--pool-size', type=int, default=1)
+    parser.add_argument('--base-port', type=int, default=3201)
+    parser.add_argument('--timeout', type=int, default=60)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    code = THEORY
+    if args.theory:
+        with open(args.theory) as f:
+            code = f.read()
+
+    subprocess_backend = SubprocessBackend()
+    pool = DaemonPool(subprocess_backend, size=args.pool_size, base_port=args.base_port,
+                      max_jobs=args.runs + 1, acquire_timeout=args.timeout)
+    pool.start()
+    try:
+        deadline = time.monotonic() + 120
+        while pool.snapshot()['idle'] < args.pool_size:
+            if time.monotonic() > deadline:
+                raise SystemExit(f'Daemon pool did not come up: {pool.snapshot()}')
+            time.sleep(0.2)
+
+        check_consistency(subprocess_backend, pool, code, args.timeout)
+        results = {
+            'runs': args.runs,
+            'pool_size': args.pool_size,
+            'subprocess_seconds': measure(subprocess_backend, code, args.runs, args.timeout),
+            'daemon_seconds': measure(pool, code, args.runs, args.timeout)
+        }
+    finally:
+        pool.stop()
+    results['speedup_p50'] = results['subprocess_seconds']['p50'] / results['daemon_seconds']['p50']
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Measure cold-start provisioning time.
+
+Builds a release-shaped tarball around a stand-in tamarin-prover binary
+(padded to the size of the real one), then times a cold install from that
+artifact and a warm start where the verified binary is already in place.
+
+    python bench/bench_provision.py --size-mb 90 --runs 5 --output provision.json
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tarfile
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from provision import Provisioner, sha256_file
+
+STUB = b'#!/bin/sh\necho "tamarin-prover 1.8.0 (benchmark stub)"\nexit 0\n'
+
+def build_artifact(directory, size_mb):
+    """Write a tarball laid out like the upstream release"""
+    binary = STUB + b'#' * (size_mb * 1024 * 1024)
+    path = os.path.join(directory, 'tamarin-prover-bench-linux64-ubuntu.tar.gz')
+    with tarfile.open(path, 'w:gz', compresslevel=1) as archive:
+        info = tarfile.TarInfo('tamarin-prover-bench/bin/tamarin-prover')
+        info.size = len(binary)
+        info.mode = 0o755
+        archive.addfile(info, io.BytesIO(binary))
+    return path
+
+def summarize(samples):
+    return {
+        'runs': len(samples),
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'max': max(samples)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=90)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        artifact = build_artifact(work, args.size_mb)
+        checksum = sha256_file(artifact)
+        cold, warm = [], []
+
+        for run in range(args.runs):
+            install_dir = os.path.join(work, f'bin-{run}')
+            provisioner = Provisioner(install_dir=install_dir, artifact=artifact,
+                                      expected_sha256=checksum, allow_download=False)
+            report = provisioner.provision()
+            assert report['source'] == 'artifact', report
+            cold.append(report['timings']['total'])
+
+            report = provisioner.provision()
+            assert report['source'] == 'installed', report
+            warm.append(report['timings']['total'])
+
+    results = {
+        'artifact_mb': args.size_mb,
+        'cold_install_seconds': summarize(cold),
+        'warm_start_seconds': summarize(warm)
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
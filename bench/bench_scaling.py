@@ -0,0 +1,176 @@
+"""
+Measure how prover latency and memory scale with theory size.
+
+Generates theories with gen_theories.py, growing one dimension (rules,
+state facts, lemmas, builtins or equations) while the others stay at their
+base values, and runs each through the prover in check and prove mode.
+Reports wall time, CPU seconds and peak RSS per size, the largest size each
+mode finished within the timeout, and with --broken whether each broken
+variant was classified as its defect category (real prover only, since the
+stub reports whatever category a variant's header names). A mode stops
+growing after its first timeout or resource-limit hit.
+
+Uses tamarin-prover on PATH (or TAMARIN_BIN), or the offline stub prover
+with --stub. With matplotlib installed, --plot writes latency and memory
+against size to an image.
+
+    python bench/bench_scaling.py --dimension rules --sizes 1,2,4,8,16,32 --output scaling.json --plot scaling.png
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from capture import close_captures
+from gen_theories import BROKEN, BUILTINS, broken, generate
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+except ImportError:
+    plt = None
+
+DIMENSIONS = ('rules', 'facts', 'lemmas', 'builtins', 'equations')
+
+def measure(run_tamarin, code, mode, runs, timeout):
+    """Run one theory several times and summarize, or report how it failed"""
+    durations, cpu, rss = [], [], []
+    for _ in range(runs):
+        try:
+            result = run_tamarin(code, mode, timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            close_captures(getattr(e, 'captures', None))
+            return {'status': 'timeout'}
+        close_captures(result['captures'])
+        if result['limit'] is not None:
+            return {'status': 'limit', 'limit': result['limit']}
+        if result['returncode'] != 0:
+            return {'status': 'error', 'returncode': result['returncode'], 'stderr': result['stderr'][-2000:]}
+        durations.append(result['duration'])
+        cpu.append(result['cpu_seconds'] or 0.0)
+        rss.append((result['max_rss_bytes'] or 0) / (1024 * 1024))
+    return {
+        'status': 'ok',
+        'wall_seconds': {'median': round(statistics.median(durations), 4), 'max': round(max(durations), 4)},
+        'cpu_seconds': round(statistics.median(cpu), 4),
+        'peak_rss_mb': round(max(rss), 1)
+    }
+
+def classify_broken(run_tamarin, params, timeout):
+    results = {}
+    for category in BROKEN:
+        try:
+            result = run_tamarin(broken(category, **params), 'check', timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            close_captures(getattr(e, 'captures', None))
+            results[category] = {'detected': False, 'status': 'timeout'}
+            continue
+        close_captures(result['captures'])
+        parsed = result['parsed']
+        flag = 'has_parse_error' if category == 'parse error' else 'has_wellformedness_error'
+        results[category] = {
+            'detected': parsed[flag],
+            'has_parse_error': parsed['has_parse_error'],
+            'has_wellformedness_error': parsed['has_wellformedness_error'],
+            'errors': parsed['errors'][:3]
+        }
+    return results
+
+def plot(results, path):
+    figure, (latency, memory) = plt.subplots(1, 2, figsize=(11, 4))
+    sizes = [p['size'] for points in results['modes'].values() for p in points] or [1]
+    for mode, points in results['modes'].items():
+        done = [p for p in points if p['status'] == 'ok']
+        done_sizes = [p['size'] for p in done]
+        latency.plot(done_sizes, [p['wall_seconds']['median'] for p in done], marker='o', label=mode)
+        memory.plot(done_sizes, [p['peak_rss_mb'] for p in done], marker='o', label=mode)
+    for axes, label in ((latency, 'median wall time (s)'), (memory, 'peak RSS (MB)')):
+        axes.set_xlabel(results['dimension'])
+        axes.set_ylabel(label)
+        if min(sizes) > 0:
+            axes.set_xscale('log', base=2)
+        axes.grid(True, alpha=0.3)
+        axes.legend()
+    figure.suptitle(f'Prover scaling by {results["dimension"]}')
+    figure.tight_layout()
+    figure.savefig(path, dpi=120)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dimension', choices=DIMENSIONS, default='rules')
+    parser.add_argument('--sizes', default='1,2,4,8,16,32', help='comma-separated values for the dimension')
+    parser.add_argument('--rules', type=int, default=4)
+    parser.add_argument('--facts', type=int, default=1)
+    parser.add_argument('--lemmas', type=int, default=2)
+    parser.add_argument('--builtins', type=int, default=1)
+    parser.add_argument('--equations', type=int, default=0)
+    parser.add_argument('--modes', default='check,prove')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=int, default=120)
+    parser.add_argument('--broken', action='store_true', help='also check that broken variants are classified')
+    parser.add_argument('--stub', action='store_true', help='use bench/stub_prover.py instead of tamarin-prover')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--plot', help='write a latency and memory plot to this image file (needs matplotlib)')
+    args = parser.parse_args()
+    if args.broken and args.stub:
+        # The stub derives its error from the variant's `// expected:` header, so it always "detects" it
+        parser.error('--broken measures the real prover\'s classification and cannot be combined with --stub')
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    if args.dimension == 'builtins' and max(sizes) > len(BUILTINS):
+        raise SystemExit(f'At most {len(BUILTINS)} builtins are available')
+    modes = args.modes.split(',')
+
+    # The prover module reads its binary and workspace location at import
+    if args.stub:
+        os.environ['TAMARIN_BIN'] = os.path.join(BENCH_DIR, 'stub_prover.py')
+    os.environ.setdefault('WORKSPACE_ROOT', tempfile.mkdtemp(prefix='tamarin-scaling-'))
+    from prover import prover_version, run_tamarin
+
+    base = {dimension: getattr(args, dimension) for dimension in DIMENSIONS}
+    results = {
+        'prover': prover_version(),
+        'dimension': args.dimension,
+        'base': base,
+        'runs': args.runs,
+        'timeout': args.timeout,
+        'modes': {mode: [] for mode in modes},
+        'largest_completed': {}
+    }
+    for mode in modes:
+        for size in sizes:
+            params = dict(base, **{args.dimension: size})
+            code = generate(**params)
+            point = {'size': size, 'theory_bytes': len(code), **measure(run_tamarin, code, mode, args.runs,
+                                                                        args.timeout)}
+            results['modes'][mode].append(point)
+            print(f'{mode} {args.dimension}={size}: {point["status"]} '
+                  f'{point.get("wall_seconds", {}).get("median", "")}', file=sys.stderr)
+            if point['status'] == 'ok':
+                results['largest_completed'][mode] = size
+            elif point['status'] in ('timeout', 'limit'):
+                break
+
+    if args.broken:
+        results['broken'] = classify_broken(run_tamarin, base, args.timeout)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.plot:
+        if plt is None:
+            print('matplotlib is not installed, skipping the plot', file=sys.stderr)
+        else:
+            plot(results, args.plot)
+
+if __name__ == '__main__':
+    main()
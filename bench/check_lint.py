@@ -0,0 +1,38 @@
+"""
+Check lint.py against the regression corpus of valid theories.
+
+Every theory in bench/lint_corpus must lint clean, both as written and
+normalized the way the server lints it. The corpus covers syntax the
+linter only partly models: SAPIC processes, typed function declarations,
+rule let blocks, configuration headers, diff terms, macros and the
+preprocessor. Exits non-zero and prints the
+diagnostics when one does not.
+
+    python bench/check_lint.py
+"""
+import glob
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from lint import format_diagnostics, lint
+from normalize import normalize
+
+def main():
+    paths = sorted(glob.glob(os.path.join(BENCH_DIR, 'lint_corpus', '*.spthy')))
+    failed = set()
+    for path in paths:
+        with open(path) as f:
+            source = f.read()
+        for label, code in (('source', source), ('normalized', normalize(source)[0])):
+            diagnostics = lint(code)
+            if diagnostics:
+                failed.add(path)
+                print(f'{os.path.basename(path)} ({label}):\n{format_diagnostics(diagnostics)}', file=sys.stderr)
+    print(f'{len(paths) - len(failed)}/{len(paths)} valid theories lint clean')
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
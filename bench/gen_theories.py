@@ -0,0 +1,147 @@
+"""
+Generate synthetic Tamarin theories of controlled size.
+
+A generated theory is a chain of rules passing a fresh nonce from one step
+to the next, with a given number of state facts between steps, lemmas
+about the chain, builtins whose primitives appear in the rules' outputs,
+and user-defined encryption functions with their equations. Lemma
+verdicts are not controlled, only how much work the theory is.
+
+Broken variants of the same theory each carry one defect for a category
+output_parser recognizes, named in an `// expected:` header line. The
+exact message the prover prints for a defect depends on its version, so
+bench_scaling.py reports whether each variant was classified as expected.
+
+    python bench/gen_theories.py --rules 16 --lemmas 4 --builtins 3 --out-dir theories --broken
+"""
+import argparse
+import os
+
+BUILTINS = ['hashing', 'symmetric-encryption', 'asymmetric-encryption', 'signing', 'diffie-hellman',
+            'revealing-signing', 'xor', 'multiset']
+
+# A term using each builtin's primitives on a nonce
+BUILTIN_TERMS = {
+    'hashing': 'h({n})',
+    'symmetric-encryption': "senc({n}, 'k')",
+    'asymmetric-encryption': "aenc({n}, pk('k'))",
+    'signing': "sign({n}, 'k')",
+    'diffie-hellman': "'g'^{n}",
+    'revealing-signing': "revealSign({n}, 'k')",
+    'xor': "{n} XOR 'c'",
+    'multiset': "{n} + 'c'"
+}
+
+BROKEN = ('parse error', 'unbound variable', 'undeclared function', 'undeclared sort', 'type error',
+          'restriction not satisfied')
+
+def theory_name(rules, facts, lemmas, builtins, equations):
+    return f'Gen_r{rules}_f{facts}_l{lemmas}_b{builtins}_e{equations}'
+
+def _state(step, facts, var='n'):
+    return [f'St_{step}_{j}({var})' for j in range(facts)]
+
+def generate(rules=4, facts=1, lemmas=2, builtins=1, equations=0):
+    """Return a well-formed theory of the given size; facts counts the state facts between two steps"""
+    if rules < 1 or facts < 1 or lemmas < 0:
+        raise ValueError('A theory needs at least one rule and one state fact per step')
+    if builtins > len(BUILTINS):
+        raise ValueError(f'At most {len(BUILTINS)} builtins are available')
+    used = BUILTINS[:builtins]
+    outputs = [BUILTIN_TERMS[builtin] for builtin in used]
+    outputs += [f"dec{i}(enc{i}({{n}}, 'k'), 'k')" for i in range(equations)]
+
+    lines = [f'theory {theory_name(rules, facts, lemmas, builtins, equations)}', 'begin', '']
+    if used:
+        lines += [f'builtins: {", ".join(used)}', '']
+    if equations:
+        lines.append('functions: ' + ', '.join(f'enc{i}/2, dec{i}/2' for i in range(equations)))
+        lines.append('equations: ' + ', '.join(f'dec{i}(enc{i}(m, k), k) = m' for i in range(equations)))
+        lines.append('')
+
+    if rules > 1:
+        first = _state(1, facts, '~n')
+    else:
+        first = [f'Out({outputs[0].format(n="~n")})'] if outputs else []
+    lines += [
+        'rule Step_0:',
+        '  [ Fr(~n) ]',
+        '--[ Start(~n) ]->',
+        f'  [ {", ".join(first)} ]',
+        ''
+    ]
+    for step in range(1, rules):
+        conclusion = _state(step + 1, facts) if step + 1 < rules else []
+        if outputs:
+            conclusion.append(f'Out({outputs[step % len(outputs)].format(n="n")})')
+        lines += [
+            f'rule Step_{step}:',
+            f'  [ {", ".join(_state(step, facts))} ]',
+            f'--[ Reached_{step}(n) ]->',
+            f'  [ {", ".join(conclusion)} ]',
+            ''
+        ]
+
+    for i in range(lemmas):
+        step = 1 + i % max(1, rules - 1)
+        if rules == 1:
+            lines += [f'lemma start_{i}:', '  exists-trace', '  "Ex n #i. Start(n) @ i"', '']
+        elif i % 2 == 0:
+            lines += [f'lemma reachable_{i}:', '  exists-trace', f'  "Ex n #i. Reached_{step}(n) @ i"', '']
+        else:
+            lines += [f'lemma ordered_{i}:',
+                      f'  "All n #j. Reached_{step}(n) @ j ==> Ex #i. Start(n) @ i & i < j"', '']
+    lines.append('end')
+    return '\n'.join(lines) + '\n'
+
+def broken(category, **params):
+    """Return a variant of generate(**params) with one defect of the given category"""
+    code = generate(**params)
+    if category == 'parse error':
+        code = code.replace('  [ Fr(~n) ]', '  [ Fr(~n)', 1)
+    elif category == 'unbound variable':
+        code = code.replace('rule Step_0:', 'rule Leak:\n  [ ]\n--[ ]->\n  [ Out(unbound_x) ]\n\nrule Step_0:', 1)
+    elif category == 'undeclared function':
+        code = code.replace('  [ Fr(~n) ]', '  [ Fr(~n), In(undeclared_f(~n)) ]', 1)
+    elif category == 'undeclared sort':
+        code = code.replace('end\n', 'lemma sorted:\n  "All x:undeclared_sort #i. Start(x) @ i ==> F"\n\nend\n')
+    elif category == 'type error':
+        # The same fact used with two arities
+        code = code.replace('--[ Start(~n) ]->', '--[ Start(~n), Start(~n, ~n) ]->', 1)
+    elif category == 'restriction not satisfied':
+        code = code.replace('rule Step_0:', 'restriction never:\n  "All n #i. Start(n) @ i ==> F"\n\nrule Step_0:', 1)
+        code = code.replace('end\n', 'lemma start_possible:\n  exists-trace\n  "Ex n #i. Start(n) @ i"\n\nend\n')
+    else:
+        raise ValueError(f'Unknown defect category: {category}')
+    return f'// expected: {category}\n{code}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rules', type=int, default=4)
+    parser.add_argument('--facts', type=int, default=1, help='state facts passed between consecutive rules')
+    parser.add_argument('--lemmas', type=int, default=2)
+    parser.add_argument('--builtins', type=int, default=1)
+    parser.add_argument('--equations', type=int, default=0)
+    parser.add_argument('--broken', action='store_true', help='also write one broken variant per defect category')
+    parser.add_argument('--out-dir', help='write .spthy files here instead of printing the theory')
+    args = parser.parse_args()
+
+    params = {'rules': args.rules, 'facts': args.facts, 'lemmas': args.lemmas, 'builtins': args.builtins,
+              'equations': args.equations}
+    name = theory_name(**params)
+    if not args.out_dir:
+        print(generate(**params), end='')
+        return
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    theories = {f'{name}.spthy': generate(**params)}
+    if args.broken:
+        for category in BROKEN:
+            theories[f'{name}.broken_{category.replace(" ", "_")}.spthy'] = broken(category, **params)
+    for filename, code in theories.items():
+        with open(os.path.join(args.out_dir, filename), 'w') as f:
+            f.write(code)
+        print(os.path.join(args.out_dir, filename))
+
+if __name__ == '__main__':
+    main()
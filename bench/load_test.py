@@ -0,0 +1,379 @@
+"""
+Load-test /tamarin (check and prove) and /n8n/compile over HTTP.
+
+Unless --url points at a running server, starts the app against the
+benchmark stub prover (bench/stub_prover.py) with a fresh cache, run
+history and workspace, so it runs offline. Each scenario is driven either
+by a fixed number of concurrent clients (closed loop) or at a fixed
+Poisson arrival rate (open loop, --rate), with theories drawn from
+bench/corpus. Reports latency percentiles, throughput, error, rejection
+and timeout rates, analysis verdicts and server RSS.
+
+    python bench/load_test.py --concurrency 8 --duration 30 --output load.json
+    python bench/load_test.py --scenario n8n --rate 20 --server-env MAX_CHECK_PROCS=4
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+STUB_PROVER = os.path.join(BENCH_DIR, 'stub_prover.py')
+
+SCENARIOS = {
+    'tamarin-check': ('/tamarin', lambda code: {'code': code, 'mode': 'check'}),
+    'tamarin-prove': ('/tamarin', lambda code: {'code': code, 'mode': 'prove'}),
+    'n8n': ('/n8n/compile', lambda code: {'code': code})
+}
+
+THEORY_NAME_RE = re.compile(r'^(\s*theory\s+)(\w+)', re.MULTILINE)
+
+def load_corpus(directory):
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.spthy'):
+            with open(os.path.join(directory, name)) as f:
+                corpus.append((name, f.read()))
+    if not corpus:
+        raise SystemExit(f'No .spthy theories in {directory}')
+    return corpus
+
+def uniquify(code, tag):
+    """Rename the theory so the request misses the result cache"""
+    return THEORY_NAME_RE.sub(lambda match: f'{match.group(1)}{match.group(2)}_{tag}', code, count=1)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(workdir, stub_env, server_env, startup_timeout=60):
+    """Run app.py against the stub prover and wait until it reports the prover installed"""
+    port = free_port()
+    bin_dir = os.path.join(workdir, 'bin')
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        CACHE_DIR=os.path.join(workdir, 'cache'),
+        HISTORY_DB=os.path.join(workdir, 'history.sqlite3'),
+        WORKSPACE_ROOT=os.path.join(workdir, 'workspaces'),
+        TAMARIN_INSTALL_DIR=bin_dir,
+        TAMARIN_ARTIFACT=STUB_PROVER,
+        TAMARIN_ALLOW_DOWNLOAD='0',
+        TAMARIN_BIN=os.path.join(bin_dir, 'tamarin-prover'),
+        PATH=bin_dir + os.pathsep + os.environ.get('PATH', ''),
+        **stub_env,
+        **server_env
+    )
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, 'app.py')], env=env, cwd=ROOT,
+                            stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f'Server exited during startup, see {log.name}')
+        try:
+            with urllib.request.urlopen(f'{url}/tamarin-status', timeout=2) as response:
+                if json.load(response)['installed']:
+                    return proc, url
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise SystemExit(f'Server did not become ready within {startup_timeout}s, see {log.name}')
+
+def read_rss_mb(pid):
+    """Current and peak resident memory of a process in MB, from /proc"""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    values[line.split(':')[0]] = int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return values
+
+class RssSampler:
+    """Samples a process's resident memory in the background while a scenario runs"""
+
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            values = read_rss_mb(self.pid)
+            if values:
+                self.samples.append(values['VmRSS'])
+            if self.done.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return None
+        return {
+            'start_mb': round(self.samples[0], 1),
+            'mean_mb': round(sum(self.samples) / len(self.samples), 1),
+            'peak_mb': round(max(self.samples), 1),
+            'end_mb': round(self.samples[-1], 1)
+        }
+
+def send(url, payload, timeout):
+    """POST JSON and return (HTTP status, decoded body or None)"""
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json', 'Accept-Encoding': 'identity'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, raw = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, raw = e.code, e.read()
+    try:
+        return status, json.loads(raw)
+    except ValueError:
+        return status, None
+
+def classify(scenario, status, body):
+    """Sort a response into ok, rejected (shed by admission control), timeout or error"""
+    if status in (429, 503):
+        return 'rejected'
+    body = body if isinstance(body, dict) else {}
+    if status == 408 or (not body.get('success') and body.get('limit') == 'wall_time'):
+        return 'timeout'
+    if scenario == 'n8n':
+        # 400 is the endpoint's answer for theories with errors, not a failed request
+        return 'ok' if status in (200, 400) and 'returncode' in body else 'error'
+    return 'ok' if status == 200 and body.get('success') else 'error'
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+
+    def add(self, **sample):
+        with self.lock:
+            self.samples.append(sample)
+
+def issue(base_url, scenario, theory, timeout, recorder, scheduled):
+    path, payload = SCENARIOS[scenario]
+    name, code = theory
+    try:
+        status, body = send(base_url + path, payload(code), timeout)
+    except (socket.timeout, TimeoutError):
+        recorder.add(theory=name, outcome='timeout', status=None, verdict=None, latency=None)
+        return
+    except OSError as e:
+        if isinstance(getattr(e, 'reason', None), (socket.timeout, TimeoutError)):
+            recorder.add(theory=name, outcome='timeout', status=None, verdict=None, latency=None)
+        else:
+            recorder.add(theory=name, outcome='error', status=None, verdict=None, latency=None)
+        return
+    recorder.add(theory=name, outcome=classify(scenario, status, body), status=status,
+                 verdict=body.get('status') if isinstance(body, dict) else None,
+                 latency=time.monotonic() - scheduled)
+
+class TheoryPicker:
+    """Draws corpus theories, renaming all but a cache_ratio share so they miss the result cache"""
+
+    def __init__(self, corpus, cache_ratio, seed, prefix):
+        self.corpus = corpus
+        self.prefix = prefix
+        self.cache_ratio = cache_ratio
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def next(self):
+        with self.lock:
+            name, code = self.random.choice(self.corpus)
+            self.count += 1
+            if self.random.random() >= self.cache_ratio:
+                code = uniquify(code, f'{self.prefix}_{self.count}')
+            return name, code
+
+def run_closed(base_url, scenario, picker, concurrency, duration, timeout, recorder):
+    deadline = time.monotonic() + duration
+
+    def client():
+        while time.monotonic() < deadline:
+            issue(base_url, scenario, picker.next(), timeout, recorder, time.monotonic())
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def run_open(base_url, scenario, picker, rate, duration, timeout, recorder, max_in_flight, seed):
+    # Latency is measured from the scheduled arrival, so a slow server is not
+    # hidden by requests waiting for a free client thread
+    arrivals = random.Random(seed)
+    started = time.monotonic()
+    scheduled = started
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        while True:
+            scheduled += arrivals.expovariate(rate)
+            if scheduled - started > duration:
+                break
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(issue, base_url, scenario, picker.next(), timeout, recorder, scheduled)
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of sorted samples"""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def count(values):
+    counts = {}
+    for value in values:
+        counts[str(value)] = counts.get(str(value), 0) + 1
+    return counts
+
+def summarize(samples, elapsed):
+    total = len(samples)
+    outcomes = count(sample['outcome'] for sample in samples)
+    latencies = sorted(sample['latency'] for sample in samples if sample['latency'] is not None)
+    summary = {
+        'requests': total,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(outcomes.get('ok', 0) / elapsed, 3) if elapsed else 0.0,
+        'outcomes': outcomes,
+        'error_rate': round(outcomes.get('error', 0) / total, 4) if total else 0.0,
+        'rejection_rate': round(outcomes.get('rejected', 0) / total, 4) if total else 0.0,
+        'timeout_rate': round(outcomes.get('timeout', 0) / total, 4) if total else 0.0,
+        'http_status': count(sample['status'] for sample in samples if sample['status'] is not None),
+        'verdicts': count(sample['verdict'] for sample in samples if sample['verdict'] is not None),
+        'latency_seconds': None
+    }
+    if latencies:
+        summary['latency_seconds'] = {
+            'mean': round(sum(latencies) / len(latencies), 4),
+            'p50': round(percentile(latencies, 0.50), 4),
+            'p95': round(percentile(latencies, 0.95), 4),
+            'p99': round(percentile(latencies, 0.99), 4),
+            'max': round(latencies[-1], 4)
+        }
+    return summary
+
+def parse_env(pairs):
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise SystemExit(f'--server-env expects KEY=VALUE, got {pair!r}')
+        env[key] = value
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='load-test a running server instead of starting one with the stub prover')
+    parser.add_argument('--server-pid', type=int, help='pid of the --url server, to sample its RSS')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='scenario to run; repeat for several (default: all)')
+    parser.add_argument('--corpus', default=os.path.join(BENCH_DIR, 'corpus'))
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent clients in closed-loop mode')
+    parser.add_argument('--rate', type=float, help='requests per second; switches to open-loop arrivals')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='cap on outstanding open-loop requests')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per scenario')
+    parser.add_argument('--timeout', type=float, default=150, help='client timeout per request in seconds')
+    parser.add_argument('--cache-ratio', type=float, default=0.0,
+                        help='share of requests sent unchanged, so they can hit the result cache')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--check-seconds', type=float, default=0.05, help='stub prover check latency')
+    parser.add_argument('--prove-seconds', type=float, default=0.2, help='stub prover latency per lemma')
+    parser.add_argument('--jitter', type=float, default=0.25, help='relative spread of stub latencies')
+    parser.add_argument('--trace-lines', type=int, default=20, help='stub proof trace lines per lemma')
+    parser.add_argument('--server-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the started server, e.g. MAX_CHECK_PROCS=4')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    scenarios = args.scenario or list(SCENARIOS)
+    stub_env = {
+        'STUB_CHECK_SECONDS': str(args.check_seconds),
+        'STUB_PROVE_SECONDS': str(args.prove_seconds),
+        'STUB_JITTER': str(args.jitter),
+        'STUB_TRACE_LINES': str(args.trace_lines)
+    }
+    server_env = parse_env(args.server_env)
+
+    with tempfile.TemporaryDirectory(prefix='tamarin-load-') as workdir:
+        proc = None
+        if args.url:
+            base_url, pid = args.url.rstrip('/'), args.server_pid
+        else:
+            proc, base_url = start_server(workdir, stub_env, server_env)
+            pid = proc.pid
+        try:
+            results = {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'target': args.url or 'local server with stub prover',
+                'mode': 'open' if args.rate else 'closed',
+                'concurrency': None if args.rate else args.concurrency,
+                'rate': args.rate,
+                'duration': args.duration,
+                'cache_ratio': args.cache_ratio,
+                'corpus': [name for name, _ in corpus],
+                'stub': None if args.url else stub_env,
+                'server_env': server_env,
+                'scenarios': {}
+            }
+            for scenario in scenarios:
+                recorder = Recorder()
+                picker = TheoryPicker(corpus, args.cache_ratio, args.seed, prefix=scenario.replace('-', '_'))
+                sampler = RssSampler(pid) if pid else None
+                started = time.monotonic()
+                with sampler or contextlib.nullcontext():
+                    if args.rate:
+                        run_open(base_url, scenario, picker, args.rate, args.duration, args.timeout, recorder,
+                                 args.max_in_flight, args.seed)
+                    else:
+                        run_closed(base_url, scenario, picker, args.concurrency, args.duration, args.timeout,
+                                   recorder)
+                summary = summarize(recorder.samples, time.monotonic() - started)
+                summary['server_rss'] = sampler.summary() if sampler is not None else None
+                results['scenarios'][scenario] = summary
+            if pid:
+                # VmHWM also catches spikes between samples
+                peak = read_rss_mb(pid)
+                sampled = [s['server_rss']['peak_mb'] for s in results['scenarios'].values() if s['server_rss']]
+                results['server_peak_rss_mb'] = round(max(sampled + ([peak['VmHWM']] if peak else [])), 1)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Stand-in tamarin-prover for offline benchmarks.
+
+Answers --version, --check-only and --prove[=lemma] like the real prover,
+with latency and output volume scripted by environment variables:
+
+    STUB_CHECK_SECONDS   time taken by a check run (default 0.05)
+    STUB_RULE_SECONDS    extra time per rule in the theory, on every run (default 0.002)
+    STUB_PROVE_SECONDS   time taken per proved lemma (default 0.2)
+    STUB_JITTER          relative random spread of those times (default 0.25)
+    STUB_TRACE_LINES     proof trace lines printed per proved lemma (default 20)
+
+A theory whose last line is not `end` is reported as a parse error. Lemmas
+whose name contains "attack" are falsified, all others verified. Theories
+from gen_theories.py with an `// expected: <category>` header get the
+matching parse or wellformedness error.
+`interactive --port=N` serves a minimal version of the prover's web UI for
+the daemon backend, whose theory overviews carry the same wellformedness
+warning.
+"""
+import os
+import random
+import re
+import sys
+import time
+
+LEMMA_RE = re.compile(r'^\s*lemma\s+(\w+)[^:]*:\s*(exists-trace|all-traces)?', re.MULTILINE)
+RULE_RE = re.compile(r'^\s*rule\s', re.MULTILINE)
+EXPECTED_RE = re.compile(r'^// expected: (.+)$', re.MULTILINE)
+
+def scripted_sleep(variable, default, times=1):
+    base = float(os.environ.get(variable, default)) * times
+    jitter = float(os.environ.get('STUB_JITTER', 0.25))
+    time.sleep(max(0.0, base * random.uniform(1 - jitter, 1 + jitter)))
+
+def parse_error(path, source):
+    lines = source.rstrip().splitlines()
+    expected = EXPECTED_RE.search(source)
+    if expected and expected.group(1) == 'parse error':
+        return f'"{path}" (line 8, column 1):\nunexpected "--["\nexpecting "]"\n'
+    if lines and lines[-1].strip() == 'end':
+        return None
+    return (f'"{path}" (line {len(lines) + 1}, column 1):\n'
+            'unexpected end of input\n'
+            'expecting "end"\n')
+
+def serve(port):
+    import http.server
+
+    overviews = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, body):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.end_headers()
+            self.wfile.write(body.encode('utf-8'))
+
+        def do_GET(self):
+            match = re.match(r'/thy/trace/(\d+)/overview/', self.path)
+            if match and int(match.group(1)) < len(overviews):
+                self.reply(overviews[int(match.group(1))])
+            else:
+                self.reply('<html><body>Welcome to the Tamarin prover</body></html>')
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8', errors='replace')
+            scripted_sleep('STUB_CHECK_SECONDS', 0.05)
+            source = body.split('\r\n\r\n', 1)[-1].rsplit('\r\n--', 1)[0]
+            error = parse_error('theory.spthy', source)
+            if error:
+                self.reply(f'<div class="message">Theory loading failed:<pre>{error}</pre></div>')
+                return
+            expected = EXPECTED_RE.search(source)
+            warning = '<pre>WARNING: 1 wellformedness check failed!</pre>' if expected else ''
+            overviews.append(f'<html><body><h1>Theory overview</h1>{warning}</body></html>')
+            links = ''.join(f'<a href="/thy/trace/{index}/overview/help">theory.spthy</a>'
+                            for index in range(len(overviews)))
+            self.reply(f'<div class="message">Loaded new theory!</div>{links}')
+
+    http.server.ThreadingHTTPServer(('127.0.0.1', port), Handler).serve_forever()
+
+def main():
+    args = sys.argv[1:]
+    if '--version' in args:
+        print('tamarin-prover 1.8.0, (C) David Basin, Cas Cremers, Jannik Dreier, Simon Meier, Ralf Sasse, '
+              'Benedikt Schmidt, 2010-2023 (benchmark stub)')
+        return 0
+    if args and args[0] == 'interactive':
+        serve(int(next(arg for arg in args if arg.startswith('--port=')).split('=', 1)[1]))
+        return 0
+
+    path = [arg for arg in args if not arg.startswith('-')][-1]
+    with open(path) as f:
+        source = f.read()
+    prove = [arg for arg in args if arg.startswith('--prove')]
+    selected = prove[-1].split('=', 1)[1] if prove and '=' in prove[-1] else None
+
+    print('maude tool: \'maude\'')
+    print(' checking version: 3.2.1. OK.')
+    print(' checking installation: OK.')
+    sys.stdout.flush()
+
+    scripted_sleep('STUB_RULE_SECONDS', 0.002, times=len(RULE_RE.findall(source)))
+    error = parse_error(path, source)
+    if error:
+        scripted_sleep('STUB_CHECK_SECONDS', 0.05)
+        sys.stderr.write(error)
+        return 1
+    expected = EXPECTED_RE.search(source)
+
+    lemmas = LEMMA_RE.findall(source)
+    if not prove:
+        scripted_sleep('STUB_CHECK_SECONDS', 0.05)
+    trace_lines = int(os.environ.get('STUB_TRACE_LINES', 20))
+    proved = {}
+    for name, kind in lemmas:
+        if not prove or (selected is not None and selected != name):
+            continue
+        scripted_sleep('STUB_PROVE_SECONDS', 0.2)
+        for step in range(trace_lines):
+            print(f'  solved goal nr. {step} for {name}: case {step % 3 + 1} of 3')
+        sys.stdout.flush()
+        proved[name] = 'falsified - found trace' if 'attack' in name else 'verified'
+
+    print('=' * 78)
+    print('summary of summaries:\n')
+    print(f'analyzed: {path}\n')
+    print('  processing time: 0.05s\n')
+    if expected:
+        print('  WARNING: 1 wellformedness check failed!')
+        print('           The analysis results might be wrong!\n')
+        print(f'  {expected.group(1).capitalize()} in the generated theory\n')
+    for name, kind in lemmas:
+        if name in proved:
+            steps = 4 if 'attack' in name else 7
+            print(f'  {name} ({kind or "all-traces"}): {proved[name]} ({steps} steps)')
+        else:
+            print(f'  {name} ({kind or "all-traces"}): analysis incomplete (1 steps)')
+    print('\n' + '=' * 78)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+def cache_key(spthy_code, mode, flags, version):
+    """Content address for a prover run of a theory already passed through normalize()"""
+    digest = hashlib.sha256()
+    for part in (spthy_code, mode, ' '.join(flags), version):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    Two-tier cache of prover results.
+
+    Recent entries live in an in-memory LRU; every entry is also written to
+    disk as JSON so it survives restarts. The disk tier is evicted oldest
+    first once it grows past max_disk_bytes, and entries older than max_age
+    seconds are treated as misses.
+    """
+
+    def __init__(self, directory, max_memory_entries=256, max_disk_bytes=256 * 1024 * 1024,
+                 max_age=7 * 24 * 3600):
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        os.makedirs(directory, exist_ok=True)
+        self.disk_bytes = sum(entry.stat().st_size for entry in os.scandir(directory)
+                              if entry.name.endswith('.json'))
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and time.time() - entry['stored_at'] <= self.max_age:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return entry['result']
+            self.memory.pop(key, None)
+
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        with self.lock:
+            if entry is None or time.time() - entry['stored_at'] > self.max_age:
+                if entry is not None:
+                    self._remove(path)
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._remember(key, entry)
+            return entry['result']
+
+    def put(self, key, result):
+        entry = {'stored_at': time.time(), 'result': result}
+        path = self._path(key)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(entry, f)
+        size = os.path.getsize(temp_path)
+
+        with self.lock:
+            if os.path.exists(path):
+                self.disk_bytes -= os.path.getsize(path)
+            os.replace(temp_path, path)
+            self.disk_bytes += size
+            self.stats['stores'] += 1
+            self._remember(key, entry)
+            if self.disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+        except OSError:
+            return
+        self.disk_bytes -= size
+        self.stats['evictions'] += 1
+
+    def _evict_disk(self):
+        """Delete expired entries, then the oldest ones until under the size cap"""
+        entries = sorted(
+            (entry.stat().st_mtime, entry.path)
+            for entry in os.scandir(self.directory) if entry.name.endswith('.json')
+        )
+        cutoff = time.time() - self.max_age
+        for mtime, path in entries:
+            if mtime >= cutoff and self.disk_bytes <= self.max_disk_bytes:
+                break
+            self._remove(path)
+
+    def snapshot(self):
+        with self.lock:
+            lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+            hits = self.stats['memory_hits'] + self.stats['disk_hits']
+            return {
+                **self.stats,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory),
+                'disk_bytes': self.disk_bytes
+            }
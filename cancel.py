@@ -0,0 +1,69 @@
+import threading
+
+class Cancelled(Exception):
+    """Raised when a prover run was cancelled before it finished"""
+
+class CancelToken:
+    """
+    Lets one thread stop prover runs started by another.
+
+    Each run registers how to kill its process with attach(); cancel() calls
+    every registered kill at once, and a kill attached after cancel() runs
+    immediately. One token can cover several concurrent runs, such as the
+    per-lemma provers of a parallel proof.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cancelled = False
+        self.kills = []
+
+    def attach(self, kill):
+        with self.lock:
+            self.kills.append(kill)
+            if self.cancelled:
+                kill()
+
+    def detach(self, kill):
+        with self.lock:
+            if kill in self.kills:
+                self.kills.remove(kill)
+
+    def cancel(self):
+        # Kill under the lock: a run detaches before its process is reaped,
+        # so no kill can reach a pid that has already been reused
+        with self.lock:
+            self.cancelled = True
+            for kill in self.kills:
+                kill()
+
+    def check(self):
+        """Raise Cancelled if the run has been cancelled"""
+        if self.cancelled:
+            raise Cancelled('Run was cancelled')
+
+class SessionRegistry:
+    """Keeps the latest run per client session, cancelling the one it replaces"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def supersede(self, session):
+        """Start a new run for session and cancel the previous one, if still running"""
+        token = CancelToken()
+        with self.lock:
+            previous = self.sessions.get(session)
+            self.sessions[session] = token
+        if previous is not None:
+            previous.cancel()
+        return token
+
+    def finish(self, session, token):
+        with self.lock:
+            if self.sessions.get(session) is token:
+                del self.sessions[session]
+
+    def active(self):
+        with self.lock:
+            return len(self.sessions)
@@ -0,0 +1,130 @@
+import os
+import re
+import tempfile
+from collections import deque
+
+from output_parser import OutputParser, merge_results, parse_output
+
+# Characters of each output stream returned inline: the first and last half, the rest is paged from the run history
+OUTPUT_INLINE_CHARS = int(os.environ.get('OUTPUT_INLINE_KB', 256)) * 1024
+
+CHUNK_CHARS = 64 * 1024
+
+OMITTED_RE = re.compile(r'\n\[\.\.\. \d+ characters omitted \.\.\.\]\n')
+
+def _clip(head, omitted, tail):
+    return f'{head}\n[... {omitted} characters omitted ...]\n{tail}'
+
+def clip_output(text):
+    """Cut output longer than OUTPUT_INLINE_CHARS down to its head and tail; clipped text is passed through"""
+    if len(text) <= OUTPUT_INLINE_CHARS:
+        return text
+    half = OUTPUT_INLINE_CHARS // 2
+    if OMITTED_RE.fullmatch(text, half, len(text) - half):
+        return text
+    return _clip(text[:half], len(text) - 2 * half, text[-half:])
+
+def lines(chunks):
+    """Split a stream of text chunks into lines, keeping their line ends"""
+    pending = ''
+    for chunk in chunks:
+        parts = (pending + chunk).split('\n')
+        pending = parts.pop()
+        for part in parts:
+            yield f'{part}\n'
+    if pending:
+        yield pending
+
+class Capture:
+    """
+    One output stream of a prover run.
+
+    Lines are parsed as they are written and only the head and tail of the
+    stream, as clip_output would keep them, stay in memory. With a spool
+    the full text is also written to a temporary file, which moves to disk
+    past spool_size bytes and can be read back in chunks. parse=False
+    leaves lines unparsed for callers that already know what they say.
+    """
+
+    def __init__(self, spool_size=None, parse=True):
+        self.spool = None
+        if spool_size is not None:
+            self.spool = tempfile.SpooledTemporaryFile(max_size=spool_size, mode='w+', encoding='utf-8')
+        self.parser = OutputParser() if parse else None
+        self.half = OUTPUT_INLINE_CHARS // 2
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.size = 0
+
+    def write(self, line):
+        if self.spool is not None:
+            self.spool.write(line)
+        if self.parser is not None:
+            self.parser.feed(line)
+        self.size += len(line)
+        room = self.half - self.head_size
+        if room > 0:
+            self.head.append(line[:room])
+            self.head_size += len(self.head[-1])
+            line = line[room:]
+            if not line:
+                return
+        self.tail.append(line)
+        self.tail_size += len(line)
+        while self.tail_size - len(self.tail[0]) >= self.half:
+            self.tail_size -= len(self.tail.popleft())
+
+    def text(self):
+        """The whole stream, or its head and tail once it outgrows OUTPUT_INLINE_CHARS"""
+        head, tail = ''.join(self.head), ''.join(self.tail)
+        if self.size <= OUTPUT_INLINE_CHARS:
+            return head + tail
+        tail = tail[-self.half:]
+        return _clip(head, self.size - len(head) - len(tail), tail)
+
+    def chunks(self):
+        """Yield the full text back from the spool"""
+        self.spool.flush()
+        self.spool.seek(0)
+        for chunk in iter(lambda: self.spool.read(CHUNK_CHARS), ''):
+            yield chunk
+
+    def close(self):
+        if self.spool is not None:
+            self.spool.close()
+
+def output_chunks(result, stream):
+    """Yield the full text of one stream of a result, from its capture when the prover run left one"""
+    captures = result.get('captures')
+    if captures:
+        yield from captures[stream].chunks()
+    elif result[stream]:
+        yield result[stream]
+
+def output_size(result, stream):
+    """Characters the prover wrote to a stream, including any that were clipped"""
+    return result.get('output_size', {}).get(stream, len(result[stream]))
+
+def clipped_output(captures):
+    """Output fields of a result from its captures: head and tail of each stream, their full sizes and parse"""
+    return {
+        'stdout': captures['stdout'].text(),
+        'stderr': captures['stderr'].text(),
+        'output_size': {name: capture.size for name, capture in captures.items()},
+        'parsed': merge_results(*(capture.parser.result() for capture in captures.values()))
+    }
+
+def clipped_result(result):
+    """The same fields for any result, clipping output a backend returned whole"""
+    return {
+        'stdout': clip_output(result['stdout']),
+        'stderr': clip_output(result['stderr']),
+        'output_size': {stream: output_size(result, stream) for stream in ('stdout', 'stderr')},
+        'parsed': result['parsed'] if 'parsed' in result else parse_output(result['stdout'], result['stderr'])
+    }
+
+def close_captures(captures):
+    for capture in (captures or {}).values():
+        capture.close()
@@ -0,0 +1,22 @@
+class InvalidDeadline(Exception):
+    """Raised when a client deadline is not a positive number of seconds"""
+    status_code = 400
+
+def parse_deadline(body_value, header_value, default, maximum):
+    """
+    Return the seconds a request may take and whether the client chose it.
+
+    The client deadline comes from the request body or, failing that, the
+    X-Request-Deadline header, as seconds from now. It is capped at
+    maximum; without one the endpoint's default applies.
+    """
+    value = body_value if body_value is not None else header_value
+    if value is None:
+        return default, False
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise InvalidDeadline(f'Deadline must be a number of seconds, got {value!r}')
+    if not seconds > 0:
+        raise InvalidDeadline('Deadline must be a positive number of seconds')
+    return min(seconds, maximum), True
@@ -0,0 +1,41 @@
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+class EventBus:
+    """
+    Bounded ring buffer of structured events with sequence numbers.
+
+    Clients remember the last sequence number they saw and ask only for
+    newer events, either blocking until one arrives or by streaming. When a
+    client falls so far behind that events it has not seen were dropped from
+    the buffer, the reply says so and it should refetch full state.
+    """
+
+    def __init__(self, capacity=1000):
+        self.events = deque(maxlen=capacity)
+        self.seq = 0
+        self.cond = threading.Condition()
+
+    def publish(self, event_type, **data):
+        with self.cond:
+            self.seq += 1
+            self.events.append({'seq': self.seq, 'type': event_type, 'time': time.time(), **data})
+            self.cond.notify_all()
+            return self.seq
+
+    def last_seq(self):
+        with self.cond:
+            return self.seq
+
+    def _since(self, seq):
+        oldest = self.events[0]['seq'] if self.events else self.seq + 1
+        missed = seq + 1 < oldest and seq < self.seq
+        return list(islice(self.events, max(0, seq + 1 - oldest), None)), missed
+
+    def wait(self, seq, timeout):
+        """Return (events newer than seq, whether some were missed), waiting up to timeout"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > seq, timeout)
+            return self._since(seq)
@@ -0,0 +1,468 @@
+const fileInput = document.getElementById('fileInput');
+const codeArea = document.getElementById('codeArea');
+const uploadForm = document.getElementById('uploadForm');
+const uploadArea = document.getElementById('uploadArea');
+const results = document.getElementById('results');
+const processBtn = document.getElementById('processBtn');
+const fileInfo = document.getElementById('fileInfo');
+const checkMode = document.getElementById('checkMode');
+const proveMode = document.getElementById('proveMode');
+const statusBanner = document.getElementById('statusBanner');
+const liveToggle = document.getElementById('liveToggle');
+const liveErrors = document.getElementById('liveErrors');
+
+let currentMode = 'check';
+// Characters of prover output rendered at a time; long proofs would otherwise freeze the page
+const OUTPUT_CHUNK = 200000;
+let tamarinReady = false;
+
+// Reflect the installation state in the status banner
+function renderStatus(data) {
+    tamarinReady = data.installed;
+    if (data.installed) {
+        statusBanner.className = 'status-banner ready';
+        statusBanner.innerHTML = '<strong>✅ Tamarin Prover Ready!</strong><p>You can now analyze your security protocols.</p>';
+        processBtn.disabled = false;
+    } else if (data.installing) {
+        statusBanner.className = 'status-banner installing';
+        statusBanner.innerHTML = '<strong>🔄 Installing Tamarin Prover...</strong><p>Please wait while we set up the verification engine.</p>';
+        processBtn.disabled = true;
+    } else {
+        statusBanner.className = 'status-banner';
+        statusBanner.innerHTML = '<strong>⚠️ Tamarin Installation Failed</strong><p>Please refresh the page to retry installation.</p>';
+        processBtn.disabled = true;
+    }
+}
+
+// Callbacks for jobs this page is waiting on, keyed by job id
+const jobWaiters = {};
+
+function refreshStatus() {
+    return fetch('/tamarin-status')
+        .then(response => response.json())
+        .then(data => {
+            renderStatus(data);
+            return data;
+        });
+}
+
+// Fetch the current state once, then receive only new events pushed by the server
+function subscribeEvents() {
+    refreshStatus().then(data => {
+        const source = new EventSource(`/events/stream?since=${data.seq}`);
+        source.addEventListener('install', (e) => renderStatus(JSON.parse(e.data)));
+        source.addEventListener('job', (e) => {
+            const event = JSON.parse(e.data);
+            if (jobWaiters[event.job_id]) {
+                jobWaiters[event.job_id]();
+            }
+        });
+        source.addEventListener('resync', () => {
+            refreshStatus();
+            Object.values(jobWaiters).forEach(waiter => waiter());
+        });
+    }).catch(() => {
+        setTimeout(subscribeEvents, 5000);
+    });
+}
+
+subscribeEvents();
+
+// Mode selection
+checkMode.addEventListener('click', () => {
+    currentMode = 'check';
+    checkMode.classList.add('active');
+    proveMode.classList.remove('active');
+});
+
+proveMode.addEventListener('click', () => {
+    currentMode = 'prove';
+    proveMode.classList.add('active');
+    checkMode.classList.remove('active');
+});
+
+// File upload handling
+uploadArea.addEventListener('click', () => fileInput.click());
+
+uploadArea.addEventListener('dragover', (e) => {
+    e.preventDefault();
+    uploadArea.classList.add('dragover');
+});
+
+uploadArea.addEventListener('dragleave', () => {
+    uploadArea.classList.remove('dragover');
+});
+
+uploadArea.addEventListener('drop', (e) => {
+    e.preventDefault();
+    uploadArea.classList.remove('dragover');
+    const files = e.dataTransfer.files;
+    if (files.length > 0) {
+        handleFile(files[0]);
+    }
+});
+
+fileInput.addEventListener('change', (e) => {
+    if (e.target.files.length > 0) {
+        handleFile(e.target.files[0]);
+    }
+});
+
+function handleFile(file) {
+    if (!file.name.endsWith('.spthy')) {
+        alert('Please upload a .spthy file');
+        return;
+    }
+
+    fileInfo.style.display = 'block';
+    fileInfo.innerHTML = `
+        <strong>📄 ${file.name}</strong> 
+        <span style="color: #666; margin-left: 10px;">${(file.size/1024).toFixed(1)} KB</span>
+    `;
+
+    const reader = new FileReader();
+    reader.onload = (e) => {
+        codeArea.value = e.target.result;
+        if (liveToggle.checked) {
+            liveCheck();
+        }
+    };
+    reader.readAsText(file);
+}
+
+// Live check: debounce edits, cancel the request for stale text and show errors inline
+const LIVE_DEBOUNCE_MS = 600;
+const liveSession = window.crypto && crypto.randomUUID ? crypto.randomUUID() : String(Math.random()).slice(2);
+let liveTimer = null;
+let liveController = null;
+
+codeArea.addEventListener('input', () => {
+    if (!liveToggle.checked) {
+        return;
+    }
+    clearTimeout(liveTimer);
+    liveTimer = setTimeout(liveCheck, LIVE_DEBOUNCE_MS);
+});
+
+liveToggle.addEventListener('change', () => {
+    if (liveToggle.checked) {
+        liveCheck();
+    } else {
+        clearTimeout(liveTimer);
+        if (liveController) {
+            liveController.abort();
+        }
+        liveErrors.style.display = 'none';
+    }
+});
+
+async function liveCheck() {
+    const code = codeArea.value;
+    if (!tamarinReady || !code.trim()) {
+        return;
+    }
+    if (liveController) {
+        liveController.abort();
+    }
+    const controller = new AbortController();
+    liveController = controller;
+    showLiveMessage('', '⏳ Checking...');
+
+    try {
+        const response = await fetch('/tamarin/live', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({code: code, session: liveSession}),
+            signal: controller.signal
+        });
+        const result = await response.json();
+        // The server answers 409 to a check that a newer one replaced
+        if (controller === liveController && result.status !== 'cancelled') {
+            renderLiveResult(result);
+        }
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            showLiveMessage('error', `❌ ${error.message}`);
+        }
+    }
+}
+
+function showLiveMessage(className, text) {
+    liveErrors.style.display = 'block';
+    liveErrors.className = `live-errors ${className}`;
+    liveErrors.textContent = text;
+}
+
+function renderLiveResult(result) {
+    const errors = (result.parsed && result.parsed.errors) || [];
+    if (result.success) {
+        showLiveMessage('success', result.message);
+        return;
+    }
+    showLiveMessage('error', result.message || result.error);
+    errors.forEach(error => {
+        const entry = document.createElement('button');
+        entry.type = 'button';
+        entry.className = 'live-error';
+        entry.textContent = `Line ${error.line}, column ${error.column}: ${error.message}`;
+        entry.addEventListener('click', () => jumpTo(error.line, error.column));
+        liveErrors.append(entry);
+    });
+}
+
+// Put the cursor at a 1-based line and column of the editor
+function jumpTo(line, column) {
+    const lines = codeArea.value.split('\n');
+    let offset = 0;
+    for (let i = 0; i < line - 1 && i < lines.length; i++) {
+        offset += lines[i].length + 1;
+    }
+    const lineLength = (lines[line - 1] || '').length;
+    codeArea.focus();
+    codeArea.setSelectionRange(offset + Math.min(column - 1, lineLength), offset + lineLength);
+}
+
+// Form submission
+uploadForm.addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const code = codeArea.value.trim();
+
+    if (!code) {
+        alert('Please provide Tamarin theory code to analyze');
+        return;
+    }
+
+    processBtn.disabled = true;
+    processBtn.innerHTML = '⏳ Processing...';
+
+    results.innerHTML = `
+        <div class="result loading">
+            <h3>🔄 Running Tamarin Analysis...</h3>
+            <p>Please wait while we ${currentMode === 'check' ? 'check your theory' : 'prove the lemmas'}</p>
+        </div>
+    `;
+
+    try {
+        if (currentMode === 'prove') {
+            displayResults(await runProveJob(code));
+        } else {
+            displayResults(await runStreaming(code, currentMode));
+        }
+    } catch (error) {
+        const message = document.createElement('p');
+        message.textContent = error.message;
+        resultBox('error', '❌ Network Error').append(message);
+    } finally {
+        processBtn.disabled = false;
+        processBtn.innerHTML = '🔒 Run Tamarin Analysis';
+    }
+});
+
+// Live output pane that prover output is appended to as it arrives
+let liveShown = 0;
+
+function startLiveOutput(title) {
+    results.innerHTML = `
+        <div class="result loading">
+            <h3 id="liveTitle">🔄 ${title}</h3>
+            <pre id="liveOutput"></pre>
+        </div>
+    `;
+    liveShown = 0;
+}
+
+function setLiveTitle(title) {
+    document.getElementById('liveTitle').textContent = `🔄 ${title}`;
+}
+
+function appendOutput(text) {
+    if (liveShown >= OUTPUT_CHUNK) {
+        return;
+    }
+    const pane = document.getElementById('liveOutput');
+    pane.append(text.slice(0, OUTPUT_CHUNK - liveShown));
+    liveShown += text.length;
+    if (liveShown >= OUTPUT_CHUNK) {
+        pane.append('\n[... more output follows, shown when the analysis finishes ...]');
+    }
+}
+
+// Check runs stream prover output as Server-Sent Events
+async function runStreaming(code, mode) {
+    const response = await fetch('/tamarin/stream', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({code: code, mode: mode})
+    });
+    if (!response.ok) {
+        return await response.json();
+    }
+
+    startLiveOutput('Running Tamarin Analysis...');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let output = '';
+    let final = null;
+
+    while (true) {
+        const {value, done} = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, {stream: true});
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const chunk = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            // Comments such as the server's keepalives carry no event
+            const eventLine = chunk.match(/^event: (.*)$/m);
+            const dataLine = chunk.match(/^data: (.*)$/m);
+            if (chunk.startsWith(':') || !eventLine || !dataLine) {
+                continue;
+            }
+            const event = eventLine[1];
+            const data = JSON.parse(dataLine[1]);
+
+            if (event === 'output') {
+                output += data.text;
+                appendOutput(data.text);
+            } else if (event === 'result') {
+                final = {success: true, output: output, returncode: data.returncode, mode: data.mode,
+                         runId: data.run_id};
+            } else if (event === 'error') {
+                final = {success: false, error: data.error};
+            }
+        }
+    }
+
+    return final || {success: false, error: 'Connection closed before the analysis finished'};
+}
+
+// Prove runs go through the job queue so the request returns at once
+async function runProveJob(code) {
+    const response = await fetch('/jobs', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({code: code, mode: 'prove'})
+    });
+    const submitted = await response.json();
+    if (!submitted.success) {
+        return submitted;
+    }
+
+    startLiveOutput('Waiting for a prover...');
+    const jobId = submitted.job_id;
+    let output = '';
+    let offset = 0;
+
+    return new Promise((resolve, reject) => {
+        const refresh = async () => {
+            const job = await (await fetch(`/jobs/${jobId}?offset=${offset}`)).json();
+            output += job.output;
+            offset = job.output_offset;
+            appendOutput(job.output);
+
+            if (job.status === 'queued' || job.status === 'running') {
+                setLiveTitle(job.status === 'queued' ? 'Waiting for a prover...' : 'Proving lemmas...');
+                return;
+            }
+
+            delete jobWaiters[jobId];
+            if (job.status !== 'completed') {
+                resolve({success: false, error: job.error});
+            } else {
+                resolve({success: true, output: output, returncode: job.result.returncode, mode: job.mode,
+                         runId: job.result.run_id});
+            }
+        };
+
+        // Job events trigger a refresh; refreshes run one at a time so offsets stay in order
+        let pending = Promise.resolve();
+        jobWaiters[jobId] = () => {
+            pending = pending.then(refresh).catch(reject);
+        };
+        jobWaiters[jobId]();
+    });
+}
+
+// Replace the results pane with an empty result box and return it
+function resultBox(className, title) {
+    const box = document.createElement('div');
+    box.className = `result ${className}`;
+    const heading = document.createElement('h3');
+    heading.textContent = title;
+    box.append(heading);
+    results.replaceChildren(box);
+    return box;
+}
+
+// Render output as text a chunk at a time, with a link to the stored copy of the run
+function renderOutput(box, output, runId) {
+    const pre = document.createElement('pre');
+    const more = document.createElement('button');
+    more.type = 'button';
+    more.className = 'show-more';
+    let shown = 0;
+
+    const showNext = () => {
+        pre.append(output.slice(shown, shown + OUTPUT_CHUNK));
+        shown = Math.min(output.length, shown + OUTPUT_CHUNK);
+        if (shown >= output.length) {
+            more.remove();
+        } else {
+            more.textContent = `Show more (${(output.length - shown).toLocaleString()} characters left)`;
+        }
+    };
+    more.addEventListener('click', showNext);
+    box.append(pre, more);
+    showNext();
+
+    if (runId) {
+        const link = document.createElement('a');
+        link.className = 'output-link';
+        link.href = `/runs/${runId}/output?format=text`;
+        link.target = '_blank';
+        link.textContent = 'Open full output';
+        box.append(link);
+    }
+}
+
+function displayResults(result) {
+    if (!result.success) {
+        const error = document.createElement('pre');
+        error.textContent = result.error;
+        resultBox('error', '❌ Tamarin Error').append(error);
+        return;
+    }
+
+    if (result.output) {
+        const output = result.output.toLowerCase();
+        const hasErrors = output.includes('error') || 
+                         output.includes('failed') ||
+                         result.returncode !== 0;
+
+        const hasWarnings = output.includes('warning');
+
+        let resultClass = 'success';
+        let resultIcon = '✅';
+        let resultTitle = 'Analysis Complete';
+
+        if (hasErrors) {
+            resultClass = 'error';
+            resultIcon = '❌';
+            resultTitle = 'Analysis Failed';
+        } else if (hasWarnings) {
+            resultClass = 'warning';
+            resultIcon = '⚠️';
+            resultTitle = 'Analysis Complete with Warnings';
+        }
+
+        renderOutput(resultBox(resultClass, `${resultIcon} ${resultTitle}`), result.output, result.runId);
+    } else {
+        const message = document.createElement('p');
+        message.textContent = 'Tamarin analysis completed successfully.';
+        resultBox('success', '✅ Analysis Complete').append(message);
+    }
+}
@@ -0,0 +1,358 @@
+import codecs
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+
+from capture import Capture, clipped_output, clipped_result, lines, output_chunks
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    cache_key TEXT NOT NULL,
+    theory_hash TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    flags TEXT NOT NULL,
+    prover_version TEXT NOT NULL,
+    backend TEXT,
+    status TEXT NOT NULL,
+    returncode INTEGER,
+    duration REAL,
+    cpu_seconds REAL,
+    max_rss_bytes INTEGER,
+    limit_hit TEXT,
+    output BLOB NOT NULL,
+    output_bytes INTEGER NOT NULL DEFAULT 0,
+    clipped BLOB
+);
+CREATE INDEX IF NOT EXISTS runs_theory ON runs (theory_hash, mode, status, created_at);
+CREATE INDEX IF NOT EXISTS runs_cache_key ON runs (cache_key, created_at);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at);
+
+CREATE TABLE IF NOT EXISTS lemmas (
+    run_id TEXT NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    verdict TEXT,
+    trace_type TEXT,
+    steps INTEGER
+);
+CREATE INDEX IF NOT EXISTS lemmas_name ON lemmas (name, verdict);
+CREATE INDEX IF NOT EXISTS lemmas_run ON lemmas (run_id);
+
+CREATE TABLE IF NOT EXISTS outputs (
+    run_id TEXT NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    stream TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (run_id, stream)
+);
+'''
+
+SUMMARY_COLUMNS = ('id', 'created_at', 'cache_key', 'theory_hash', 'mode', 'flags', 'prover_version', 'backend',
+                   'status', 'returncode', 'duration', 'cpu_seconds', 'max_rss_bytes', 'limit_hit')
+
+def theory_hash(normalized_code):
+    return hashlib.sha256(normalized_code.encode('utf-8')).hexdigest()
+
+STREAMS = ('stdout', 'stderr')
+
+# Compressed output is staged in memory up to this size, then in a temporary file
+COMPRESS_SPOOL_BYTES = 1024 * 1024
+BLOB_CHUNK_BYTES = 64 * 1024
+TEXT_CHUNK_BYTES = 256 * 1024
+
+def decompress_output(blob):
+    """Decode the single JSON blob runs recorded before outputs were stored per stream"""
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+def compress_chunks(chunks):
+    """Compress text chunks into a temporary file; return it with the text's length in characters and bytes"""
+    compressed = tempfile.SpooledTemporaryFile(max_size=COMPRESS_SPOOL_BYTES)
+    compressor = zlib.compressobj(6)
+    size = length = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        size += len(chunk)
+        length += len(data)
+        compressed.write(compressor.compress(data))
+    compressed.write(compressor.flush())
+    compressed.seek(0)
+    return compressed, size, length
+
+def _tee(chunks, capture):
+    """Pass text chunks through, keeping their head and tail in an unparsed capture"""
+    for chunk in chunks:
+        capture.write(chunk)
+        yield chunk
+
+class StoredOutput:
+    """One recorded output stream, with its size in characters and length in UTF-8 bytes, read back in chunks"""
+
+    def __init__(self, size, length, byte_chunks):
+        self.size = size
+        self.length = length
+        self.byte_chunks = byte_chunks
+
+    def text_chunks(self):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for data in self.byte_chunks():
+            text = decoder.decode(data)
+            if text:
+                yield text
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
+
+    @classmethod
+    def from_text(cls, text):
+        data = text.encode('utf-8')
+        return cls(len(text), len(data), lambda: iter([data] if data else []))
+
+class RunHistory:
+    """
+    Persistent record of prover runs in SQLite.
+
+    The database runs in WAL mode so readers never block the writer. Each
+    output stream is stored zlib-compressed in its own row, written and
+    read back in chunks through incremental blob I/O, so no output is ever
+    held in memory whole; per-lemma verdicts live in their own table so
+    runs can be looked up by lemma.
+
+    Runs older than max_age seconds are pruned when the history is opened
+    and after every prune_every recorded runs, which also drops the oldest
+    runs beyond max_runs rows or max_bytes of compressed output; 0 turns a
+    cap off.
+    """
+
+    def __init__(self, path, max_age=90 * 24 * 3600, max_runs=0, max_bytes=0, prune_every=100):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.max_age = max_age
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self.recorded = 0
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('PRAGMA foreign_keys=ON')
+        self.db.executescript(SCHEMA)
+        columns = [row['name'] for row in self.db.execute('PRAGMA table_info(runs)')]
+        if 'output_bytes' not in columns:
+            # Histories written before the size cap existed
+            self.db.execute('ALTER TABLE runs ADD COLUMN output_bytes INTEGER NOT NULL DEFAULT 0')
+            self.db.execute('UPDATE runs SET output_bytes = LENGTH(output)')
+        if 'clipped' not in columns:
+            # Histories written before the clipped output was kept with the run
+            self.db.execute('ALTER TABLE runs ADD COLUMN clipped BLOB')
+        with self.lock:
+            self.prune()
+
+    def prune(self):
+        """Delete runs past max_age and the oldest runs beyond max_runs or max_bytes; call with the lock held"""
+        self.db.execute('DELETE FROM runs WHERE created_at < ?', (time.time() - self.max_age,))
+        if self.max_runs:
+            self.db.execute(
+                'DELETE FROM runs WHERE id IN (SELECT id FROM runs ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_runs,)
+            )
+        if self.max_bytes:
+            self.db.execute(
+                'DELETE FROM runs WHERE id IN (SELECT id FROM (SELECT id, SUM(output_bytes) OVER '
+                '(ORDER BY created_at DESC) AS total FROM runs) WHERE total > ?)',
+                (self.max_bytes,)
+            )
+
+    def record(self, cache_key, normalized_code, mode, flags, version, status, result, lemmas, output=None):
+        """
+        Store a finished or timed-out run and return its id.
+
+        output maps each stream to the text chunks to store. By default the
+        full output is read from the result's captures when the prover run
+        left them, so a clipped result is recorded in full.
+
+        The clipped output and its parse are kept with the run as well, so
+        find() and get() answer without inflating the stored output.
+        """
+        run_id = uuid.uuid4().hex
+        if output is None:
+            outputs = {stream: compress_chunks(output_chunks(result, stream)) for stream in STREAMS}
+            clipped = clipped_result(result)
+        else:
+            # Only the head and tail are taken from the output; the result says what it parses to
+            captures = {stream: Capture(parse=False) for stream in STREAMS}
+            outputs = {stream: compress_chunks(_tee(output[stream], captures[stream])) for stream in STREAMS}
+            clipped = dict(clipped_result(result), **{stream: captures[stream].text() for stream in STREAMS},
+                           output_size={stream: captures[stream].size for stream in STREAMS})
+        clipped = zlib.compress(json.dumps(clipped).encode('utf-8'), 6)
+        try:
+            compressed_bytes = len(clipped) + sum(compressed.seek(0, os.SEEK_END)
+                                                  for compressed, _, _ in outputs.values())
+            row = (
+                run_id, time.time(), cache_key, theory_hash(normalized_code), mode, ' '.join(flags), version,
+                result.get('backend'), status, result.get('returncode'), result.get('duration'),
+                result.get('cpu_seconds'), result.get('max_rss_bytes'), result.get('limit'), b'', compressed_bytes,
+                clipped
+            )
+            with self.lock:
+                self.db.execute('BEGIN')
+                try:
+                    self.db.execute(f'INSERT INTO runs VALUES ({", ".join("?" * len(row))})', row)
+                    self.db.executemany(
+                        'INSERT INTO lemmas VALUES (?, ?, ?, ?, ?)',
+                        [(run_id, lemma['name'], lemma['verdict'], lemma['trace_type'], lemma['steps'])
+                         for lemma in lemmas]
+                    )
+                    for stream, (compressed, size, length) in outputs.items():
+                        self._write_output(run_id, stream, compressed, size, length)
+                    self.db.execute('COMMIT')
+                except Exception:
+                    self.db.execute('ROLLBACK')
+                    raise
+                self.recorded += 1
+                if self.recorded % self.prune_every == 0:
+                    self.prune()
+        finally:
+            for compressed, _, _ in outputs.values():
+                compressed.close()
+        return run_id
+
+    def _write_output(self, run_id, stream, compressed, size, length):
+        """Copy one compressed stream into a blob of its exact size; call inside a transaction"""
+        compressed_size = compressed.seek(0, os.SEEK_END)
+        compressed.seek(0)
+        rowid = self.db.execute('INSERT INTO outputs VALUES (?, ?, ?, ?, zeroblob(?))',
+                                (run_id, stream, size, length, compressed_size)).lastrowid
+        with self.db.blobopen('outputs', 'data', rowid) as blob:
+            for chunk in iter(lambda: compressed.read(BLOB_CHUNK_BYTES), b''):
+                blob.write(chunk)
+
+    def _blob_chunks(self, rowid):
+        """Yield the decompressed bytes of one stored stream, reading the blob a chunk at a time"""
+        decompressor = zlib.decompressobj()
+        position = 0
+        while True:
+            with self.lock:
+                try:
+                    with self.db.blobopen('outputs', 'data', rowid, readonly=True) as blob:
+                        blob.seek(position)
+                        data = blob.read(BLOB_CHUNK_BYTES)
+                except sqlite3.OperationalError:
+                    # Pruned while it was being read
+                    return
+            if not data:
+                break
+            position += len(data)
+            while data:
+                output = decompressor.decompress(data, TEXT_CHUNK_BYTES)
+                data = decompressor.unconsumed_tail
+                if output:
+                    yield output
+        output = decompressor.flush()
+        if output:
+            yield output
+
+    def output(self, run_id, stream):
+        """Return one output stream of a run as a StoredOutput, or None for an unknown run"""
+        with self.lock:
+            row = self.db.execute('SELECT rowid, size, length FROM outputs WHERE run_id = ? AND stream = ?',
+                                  (run_id, stream)).fetchone()
+            legacy = None
+            if row is None:
+                legacy = self.db.execute('SELECT output FROM runs WHERE id = ?', (run_id,)).fetchone()
+        if row is not None:
+            return StoredOutput(row['size'], row['length'], lambda: self._blob_chunks(row['rowid']))
+        if legacy is None:
+            return None
+        return StoredOutput.from_text(decompress_output(legacy['output'])[stream])
+
+    def _clipped(self, row):
+        """Head and tail of each output stream of a run, with their full sizes and what they parse to"""
+        if row['clipped'] is not None:
+            return json.loads(zlib.decompress(row['clipped']).decode('utf-8'))
+        run_id = row['id']
+        captures = {}
+        for stream in STREAMS:
+            captures[stream] = capture = Capture()
+            stored = self.output(run_id, stream)
+            if stored is not None:
+                for line in lines(stored.text_chunks()):
+                    capture.write(line)
+        return clipped_output(captures)
+
+    def find(self, cache_key):
+        """Return the latest complete run for a cache key as a prover result, or None"""
+        with self.lock:
+            row = self.db.execute(
+                'SELECT * FROM runs WHERE cache_key = ? AND status != ? AND limit_hit IS NULL '
+                'ORDER BY created_at DESC LIMIT 1',
+                (cache_key, 'timeout')
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            **self._clipped(row),
+            'returncode': row['returncode'],
+            'duration': row['duration'],
+            'cpu_seconds': row['cpu_seconds'],
+            'max_rss_bytes': row['max_rss_bytes'],
+            'limit': None,
+            'backend': row['backend'],
+            'run_id': row['id'],
+            'theory_hash': row['theory_hash']
+        }
+
+    def list(self, theory_hash=None, mode=None, status=None, lemma=None, verdict=None, before=None, limit=50):
+        """Return run summaries, newest first, optionally filtered"""
+        clauses, params = [], []
+        for column, value in (('theory_hash', theory_hash), ('mode', mode), ('status', status)):
+            if value is not None:
+                clauses.append(f'runs.{column} = ?')
+                params.append(value)
+        if before is not None:
+            clauses.append('runs.created_at < ?')
+            params.append(before)
+        if lemma is not None or verdict is not None:
+            lemma_clauses = ['lemmas.run_id = runs.id']
+            for column, value in (('name', lemma), ('verdict', verdict)):
+                if value is not None:
+                    lemma_clauses.append(f'lemmas.{column} = ?')
+                    params.append(value)
+            clauses.append(f'EXISTS (SELECT 1 FROM lemmas WHERE {" AND ".join(lemma_clauses)})')
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        query = (f'SELECT {", ".join(SUMMARY_COLUMNS)} FROM runs {where} '
+                 'ORDER BY created_at DESC LIMIT ?')
+        with self.lock:
+            rows = self.db.execute(query, (*params, limit)).fetchall()
+            runs = [dict(row) for row in rows]
+            for run in runs:
+                run['lemmas'] = self._lemmas(run['id'])
+        return runs
+
+    def get(self, run_id):
+        """Return one run with its lemmas and the head and tail of its output, or None"""
+        with self.lock:
+            row = self.db.execute('SELECT * FROM runs WHERE id = ?', (run_id,)).fetchone()
+            if row is None:
+                return None
+            run = {column: row[column] for column in SUMMARY_COLUMNS}
+            run['lemmas'] = self._lemmas(run_id)
+        clipped = self._clipped(row)
+        del clipped['parsed']
+        run.update(clipped)
+        return run
+
+    def _lemmas(self, run_id):
+        rows = self.db.execute('SELECT name, verdict, trace_type, steps FROM lemmas WHERE run_id = ?',
+                               (run_id,)).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,181 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from cancel import CancelToken
+
+# Minimum seconds between progress notifications for a running job
+PROGRESS_INTERVAL = 1.0
+# Output lines a job keeps for polling clients; older lines are dropped, the full output is in the run history
+MAX_OUTPUT_LINES = 10000
+
+class QueueFull(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+class Job:
+    """A theory submitted for asynchronous analysis"""
+
+    def __init__(self, code, mode, parallel=False):
+        self.id = uuid.uuid4().hex
+        self.code = code
+        self.mode = mode
+        self.parallel = parallel
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.output = []
+        self.output_start = 0
+        self.result = None
+        self.error = None
+        self.lock = threading.Lock()
+        self.on_change = None
+        self.last_progress = 0.0
+        self.cancel = CancelToken()
+
+    def append_output(self, stream, line):
+        with self.lock:
+            self.output.append(line)
+            if len(self.output) >= 2 * MAX_OUTPUT_LINES:
+                dropped = len(self.output) - MAX_OUTPUT_LINES
+                del self.output[:dropped]
+                self.output_start += dropped
+            now = time.monotonic()
+            notify = self.on_change is not None and now - self.last_progress >= PROGRESS_INTERVAL
+            if notify:
+                self.last_progress = now
+        if notify:
+            self.on_change(self)
+
+    def output_lines(self):
+        """Number of output lines the job has produced, including dropped ones"""
+        with self.lock:
+            return self.output_start + len(self.output)
+
+    def to_dict(self, offset=0):
+        """Serialize the job, returning output lines from offset onwards, or from the oldest line still kept"""
+        with self.lock:
+            offset = max(offset, self.output_start)
+            output = self.output[offset - self.output_start:]
+            return {
+                'id': self.id,
+                'mode': self.mode,
+                'parallel': self.parallel,
+                'status': self.status,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'output': ''.join(output),
+                'output_offset': offset + len(output),
+                'result': self.result,
+                'error': self.error
+            }
+
+class JobQueue:
+    """Fixed-size pool of worker threads draining a bounded job queue"""
+
+    def __init__(self, run_job, workers=2, max_queued=100, max_jobs=1000, on_change=None):
+        self.run_job = run_job
+        self.on_change = on_change
+        self.max_jobs = max_jobs
+        self.pending = queue.Queue(maxsize=max_queued)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.active = 0
+        self.workers = [
+            threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, code, mode, parallel=False):
+        job = Job(code, mode, parallel)
+        job.on_change = self.on_change
+        try:
+            self.pending.put_nowait(job)
+        except queue.Full:
+            raise QueueFull(f'{self.pending.qsize()} jobs already queued')
+        with self.lock:
+            self.jobs[job.id] = job
+            self._evict()
+        self._notify(job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job and return it, or None if unknown.
+
+        A queued job is marked cancelled at once and skipped by the workers;
+        a running job has its prover killed and finishes as cancelled.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with job.lock:
+            if job.finished_at is not None:
+                return job
+            queued = job.status == 'queued'
+            if queued:
+                job.status = 'cancelled'
+                job.error = 'Cancelled by client'
+                job.finished_at = time.time()
+        job.cancel.cancel()
+        if queued:
+            self._notify(job)
+        return job
+
+    def depth(self):
+        return self.pending.qsize()
+
+    def running(self):
+        with self.lock:
+            return self.active
+
+    def _notify(self, job):
+        if self.on_change is not None:
+            self.on_change(job)
+
+    def _evict(self):
+        """Drop the oldest finished jobs once the history is full"""
+        if len(self.jobs) <= self.max_jobs:
+            return
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].finished_at is not None:
+                del self.jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self.pending.get()
+            with job.lock:
+                cancelled = job.status == 'cancelled'
+                if not cancelled:
+                    job.status = 'running'
+                    job.started_at = time.time()
+            if cancelled:
+                self.pending.task_done()
+                continue
+            with self.lock:
+                self.active += 1
+            self._notify(job)
+            try:
+                status, result, error = self.run_job(job)
+            except Exception as e:
+                status, result, error = 'failed', None, str(e)
+            with job.lock:
+                job.status = status
+                job.result = result
+                job.error = error
+                job.finished_at = time.time()
+            with self.lock:
+                self.active -= 1
+            self._notify(job)
+            self.pending.task_done()
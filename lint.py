@@ -0,0 +1,209 @@
+import re
+
+from normalize import advance
+
+TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<open_comment>/\*)
+  | (?P<directive>^[ \t]*\#(?:ifdef|ifndef|else|endif|define|include)\b[^\n]*)
+  | (?P<public>'[^'\n]*')
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<number>[0-9]+)
+  | (?P<symbol>.)
+""", re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+OPENING = {'(': ')', '[': ']', '{': '}'}
+CLOSING = {')': '(', ']': '[', '}': '{'}
+
+# Function symbols each builtin declares; pairing is always available
+BUILTIN_FUNCTIONS = {
+    'hashing': {'h'},
+    'symmetric-encryption': {'senc', 'sdec'},
+    'asymmetric-encryption': {'aenc', 'adec', 'pk'},
+    'signing': {'sign', 'verify', 'pk', 'true'},
+    'revealing-signing': {'revealSign', 'revealVerify', 'getMessage', 'pk', 'true'},
+    'diffie-hellman': {'inv'},
+    'bilinear-pairing': {'inv', 'pmult', 'em'},
+    'xor': {'zero'},
+    'multiset': set(),
+    'natural-numbers': set(),
+    'reliable-channel': set(),
+    'locations-report': {'rep', 'check_rep', 'get_rep', 'report'},
+    'dest-pairing': set(),
+    'dest-symmetric-encryption': {'senc', 'sdec'},
+    'dest-asymmetric-encryption': {'aenc', 'adec', 'pk'},
+    'dest-signing': {'sign', 'verify', 'pk', 'true'}
+}
+ALWAYS_DECLARED = {'pair', 'fst', 'snd', 'diff'}
+
+# Keywords that end a rule body at bracket depth zero; so does a let that is not a rule's let block
+TOP_LEVEL = {'rule', 'lemma', 'restriction', 'axiom', 'end', 'builtins', 'functions', 'equations', 'heuristic',
+             'tactic', 'predicates', 'predicate', 'options', 'macros', 'process', 'export', 'test', 'accountability',
+             'equivLemma', 'diffEquivLemma', 'diffLemma'}
+
+def tokens(source):
+    """Yield (kind, text, offset) for the significant tokens of a theory"""
+    for match in TOKEN_RE.finditer(source):
+        kind = match.lastgroup
+        if kind not in ('space', 'comment', 'directive'):
+            yield kind, match.group(), match.start()
+
+def position(source, offset):
+    """1-based (line, column) of an offset, with tabs advanced like the prover's parser"""
+    line = source.count('\n', 0, offset) + 1
+    column = 1
+    for char in source[source.rfind('\n', 0, offset) + 1:offset]:
+        column = advance(column, char)
+    return line, column
+
+class Linter:
+    """
+    Single pass over the tokens of a theory that catches defects the prover
+    would reject anyway: a missing theory header, begin or end, unbalanced
+    brackets and quotes, and function symbols applied in rules that neither
+    a functions declaration nor a builtin provides.
+
+    Structural errors stop the pass at once, so obviously broken theories
+    are rejected after a few tokens. The function check is skipped for
+    theories using constructs it does not model (macros, inline
+    restrictions, includes, unknown builtins), as the linter only reports
+    what it is sure of.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.diagnostics = []
+        self.declared = set(ALWAYS_DECLARED)
+        self.applied = []
+        self.builtin_name = None
+        self.check_functions = not re.search(r'\bmacros\b|_restrict|^[ \t]*#include\b', source, re.MULTILINE)
+
+    def report(self, offset, message):
+        line, column = position(self.source, offset)
+        self.diagnostics.append({'line': line, 'column': column, 'message': message})
+
+    def run(self):
+        stream = tokens(self.source)
+        if self.header(stream):
+            self.body(stream)
+        return self.diagnostics
+
+    def header(self, stream):
+        """Check for theory <Name> [configuration: "..."] begin"""
+        expected = [('ident', 'theory'), ('ident', None)]
+        for kind, text in expected:
+            token = next(stream, None)
+            if token is None:
+                self.report(len(self.source), f'unexpected end of input\nexpecting {self.describe(text)}')
+                return False
+            if token[0] != kind or (text is not None and token[1] != text):
+                self.report(token[2], f'unexpected {self.quote(token)}\nexpecting {self.describe(text)}')
+                return False
+        token = next(stream, None)
+        if token is not None and token[1] == 'configuration':
+            for token in stream:
+                if token[1] == 'begin':
+                    break
+        if token is None or token[1] != 'begin':
+            offset = len(self.source) if token is None else token[2]
+            found = 'end of input' if token is None else self.quote(token)
+            self.report(offset, f'unexpected {found}\nexpecting "begin"')
+            return False
+        return True
+
+    def body(self, stream):
+        stack = []
+        last = None
+        previous = None
+        in_rule = False
+        builtins = False
+        functions = False
+        for token in stream:
+            kind, text, offset = token
+            if kind == 'open_comment':
+                self.report(offset, 'unterminated comment\nexpecting "*/"')
+                return
+            quoted = bool(stack) and stack[-1][0] == '"'
+            if text == '"':
+                if quoted:
+                    stack.pop()
+                else:
+                    stack.append((text, offset))
+            elif text in OPENING:
+                stack.append((text, offset))
+            elif text in CLOSING:
+                if not stack or stack[-1][0] != CLOSING[text]:
+                    expecting = f'\nexpecting {self.quote(OPENING.get(stack[-1][0], stack[-1][0]))}' if stack else ''
+                    self.report(offset, f'unexpected {self.quote(text)}{expecting}')
+                    return
+                stack.pop()
+            elif kind == 'ident' and not stack:
+                if text in TOP_LEVEL:
+                    in_rule = text == 'rule'
+                    builtins = text == 'builtins'
+                    functions = text == 'functions'
+                elif text == 'let' and not (in_rule and previous[1] == ':'):
+                    # A SAPIC process definition, whose in(...) and out(...) are not function symbols
+                    in_rule = builtins = functions = False
+                elif builtins:
+                    self.builtin(token, previous)
+            elif builtins and text not in (':', ',', '-'):
+                # Anything but a comma separated list of names is syntax the linter leaves to the prover
+                self.check_functions = False
+            if kind == 'number' and previous is not None and previous[1] == '/' and last is not None:
+                # name/arity in a functions declaration
+                self.declared.add(last[1])
+            if text == '(' and functions and len(stack) == 1 and previous[0] == 'ident':
+                # name(argument sorts): sort in a typed functions declaration
+                self.declared.add(previous[1])
+            if text == '(' and in_rule and previous is not None and previous[0] == 'ident' and stack[:-1] \
+                    and previous[1][0].islower():
+                self.applied.append(previous)
+            last, previous = previous, token
+
+        if stack:
+            opened, offset = stack[-1]
+            closing = '"' if opened == '"' else OPENING[opened]
+            self.report(offset, f'unclosed {self.quote(opened)}\nexpecting {self.quote(closing)} before end of input')
+            return
+        if previous is None or previous[1] != 'end':
+            offset = len(self.source) if previous is None else previous[2] + len(previous[1])
+            self.report(offset, 'unexpected end of input\nexpecting "end"')
+            return
+        if self.check_functions:
+            for _, name, offset in self.applied:
+                if name not in self.declared:
+                    self.report(offset, f'undeclared function symbol "{name}"\n'
+                                        f'declare it under functions: or enable the builtin that provides it')
+
+    def builtin(self, token, previous):
+        """Collect the functions of one builtin name, joining the parts of hyphenated names"""
+        text = token[1]
+        if previous is not None and previous[1] == '-':
+            self.builtin_name = f'{self.builtin_name}-{text}'
+        else:
+            self.builtin_name = text
+        name = self.builtin_name
+        if name in BUILTIN_FUNCTIONS:
+            self.declared |= BUILTIN_FUNCTIONS[name]
+        elif not any(known.startswith(f'{name}-') for known in BUILTIN_FUNCTIONS):
+            self.check_functions = False
+
+    @staticmethod
+    def describe(text):
+        return f'"{text}"' if text is not None else 'a theory name'
+
+    @staticmethod
+    def quote(token):
+        text = token[1] if isinstance(token, tuple) else token
+        return '"\\""' if text == '"' else f'"{text}"'
+
+def lint(source):
+    """Return line and column diagnostics for defects that would make the prover reject a theory"""
+    return Linter(source).run()
+
+def format_diagnostics(diagnostics, filename='theory.spthy'):
+    """Render diagnostics the way the prover reports parse errors, for parse_output()"""
+    return ''.join(f'"{filename}" (line {d["line"]}, column {d["column"]}):\n{d["message"]}\n\n'
+                   for d in diagnostics)
@@ -0,0 +1,134 @@
+import bisect
+
+from output_parser import LOCATION_RE
+
+# Parsec, which tamarin-prover parses with, advances tabs to the next multiple of 8
+TAB_WIDTH = 8
+
+def advance(column, char):
+    """1-based column after a character, with tabs advanced like the prover's parser"""
+    return column + TAB_WIDTH - (column - 1) % TAB_WIDTH if char == '\t' else column + 1
+
+class SourceMap:
+    """
+    Maps positions in a normalized theory back to the original source.
+
+    Normalization never joins lines, so every normalized line comes from
+    one original line. Within a line, each run of kept characters is
+    recorded as a segment of (normalized column, original column).
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.segments = []
+
+    def add_line(self, original_line, segments):
+        self.lines.append(original_line)
+        self.segments.append(segments)
+
+    def position(self, line, column):
+        """Return the original (line, column) of a 1-based normalized position"""
+        if not 1 <= line <= len(self.lines):
+            return line, column
+        segments = self.segments[line - 1]
+        index = bisect.bisect_right([start for start, _ in segments], column) - 1
+        if index < 0:
+            return self.lines[line - 1], column
+        start, original = segments[index]
+        return self.lines[line - 1], original + column - start
+
+    def restore(self, text):
+        """Rewrite "(line N, column M)" locations in prover output to original positions"""
+        def replace(match):
+            line, column = self.position(int(match.group(1)), int(match.group(2)))
+            return f'(line {line}, column {column})'
+        return LOCATION_RE.sub(replace, text)
+
+    def to_dict(self):
+        return {'lines': list(self.lines)}
+
+def normalize(spthy_code):
+    """
+    Strip // and /* */ comments, collapse whitespace and normalize line endings.
+
+    Quoted text is kept apart from comment stripping, blank lines are
+    dropped and each remaining line is trimmed. Returns the normalized
+    theory and a SourceMap back to the original.
+    """
+    source = spthy_code.replace('\r\n', '\n').replace('\r', '\n')
+    source_map = SourceMap()
+    out_lines = []
+
+    line, column = 1, 1
+    chars, segments = [], []
+    pending_space = False
+    quote = None
+    in_block = False
+    contiguous = False
+    i, n = 0, len(source)
+
+    def emit(char):
+        nonlocal pending_space, contiguous
+        if pending_space and chars:
+            chars.append(' ')
+            contiguous = False
+        pending_space = False
+        if not contiguous:
+            segments.append((len(chars) + 1, column))
+            contiguous = True
+        chars.append(char)
+
+    while i < n:
+        char = source[i]
+        if char == '\n':
+            if chars:
+                out_lines.append(''.join(chars))
+                source_map.add_line(line, segments)
+            chars, segments = [], []
+            pending_space = contiguous = False
+            if quote == "'":
+                quote = None
+            line, column = line + 1, 1
+            i += 1
+            continue
+
+        if in_block:
+            if source.startswith('*/', i):
+                in_block = False
+                i, column = i + 2, column + 2
+            else:
+                column = advance(column, char)
+                i += 1
+            continue
+
+        if quote is None and source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if quote is None and source.startswith('/*', i):
+            in_block = True
+            pending_space = True
+            contiguous = False
+            i, column = i + 2, column + 2
+            continue
+
+        if char in ' \t\f\v':
+            pending_space = True
+            contiguous = False
+            column = advance(column, char)
+            i += 1
+            continue
+
+        if char in '"\'':
+            if quote is None:
+                quote = char
+            elif quote == char:
+                quote = None
+        emit(char)
+        column += 1
+        i += 1
+
+    if chars:
+        out_lines.append(''.join(chars))
+        source_map.add_line(line, segments)
+    return '\n'.join(out_lines), source_map
@@ -0,0 +1,125 @@
+import re
+
+# Substrings that classify a run, matched against one lowercased line at a time
+PARSE_ERROR_INDICATORS = [
+    'parse error', 'syntax error', 'lexical error',
+    'unexpected token', 'parsing failed'
+]
+
+WELLFORMEDNESS_ERRORS = [
+    'undeclared function', 'undeclared sort', 'type error',
+    'restriction not satisfied', 'unbound variable'
+]
+
+SUCCESS_INDICATORS = [
+    'wellformedness check succeeded',
+    'all lemmas proved',
+    'theory loaded successfully'
+]
+
+LEMMA_RE = re.compile(
+    r'^\s*([A-Za-z_][A-Za-z0-9_]*) \((all-traces|exists-trace)\): '
+    r'(verified|falsified|analysis incomplete)[^(]*\((\d+) steps?\)'
+)
+PROCESSING_TIME_RE = re.compile(r'^\s*processing time: ([0-9.]+)s')
+LOCATION_RE = re.compile(r'\(line (\d+), column (\d+)\)')
+
+class OutputParser:
+    """
+    Incremental parser for tamarin-prover output.
+
+    Lines are fed one at a time, so output can be parsed while it streams in
+    and every line is lowercased and scanned exactly once.
+    """
+
+    def __init__(self):
+        self.lemmas = []
+        self.processing_time = None
+        self.warnings = []
+        self.errors = []
+        self.has_parse_error = False
+        self.has_wellformedness_error = False
+        self.has_success_indicator = False
+        self._open_error = None
+        self._seen_warnings = set()
+
+    def feed(self, line):
+        line = line.rstrip('\n')
+        lowered = line.lower()
+
+        location = LOCATION_RE.search(line)
+        if location:
+            # Only the theory parser reports source positions
+            self.has_parse_error = True
+            self._open_error = {
+                'line': int(location.group(1)),
+                'column': int(location.group(2)),
+                'message': line[location.end():].strip(' :')
+            }
+            self.errors.append(self._open_error)
+        elif self._open_error is not None:
+            if line.strip():
+                self._open_error['message'] = f"{self._open_error['message']}\n{line.strip()}".strip()
+            else:
+                self._open_error = None
+
+        if not self.has_parse_error and any(i in lowered for i in PARSE_ERROR_INDICATORS):
+            self.has_parse_error = True
+        if any(i in lowered for i in WELLFORMEDNESS_ERRORS):
+            self.has_wellformedness_error = True
+            if location is None and self._open_error is None:
+                self.errors.append({'line': None, 'column': None, 'message': line.strip()})
+        if not self.has_success_indicator and any(i in lowered for i in SUCCESS_INDICATORS):
+            self.has_success_indicator = True
+
+        if 'warning' in lowered and line.strip() not in self._seen_warnings:
+            self._seen_warnings.add(line.strip())
+            self.warnings.append(line.strip())
+
+        match = LEMMA_RE.match(line)
+        if match:
+            self.lemmas.append({
+                'name': match.group(1),
+                'trace_type': match.group(2),
+                'verdict': match.group(3),
+                'steps': int(match.group(4))
+            })
+            return
+
+        match = PROCESSING_TIME_RE.match(line)
+        if match:
+            self.processing_time = float(match.group(1))
+
+    def result(self):
+        return {
+            'lemmas': self.lemmas,
+            'processing_time': self.processing_time,
+            'warnings': self.warnings,
+            'errors': self.errors,
+            'has_parse_error': self.has_parse_error,
+            'has_wellformedness_error': self.has_wellformedness_error,
+            'has_success_indicator': self.has_success_indicator
+        }
+
+def parse_output(stdout, stderr=''):
+    """Parse complete prover output in a single pass over its lines"""
+    parser = OutputParser()
+    for text in (stdout, stderr):
+        for line in text.splitlines():
+            parser.feed(line)
+    return parser.result()
+
+def merge_results(*results):
+    """Combine the results of parsers fed one output stream each, in stream order"""
+    warnings = []
+    for result in results:
+        warnings += [warning for warning in result['warnings'] if warning not in warnings]
+    return {
+        'lemmas': [lemma for result in results for lemma in result['lemmas']],
+        'processing_time': next((r['processing_time'] for r in results if r['processing_time'] is not None), None),
+        'warnings': warnings,
+        'errors': [error for result in results for error in result['errors']],
+        'has_parse_error': any(r['has_parse_error'] for r in results),
+        'has_wellformedness_error': any(r['has_wellformedness_error'] for r in results),
+        'has_success_indicator': any(r['has_success_indicator'] for r in results)
+    }
@@ -0,0 +1,142 @@
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from admission import Saturated
+from output_parser import parse_output
+
+LEMMA_RE = re.compile(r'\blemma\s+([A-Za-z_][A-Za-z0-9_]*)\s*(?:\[([^\]]*)\])?\s*:')
+COMMENT_RE = re.compile(r'//[^\n]*|/\*.*?\*/', re.S)
+
+def extract_lemmas(spthy_code):
+    """Return the lemmas of a theory in declaration order with their attributes"""
+    lemmas = []
+    for match in LEMMA_RE.finditer(COMMENT_RE.sub('', spthy_code)):
+        attributes = [attr.strip() for attr in (match.group(2) or '').split(',') if attr.strip()]
+        lemmas.append({'name': match.group(1), 'attributes': attributes})
+    return lemmas
+
+def _is_assumption(lemma):
+    """Sources and reuse lemmas feed into the proofs of every later lemma"""
+    return any(attr in ('sources', 'reuse') for attr in lemma['attributes'])
+
+def format_summary(lemmas, wall_time):
+    """Render merged per-lemma results in Tamarin's summary of summaries layout"""
+    lines = [
+        '=' * 78,
+        'summary of summaries:',
+        '',
+        f'analyzed: {len(lemmas)} lemmas in parallel',
+        '',
+        f'  processing time: {wall_time:.2f}s',
+        ''
+    ]
+    for lemma in lemmas:
+        steps = '' if lemma['steps'] is None else f' ({lemma["steps"]} steps)'
+        lines.append(f'  {lemma["name"]} ({lemma["trace_type"] or "unknown"}): '
+                     f'{lemma["verdict"]}{steps} [{lemma["wall_time"]:.2f}s]')
+    lines += ['', '=' * 78]
+    return '\n'.join(lines) + '\n'
+
+def prove_parallel(spthy_code, run_lemma, workers, timeout, on_output=None):
+    """
+    Prove every lemma of a theory in its own prover process.
+
+    run_lemma(code, lemma, timeout, on_output) runs a single --prove=<lemma>
+    and returns a run_tamarin() style result. Sources and reuse lemmas are
+    proved first since the remaining lemmas assume them; the rest then run
+    concurrently on a pool of workers. Returns a result whose stdout ends with
+    a merged summary of summaries, plus the structured per-lemma results, or
+    None when the theory declares no lemmas.
+
+    timeout is the budget for the whole theory. Each lemma may run until
+    the deadline, so lemmas that need little time leave the rest to those
+    that need more, and the deadline only cuts off the lemmas still running
+    when it passes. Those report verdict timeout with the output they
+    produced; lemmas not started before the deadline, or refused a prover
+    slot, report skipped.
+
+    parts lists each lemma's name, run_id, stdout and stderr in order, so
+    the caller can put the full output of the merged run together.
+    """
+    lemmas = extract_lemmas(spthy_code)
+    if not lemmas:
+        return None
+
+    started = time.monotonic()
+    deadline = started + timeout
+    workers = max(1, workers)
+
+    phases = [
+        [lemma for lemma in lemmas if _is_assumption(lemma)],
+        [lemma for lemma in lemmas if not _is_assumption(lemma)]
+    ]
+
+    def prove_one(lemma):
+        name = lemma['name']
+        forward = None
+        if on_output is not None:
+            forward = lambda stream, line: on_output(stream, f'[{name}] {line}')
+        lemma_started = time.monotonic()
+        budget = deadline - time.monotonic()
+        try:
+            if budget <= 0:
+                raise subprocess.TimeoutExpired(name, 0)
+            result = run_lemma(spthy_code, name, budget, forward)
+        except subprocess.TimeoutExpired as e:
+            result = {'stdout': e.output or '', 'stderr': e.stderr or '', 'returncode': -9, 'limit': 'wall_time',
+                      'run_id': getattr(e, 'run_id', None)}
+            verdict = {'trace_type': None, 'verdict': 'timeout' if budget > 0 else 'skipped', 'steps': None}
+        except Saturated:
+            result = {'stdout': '', 'stderr': '', 'returncode': None, 'limit': None, 'run_id': None}
+            verdict = {'trace_type': None, 'verdict': 'skipped', 'steps': None}
+        else:
+            verdict = {'trace_type': None, 'verdict': 'error', 'steps': None}
+            for parsed in (result.get('parsed') or parse_output(result['stdout']))['lemmas']:
+                if parsed['name'] == name:
+                    verdict = {key: parsed[key] for key in ('trace_type', 'verdict', 'steps')}
+        return {
+            'name': name,
+            'attributes': lemma['attributes'],
+            **verdict,
+            'returncode': result['returncode'],
+            'wall_time': time.monotonic() - lemma_started,
+            'cached': result.get('cached', False),
+            'limit': result.get('limit'),
+            'run_id': result.get('run_id'),
+            'stdout': result['stdout'],
+            'stderr': result['stderr']
+        }
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for phase in phases:
+            for lemma_result in pool.map(prove_one, phase):
+                results[lemma_result['name']] = lemma_result
+
+    ordered = [results[lemma['name']] for lemma in lemmas]
+    wall_time = time.monotonic() - started
+    summary = format_summary(ordered, wall_time)
+    assumptions_hold = all(r['verdict'] == 'verified' for r in ordered if _is_assumption(r))
+
+    stdout = ''.join(f'--- {r["name"]} ---\n{r["stdout"]}' for r in ordered) + summary
+    stderr = ''.join(r['stderr'] for r in ordered)
+    returncodes = [r['returncode'] for r in ordered if r['returncode']]
+    limits = [r['limit'] for r in ordered if r['limit']]
+
+    return {
+        'stdout': stdout,
+        'stderr': stderr,
+        'returncode': returncodes[0] if returncodes else 0,
+        'duration': wall_time,
+        'limit': limits[0] if limits else None,
+        'complete': not any(r['verdict'] in ('timeout', 'skipped') for r in ordered),
+        'summary': summary,
+        'assumptions_hold': assumptions_hold,
+        'lemmas': [
+            {key: value for key, value in r.items() if key not in ('stdout', 'stderr')}
+            for r in ordered
+        ],
+        'parts': [{key: r[key] for key in ('name', 'run_id', 'stdout', 'stderr')} for r in ordered]
+    }
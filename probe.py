@@ -0,0 +1,53 @@
+import subprocess
+import threading
+import time
+
+class ProverProbe:
+    """
+    Checks the prover binary from a background thread.
+
+    Health endpoints read the last result instead of forking tamarin-prover
+    on every request, so a busy box never fails its own probes.
+    """
+
+    def __init__(self, binary, interval=30, timeout=5):
+        self.binary = binary
+        self.interval = interval
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.state = {'available': False, 'version': None, 'checked_at': None, 'error': None}
+        self.thread = threading.Thread(target=self._run, name='prover-probe', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def trigger(self):
+        """Ask for a fresh check without waiting for the next interval"""
+        self.wakeup.set()
+
+    def check(self):
+        try:
+            result = subprocess.run([self.binary, '--version'], capture_output=True, text=True,
+                                    timeout=self.timeout)
+            available = result.returncode == 0
+            state = {
+                'available': available,
+                'version': result.stdout.strip() if available else None,
+                'error': None if available else result.stderr.strip() or f'exit code {result.returncode}'
+            }
+        except (OSError, subprocess.TimeoutExpired) as e:
+            state = {'available': False, 'version': None, 'error': str(e)}
+        state['checked_at'] = time.time()
+        with self.lock:
+            self.state = state
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.state)
+
+    def _run(self):
+        while True:
+            self.check()
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
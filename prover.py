@@ -0,0 +1,204 @@
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+
+from cancel import Cancelled
+from capture import Capture, clipped_output, close_captures
+from workspace import WorkspaceManager, default_root
+
+TAMARIN_BIN = os.environ.get('TAMARIN_BIN', 'tamarin-prover')
+
+workspaces = WorkspaceManager(
+    os.environ.get('WORKSPACE_ROOT', default_root()),
+    pool_size=int(os.environ.get('WORKSPACE_POOL_SIZE', 8)),
+    max_theory_bytes=int(os.environ.get('WORKSPACE_MAX_THEORY_KB', 8 * 1024)) * 1024,
+    quota_bytes=int(os.environ.get('WORKSPACE_QUOTA_MB', 256)) * 1024 * 1024
+)
+
+# Resource caps for each prover process; 0 leaves the limit unset
+PROVER_MEMORY_MB = int(os.environ.get('PROVER_MEMORY_MB', 0))
+PROVER_CPU_SECONDS = int(os.environ.get('PROVER_CPU_SECONDS', 0))
+PROVER_NICE = int(os.environ.get('PROVER_NICE', 0))
+CPU_LIMIT_GRACE = 5
+
+# Full prover output is spooled in memory up to this size per stream, then to a temporary file
+OUTPUT_SPOOL_KB = int(os.environ.get('OUTPUT_SPOOL_KB', 1024))
+
+MEMORY_ERRORS = ('out of memory', 'cannot allocate memory', 'memoryerror', 'heap exhausted')
+
+# A failed --version probe is answered as 'unknown' this long before the prover is asked again
+VERSION_RETRY_SECONDS = 30
+
+_version = None
+_version_failed_at = None
+
+def prover_flags(mode, lemma=None):
+    """Command line flags used for a check run or a prove run of one or all lemmas"""
+    if mode == 'check':
+        return ['--check-only']
+    if lemma is not None:
+        return [f'--prove={lemma}']
+    return ['--prove']
+
+def resource_wrapper():
+    """
+    Command prefix applying the configured rlimits and nice level, empty when none is set.
+
+    prlimit and nice set the caps and exec the prover in place, so the
+    server never forks through a preexec_fn, which is unsafe with threads.
+    """
+    prefix = []
+    if PROVER_MEMORY_MB or PROVER_CPU_SECONDS:
+        prefix.append('prlimit')
+        if PROVER_MEMORY_MB:
+            prefix.append(f'--as={PROVER_MEMORY_MB * 1024 * 1024}')
+        if PROVER_CPU_SECONDS:
+            prefix.append(f'--cpu={PROVER_CPU_SECONDS}:{PROVER_CPU_SECONDS + CPU_LIMIT_GRACE}')
+    if PROVER_NICE:
+        prefix += ['nice', '-n', str(PROVER_NICE)]
+    return prefix
+
+def build_command(theory_path, mode, lemma=None):
+    """Build the tamarin-prover command line for a check or prove run"""
+    return [*resource_wrapper(), TAMARIN_BIN, *prover_flags(mode, lemma), theory_path]
+
+def prover_version():
+    """Return the tamarin-prover --version string, remembered once known and retried VERSION_RETRY_SECONDS after a failure"""
+    global _version, _version_failed_at
+    if _version is not None:
+        return _version
+    if _version_failed_at is not None and time.monotonic() - _version_failed_at < VERSION_RETRY_SECONDS:
+        return 'unknown'
+    try:
+        result = subprocess.run([TAMARIN_BIN, '--version'], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        result = None
+    if result is None or result.returncode != 0:
+        _version_failed_at = time.monotonic()
+        return 'unknown'
+    _version = result.stdout.strip()
+    return _version
+
+def _pump(stream, name, capture, on_output):
+    """Copy a prover pipe into its capture line by line until EOF"""
+    for line in iter(stream.readline, ''):
+        capture.write(line)
+        if on_output is not None:
+            on_output(name, line)
+    stream.close()
+
+def kill_tree(proc):
+    """Kill the prover and everything it started, e.g. Maude, via its process group"""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _reap(proc, usage, cancel, kill):
+    """
+    Wait for the prover with os.wait4 so its resource usage is kept.
+
+    The prover is left a zombie until its process group has been killed and
+    the cancel token let go of it, so the group id cannot be reused and no
+    Maude child outlives the run or holds the output pipes open.
+    """
+    try:
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        if cancel is not None:
+            cancel.detach(kill)
+        kill_tree(proc)
+        _, status, rusage = os.wait4(proc.pid, 0)
+    except ChildProcessError:
+        return
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    usage.append(rusage)
+
+def tripped_limit(result):
+    """Name the resource cap that ended a failed run, or None"""
+    if result['returncode'] == 0:
+        return None
+    if PROVER_CPU_SECONDS and (result['returncode'] == -signal.SIGXCPU or
+                               (result['cpu_seconds'] or 0) >= PROVER_CPU_SECONDS):
+        return 'cpu'
+    if PROVER_MEMORY_MB and any(error in result['stderr'].lower() for error in MEMORY_ERRORS):
+        return 'memory'
+    return None
+
+def _usage(usage):
+    if not usage:
+        return {'cpu_seconds': None, 'max_rss_bytes': None}
+    rusage = usage[0]
+    # ru_maxrss is reported in kilobytes on Linux
+    return {'cpu_seconds': rusage.ru_utime + rusage.ru_stime, 'max_rss_bytes': rusage.ru_maxrss * 1024}
+
+def run_tamarin(spthy_code, mode='check', timeout=120, on_output=None, lemma=None, cancel=None):
+    """
+    Run tamarin-prover on a theory and collect its output.
+
+    Lines are passed to on_output(stream, line) as soon as the prover writes
+    them. The prover runs in its own session under the configured rlimits
+    and nice level. The result includes its CPU seconds, peak RSS and which
+    resource cap, if any, stopped it. Output past OUTPUT_SPOOL_KB is spooled
+    to disk while the prover runs. On timeout the whole process group is
+    killed and subprocess.TimeoutExpired is raised with the output captured
+    so far attached. Cancelling the cancel token kills the process group
+    the same way and raises Cancelled.
+
+    Output is parsed as it arrives. stdout and stderr hold only the head
+    and tail of long output; the full text stays in the Capture objects
+    under captures, which the caller must close.
+    """
+    with workspaces.theory_file(spthy_code) as theory_path:
+        cmd = build_command(theory_path, mode, lemma)
+        if cmd[0] != TAMARIN_BIN and shutil.which(TAMARIN_BIN) is None:
+            # The wrapper would only report the missing prover in its exit status
+            raise FileNotFoundError(f'{TAMARIN_BIN} not found')
+        started = time.monotonic()
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=True, bufsize=1, cwd=os.path.dirname(theory_path),
+                                start_new_session=True)
+
+        captures = {name: Capture(spool_size=OUTPUT_SPOOL_KB * 1024) for name in ('stdout', 'stderr')}
+        readers = [
+            threading.Thread(target=_pump, args=(proc.stdout, 'stdout', captures['stdout'], on_output), daemon=True),
+            threading.Thread(target=_pump, args=(proc.stderr, 'stderr', captures['stderr'], on_output), daemon=True),
+        ]
+        kill = lambda: kill_tree(proc)
+        if cancel is not None:
+            cancel.attach(kill)
+        usage = []
+        reaper = threading.Thread(target=_reap, args=(proc, usage, cancel, kill), daemon=True)
+        for thread in (*readers, reaper):
+            thread.start()
+
+        reaper.join(timeout)
+        if reaper.is_alive():
+            kill_tree(proc)
+            reaper.join()
+            for reader in readers:
+                reader.join()
+            captured = clipped_output(captures)
+            error = subprocess.TimeoutExpired(cmd, timeout, output=captured['stdout'], stderr=captured['stderr'])
+            error.output_size = captured['output_size']
+            error.parsed = captured['parsed']
+            error.captures = captures
+            raise error
+
+        for reader in readers:
+            reader.join()
+        if cancel is not None and cancel.cancelled:
+            close_captures(captures)
+            raise Cancelled('Prover run was cancelled')
+
+        result = {
+            **clipped_output(captures),
+            'captures': captures,
+            'returncode': proc.returncode,
+            'duration': time.monotonic() - started,
+            **_usage(usage)
+        }
+        result['limit'] = tripped_limit(result)
+        return result
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import time
+import urllib.request
+
+DEFAULT_DOWNLOAD_URL = ('https://github.com/tamarin-prover/tamarin-prover/releases/download/1.8.0/'
+                        'tamarin-prover-1.8.0-linux64-ubuntu.tar.gz')
+
+class ProvisionError(Exception):
+    """Raised when no verified prover binary could be installed"""
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Provisioner:
+    """
+    Installs tamarin-prover from a local artifact cache.
+
+    A binary that was installed and verified before is recognised by a
+    checksum marker next to it and is reused without any other work. Otherwise
+    the binary is taken from artifact (a tarball, a directory holding a
+    tarball or the bare binary), checked against expected_sha256 when one is
+    configured, or else against the digest recorded for it in a
+    <artifact>.sha256 file, as the Docker build writes. Only if no artifact
+    exists is the release downloaded into the artifact cache. A download is
+    only installed when expected_sha256 is set, unless allow_unverified says
+    otherwise.
+    """
+
+    def __init__(self, install_dir='/usr/local/bin', artifact=None, expected_sha256=None,
+                 download_url=DEFAULT_DOWNLOAD_URL, allow_download=True, allow_unverified=False, log=None):
+        self.install_dir = install_dir
+        self.binary = os.path.join(install_dir, 'tamarin-prover')
+        self.marker = os.path.join(install_dir, '.tamarin-prover.sha256')
+        self.artifact = artifact
+        self.expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+        self.download_url = download_url
+        self.allow_download = allow_download
+        self.allow_unverified = allow_unverified
+        self.log = log or (lambda message: None)
+        self.timings = {}
+
+    def _timed(self, step, fn, *args):
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            self.timings[step] = round(time.monotonic() - started, 4)
+
+    def installed_digest(self):
+        """Return the binary's checksum if it matches its install marker"""
+        if not (os.path.isfile(self.binary) and os.path.isfile(self.marker)):
+            return None
+        with open(self.marker) as f:
+            recorded = f.read().strip()
+        if sha256_file(self.binary) != recorded:
+            return None
+        return recorded
+
+    def _locate_artifact(self):
+        if not self.artifact:
+            return None
+        if os.path.isfile(self.artifact):
+            return self.artifact
+        if os.path.isdir(self.artifact):
+            for name in sorted(os.listdir(self.artifact)):
+                if name == 'tamarin-prover' or name.endswith(('.tar.gz', '.tgz')):
+                    return os.path.join(self.artifact, name)
+        return None
+
+    def _download(self):
+        """Fetch the release tarball into the artifact cache"""
+        directory = self.artifact if self.artifact and not os.path.isfile(self.artifact) else tempfile.gettempdir()
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, os.path.basename(self.download_url))
+        partial = f'{target}.part'
+        with urllib.request.urlopen(self.download_url, timeout=300) as response, open(partial, 'wb') as f:
+            shutil.copyfileobj(response, f)
+        os.replace(partial, target)
+        return target
+
+    def _expected_digest(self, path):
+        if self.expected_sha256:
+            return self.expected_sha256
+        recorded = f'{path}.sha256'
+        if os.path.isfile(recorded):
+            with open(recorded) as f:
+                return f.read().split()[0].lower()
+        return None
+
+    def _verify(self, path):
+        digest = sha256_file(path)
+        expected = self._expected_digest(path)
+        if expected and digest != expected:
+            raise ProvisionError(f'Checksum mismatch for {path}: expected {expected}, got {digest}')
+        if not expected:
+            self.log(f'No TAMARIN_SHA256 configured, {os.path.basename(path)} is unverified (sha256 {digest})')
+        return digest
+
+    def _extract_binary(self, artifact, staging):
+        """Copy the tamarin-prover binary out of the artifact into staging"""
+        staged = os.path.join(staging, 'tamarin-prover')
+        if not tarfile.is_tarfile(artifact):
+            shutil.copyfile(artifact, staged)
+            return staged
+        with tarfile.open(artifact) as archive:
+            for member in archive:
+                if member.isfile() and os.path.basename(member.name) == 'tamarin-prover':
+                    with archive.extractfile(member) as src, open(staged, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                    return staged
+        raise ProvisionError(f'No tamarin-prover binary in {artifact}')
+
+    def _install(self, staged):
+        os.chmod(staged, 0o755)
+        digest = sha256_file(staged)
+        os.makedirs(self.install_dir, exist_ok=True)
+        temp_binary = f'{self.binary}.new'
+        shutil.copyfile(staged, temp_binary)
+        os.chmod(temp_binary, 0o755)
+        os.replace(temp_binary, self.binary)
+        with open(self.marker, 'w') as f:
+            f.write(digest)
+
+    def _smoke_test(self):
+        result = subprocess.run([self.binary, '--version'], capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            raise ProvisionError(f'Installed binary failed --version: {result.stderr.strip()}')
+        return result.stdout.strip()
+
+    def provision(self):
+        """Make sure a verified binary is installed and report how it got there"""
+        started = time.monotonic()
+        self.timings = {}
+
+        if self._timed('check_installed', self.installed_digest):
+            source = 'installed'
+            self.log('Verified tamarin-prover already installed, skipping provisioning')
+        else:
+            artifact = self._locate_artifact()
+            source = 'artifact'
+            if artifact is None:
+                if not self.allow_download:
+                    raise ProvisionError('No local artifact found and downloads are disabled')
+                if not self.expected_sha256 and not self.allow_unverified:
+                    raise ProvisionError('No local artifact found and TAMARIN_SHA256 is not set; refusing to '
+                                         'install an unverified download')
+                self.log('No local artifact found, downloading Tamarin...')
+                artifact = self._timed('download', self._download)
+                source = 'download'
+            self.log(f'Installing Tamarin from {artifact}')
+            self._timed('verify', self._verify, artifact)
+            with tempfile.TemporaryDirectory() as staging:
+                staged = self._timed('extract', self._extract_binary, artifact, staging)
+                self._timed('install', self._install, staged)
+
+        version = self._timed('smoke_test', self._smoke_test)
+        self.timings['total'] = round(time.monotonic() - started, 4)
+        return {'source': source, 'version': version, 'binary': self.binary, 'timings': dict(self.timings)}
+
+def provisioner_from_env(log=None):
+    """Build a Provisioner configured by TAMARIN_* environment variables"""
+    return Provisioner(
+        install_dir=os.environ.get('TAMARIN_INSTALL_DIR', '/usr/local/bin'),
+        artifact=os.environ.get('TAMARIN_ARTIFACT'),
+        expected_sha256=os.environ.get('TAMARIN_SHA256'),
+        download_url=os.environ.get('TAMARIN_DOWNLOAD_URL', DEFAULT_DOWNLOAD_URL),
+        allow_download=os.environ.get('TAMARIN_ALLOW_DOWNLOAD', '1') not in ('0', 'false', 'no'),
+        allow_unverified=os.environ.get('TAMARIN_ALLOW_UNVERIFIED', '0') in ('1', 'true', 'yes'),
+        log=log
+    )
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+class QuotaExceeded(Exception):
+    """Raised when a theory does not fit in the workspace quota"""
+
+    def __init__(self, message, status_code=503):
+        super().__init__(message)
+        self.status_code = status_code
+
+def default_root():
+    """Prefer RAM-backed /dev/shm for job directories when it is usable"""
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm/tamarin-ide'
+    return os.path.join(tempfile.gettempdir(), 'tamarin-ide-work')
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class WorkspaceManager:
+    """
+    Hands out per-job directories under a (preferably tmpfs) root.
+
+    Directories are pre-created and recycled through a small pool so cheap
+    check runs never create or remove directories on the hot path. Each
+    directory name carries the owning pid and a per-process token, which lets
+    a restarted server sweep directories leaked by a killed predecessor.
+    """
+
+    def __init__(self, root, pool_size=8, max_theory_bytes=8 * 1024 * 1024,
+                 quota_bytes=256 * 1024 * 1024):
+        self.root = root
+        self.pool_size = pool_size
+        self.max_theory_bytes = max_theory_bytes
+        self.quota_bytes = quota_bytes
+        self.token = uuid.uuid4().hex[:8]
+        self.prefix = f'ws-{os.getpid()}-{self.token}-'
+        self.lock = threading.Lock()
+        self.pool = []
+        self.counter = 0
+        self.used_bytes = 0
+        os.makedirs(root, exist_ok=True)
+        self.swept = self.sweep_orphans()
+        for _ in range(pool_size):
+            self.pool.append(self._create())
+
+    def _create(self):
+        with self.lock:
+            self.counter += 1
+            path = os.path.join(self.root, f'{self.prefix}{self.counter}')
+        os.mkdir(path)
+        return path
+
+    def sweep_orphans(self):
+        """Remove job directories left behind by processes that are gone"""
+        removed = 0
+        for entry in os.scandir(self.root):
+            parts = entry.name.split('-')
+            if len(parts) != 4 or parts[0] != 'ws' or not parts[1].isdigit():
+                continue
+            pid, token = int(parts[1]), parts[2]
+            if entry.name.startswith(self.prefix):
+                continue
+            if (pid == os.getpid() and token != self.token) or not _pid_alive(pid):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def acquire(self, size):
+        """Reserve quota for size bytes and return an empty job directory"""
+        if size > self.max_theory_bytes:
+            raise QuotaExceeded(f'Theory is {size} bytes, the limit is {self.max_theory_bytes}', 413)
+        with self.lock:
+            if self.used_bytes + size > self.quota_bytes:
+                raise QuotaExceeded('Workspace quota exhausted, please retry shortly')
+            self.used_bytes += size
+            path = self.pool.pop() if self.pool else None
+        if shutil.disk_usage(self.root).free < size:
+            self._release_quota(size)
+            if path is not None:
+                self.release(path, 0)
+            raise QuotaExceeded(f'Not enough free space in {self.root}')
+        return path if path is not None else self._create()
+
+    def _release_quota(self, size):
+        with self.lock:
+            self.used_bytes -= size
+
+    def release(self, path, size):
+        """Empty a job directory and return it to the pool"""
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.unlink(entry.path)
+        self._release_quota(size)
+        with self.lock:
+            if len(self.pool) < self.pool_size:
+                self.pool.append(path)
+                return
+        shutil.rmtree(path, ignore_errors=True)
+
+    @contextmanager
+    def theory_file(self, spthy_code, name='theory.spthy'):
+        """Write a theory into a fresh job directory and yield its path"""
+        data = spthy_code.encode('utf-8')
+        path = self.acquire(len(data))
+        try:
+            theory_path = os.path.join(path, name)
+            with open(theory_path, 'wb') as f:
+                f.write(data)
+            yield theory_path
+        finally:
+            self.release(path, len(data))